@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Regression benchmark: cold start of the FastAPI app.
+
+Each run starts a fresh interpreter that imports ``main`` and runs the
+app's lifespan startup and shutdown, with every provider configured by a
+dummy key and memory and the job queue kept in a temporary directory. No
+requests are sent, so nothing leaves the machine. The benchmark fails if
+the median import plus startup time exceeds the budget; ``--history``
+appends each result as a JSON line so cold start can be tracked across
+commits.
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --no-warmup   # SDKs deferred to first request
+    python benchmarks/bench_cold_start.py --history benchmarks/cold_start_history.jsonl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.profiling import PROJECT_ROOT, isolated_env, profile_startup
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(seconds: list) -> dict:
+    """Percentiles of one phase in ms"""
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50_ms": round(statistics.median(ms), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def git_commit() -> str:
+    """Current commit, to label history entries"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = isolated_env(data_dir)
+        env.update(
+            OPENAI_API_KEY="bench",
+            ANTHROPIC_API_KEY="bench",
+            GOOGLE_API_KEY="bench",
+            PROVIDER_WARMUP="false" if args.no_warmup else "true",
+        )
+        runs = [profile_startup(importtime=False, env=env) for _ in range(args.runs)]
+
+    totals = [r["import_s"] + r["startup_s"] for r in runs]
+    total_stats = summarize(totals)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "warmup": not args.no_warmup,
+        "runs": args.runs,
+        "import": summarize([r["import_s"] for r in runs]),
+        "startup": summarize([r["startup_s"] for r in runs]),
+        "total": total_stats,
+        "budget_ms": args.budget_ms,
+        "passed": total_stats["p50_ms"] <= args.budget_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, default=3000.0, help="Allowed median import + startup time")
+    parser.add_argument("--no-warmup", action="store_true", help="Measure with PROVIDER_WARMUP=false")
+    parser.add_argument("--history", help="Append the result as a JSON line to this file")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Regression benchmark: slow Gemini calls must not stall other providers.
+
+Ollama requests are served by an in-process mock transport that answers
+immediately, so their latency measures only how responsive the event loop
+is. The benchmark measures Ollama latency on its own, then again while
+several Gemini calls (a fake model whose ``generate_content`` blocks like
+the real SDK) are in flight, and fails if the loaded p99 regresses by more
+than the allowed budget.
+
+Usage:
+    python benchmarks/bench_gemini_isolation.py
+    python benchmarks/bench_gemini_isolation.py --inline --requests 20   # old blocking behaviour
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import ModelRouter
+
+
+class FakeResponse:
+    """Stands in for a Gemini GenerateContentResponse"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """GenerativeModel whose calls block the calling thread, like the real SDK"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def generate_content(self, contents=None, generation_config=None, stream=False):
+        time.sleep(self.delay)
+        return FakeResponse("gemini reply")
+
+
+def ollama_handler(request: httpx.Request) -> httpx.Response:
+    """Mock Ollama /api/generate that answers immediately"""
+    return httpx.Response(200, json={"response": "ollama reply", "eval_count": 2})
+
+
+def build_router(gemini_delay: float, max_workers: int) -> ModelRouter:
+    """Create a router wired to the fake Gemini model and the mock Ollama server"""
+    router = ModelRouter(
+        {
+            "default_model": "ollama",
+            "google": {"api_key": "bench", "model": "fake-gemini", "max_workers": max_workers},
+            "ollama": {"base_url": "http://ollama.bench", "model": "llama2"},
+        }
+    )
+    google = router._provider("google")
+    google._models["fake-gemini"] = FakeGeminiModel(gemini_delay)
+    google._generation_config = lambda temperature, max_tokens: None
+    router.runtime._http_clients["ollama"] = httpx.AsyncClient(transport=httpx.MockTransport(ollama_handler))
+    return router
+
+
+async def measure_ollama(router: ModelRouter, requests: int, interval: float) -> list:
+    """
+    Send Ollama requests on a fixed schedule and return their latencies in ms.
+
+    Latency is measured from when each request was due, so time spent
+    waiting for a stalled event loop to get round to sending it counts.
+    """
+    loop = asyncio.get_running_loop()
+    messages = [{"role": "user", "content": "ping"}]
+    start = loop.time()
+
+    async def one(due: float) -> float:
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        response = await router.chat(messages, model="ollama")
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return (loop.time() - due) * 1000
+
+    return await asyncio.gather(*(one(start + i * interval) for i in range(requests)))
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list) -> dict:
+    """Latency percentiles of one phase"""
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+async def run(args) -> dict:
+    router = build_router(args.gemini_delay, args.gemini_concurrency)
+    if args.inline:
+        # Reproduce the old code path: the blocking call runs on the event loop
+        async def run_inline(func, *func_args, **kwargs):
+            return func(*func_args, **kwargs)
+
+        router._provider("google")._run = run_inline
+
+    try:
+        baseline = await measure_ollama(router, args.requests, args.interval)
+
+        messages = [{"role": "user", "content": "hello"}]
+        stop = asyncio.Event()
+
+        async def gemini_worker():
+            while not stop.is_set():
+                response = await router.chat(messages, model="google")
+                if "error" in response:
+                    raise RuntimeError(response["error"])
+                # In inline mode the call never suspends, so yield explicitly
+                await asyncio.sleep(0)
+
+        workers = [asyncio.create_task(gemini_worker()) for _ in range(args.gemini_concurrency)]
+        await asyncio.sleep(0.01)
+        loaded = await measure_ollama(router, args.requests, args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+    finally:
+        await router.aclose()
+
+    baseline_stats = summarize(baseline)
+    loaded_stats = summarize(loaded)
+    allowed_p99 = baseline_stats["p99_ms"] + args.budget_ms
+    return {
+        "mode": "inline" if args.inline else "executor",
+        "gemini_delay_ms": args.gemini_delay * 1000,
+        "gemini_concurrency": args.gemini_concurrency,
+        "ollama_baseline": baseline_stats,
+        "ollama_with_gemini_in_flight": loaded_stats,
+        "budget_ms": args.budget_ms,
+        "passed": loaded_stats["p99_ms"] <= allowed_p99,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Ollama requests per phase")
+    parser.add_argument("--interval", type=float, default=0.002, help="Seconds between Ollama requests")
+    parser.add_argument("--gemini-delay", type=float, default=0.25, help="Seconds each Gemini call blocks")
+    parser.add_argument("--gemini-concurrency", type=int, default=4, help="Gemini calls kept in flight")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="Allowed p99 regression in ms")
+    parser.add_argument("--inline", action="store_true", help="Run Gemini calls on the event loop (old behaviour)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+"""
+Offline load test: open-loop traffic against the server with mock providers.
+
+Starts the mock provider server (``mock_providers.py``) and ``main.py``
+with every provider pointed at the mock and memory in a temporary
+directory, so no API keys or network access are needed. Use ``--target``
+to drive a server that is already running instead.
+
+Requests arrive on an open-loop schedule (Poisson by default) at each
+rate in ``--rate``, whether or not earlier ones have finished, so a slow
+server builds a queue instead of slowing the load down. Latency is
+measured from when a request was scheduled, not when it was sent, which
+keeps client-side queueing from hiding server stalls. Arrivals beyond
+``--max-in-flight`` outstanding requests are dropped and counted.
+
+Traffic is a weighted mix of scenarios:
+
+    chat:<provider>    POST /api/chat with that model
+    stream:<provider>  POST /api/chat/stream, also timing the first byte
+    memory             GET /api/memory for a conversation
+    memory-stats       GET /api/memory/stats
+
+Providers are openai, anthropic, google and ollama. The default mix leaves
+out anthropic because the pinned anthropic SDK predates its Messages API;
+the mock serves the protocol for newer SDKs.
+
+Results are JSON: per rate and per scenario request counts, errors,
+throughput and p50/p95/p99 latency, plus event loop lag of this client and
+of the server (from its ``event_loop_lag_seconds`` metric). The run fails
+if the error rate exceeds ``--max-error-rate`` or, with ``--compare``, if
+p99 latency or throughput regressed more than ``--max-regression`` against
+a saved result.
+
+Usage:
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --rate 50,100,200 --duration 20 --output load.json
+    python benchmarks/bench_load.py --mix chat:openai=1,stream:google=1 --error-rate 0.02 --max-error-rate 0.05
+    python benchmarks/bench_load.py --compare load.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "chat:openai=3,chat:google=2,chat:ollama=2,stream:openai=1,stream:ollama=1,memory=2,memory-stats=1"
+CONVERSATIONS = 16
+LAG_SAMPLE_INTERVAL = 0.01
+LAG_METRIC = re.compile(r'^event_loop_lag_seconds_(bucket\{le="(?P<le>[^"]+)"\}|sum|count) (?P<value>\S+)$')
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    """Poll a URL until it answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    """Stop a server and its worker processes"""
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse ``scenario=weight`` pairs"""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        kind, _, provider = name.partition(":")
+        if kind not in ("chat", "stream", "memory", "memory-stats") or (kind in ("chat", "stream")) != bool(provider):
+            raise ValueError(f"Unknown scenario: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[index], 3)
+
+
+def summarize(latencies_ms: List[float]) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": round(values[-1], 3) if values else None,
+    }
+
+
+def scrape_loop_lag(client: httpx.Client, base_url: str) -> Optional[dict]:
+    """Read the server's event loop lag histogram from /metrics"""
+    try:
+        response = client.get(f"{base_url}/metrics", timeout=5.0)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    buckets, total, count = {}, 0.0, 0
+    for line in response.text.splitlines():
+        match = LAG_METRIC.match(line)
+        if not match:
+            continue
+        value = float(match.group("value"))
+        if match.group("le"):
+            buckets[float(match.group("le"))] = value
+        elif line.startswith("event_loop_lag_seconds_sum"):
+            total = value
+        else:
+            count = int(value)
+    return {"buckets": buckets, "sum": total, "count": count} if count or buckets else None
+
+
+def loop_lag_delta(before: Optional[dict], after: Optional[dict]) -> Optional[dict]:
+    """Server loop lag during a step, from two histogram scrapes"""
+    if not before or not after:
+        return None
+    count = after["count"] - before["count"]
+    if count <= 0:
+        return None
+    result = {"samples": count, "mean_ms": round((after["sum"] - before["sum"]) / count * 1000, 3)}
+    # Histogram percentiles are the upper bound of the bucket they fall in
+    for name, pct in (("p99_ms", 0.99), ("max_ms", 1.0)):
+        result[name] = None
+        for le in sorted(after["buckets"]):
+            if after["buckets"][le] - before["buckets"].get(le, 0) >= pct * count:
+                result[name] = round(le * 1000, 3) if le != float("inf") else "+Inf"
+                break
+    return result
+
+
+class Scenario:
+    """One kind of request in the traffic mix"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind, _, self.provider = name.partition(":")
+        self.latencies: List[float] = []
+        self.ttfb: List[float] = []
+        self.errors = 0
+
+    def reset(self):
+        self.latencies, self.ttfb, self.errors = [], [], 0
+
+    async def run(self, client: httpx.AsyncClient, n: int, rng: random.Random, scheduled: float):
+        conversation = f"load-{rng.randrange(CONVERSATIONS)}"
+        try:
+            if self.kind in ("chat", "stream"):
+                payload = {
+                    "messages": [{"role": "user", "content": f"load test request {n} {rng.random()}"}],
+                    "model": self.provider,
+                    "max_tokens": 200,
+                    "conversation_id": conversation,
+                }
+                if self.kind == "chat":
+                    response = await client.post("/api/chat", json=payload)
+                    ok = response.status_code == 200 and not response.json().get("error")
+                else:
+                    ok = await self._stream(client, payload, scheduled)
+            elif self.kind == "memory":
+                response = await client.get("/api/memory", params={"conversation_id": conversation, "limit": 20})
+                ok = response.status_code == 200
+            else:
+                response = await client.get("/api/memory/stats")
+                ok = response.status_code == 200
+        except (httpx.HTTPError, ValueError):
+            ok = False
+        if ok:
+            self.latencies.append((time.perf_counter() - scheduled) * 1000)
+        else:
+            self.errors += 1
+
+    async def _stream(self, client: httpx.AsyncClient, payload: dict, scheduled: float) -> bool:
+        first = None
+        ok = False
+        async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+            if response.status_code != 200:
+                return False
+            async for line in response.aiter_lines():
+                if first is None and line:
+                    first = time.perf_counter()
+                if line.startswith("event: done"):
+                    ok = True
+                elif line.startswith("event: error"):
+                    return False
+        if ok and first is not None:
+            self.ttfb.append((first - scheduled) * 1000)
+        return ok
+
+    def report(self, duration: float) -> dict:
+        result = {
+            "requests": len(self.latencies) + self.errors,
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / duration, 2),
+            **summarize(self.latencies),
+        }
+        if self.kind == "stream":
+            result["ttfb"] = summarize(self.ttfb)
+        return result
+
+
+async def sample_client_lag(samples: List[float], stop_event: asyncio.Event):
+    """Record how late this process's event loop wakes up a sleeping task"""
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_SAMPLE_INTERVAL) * 1000)
+
+
+async def run_step(client: httpx.AsyncClient, scenarios: List[Scenario], weights: List[float],
+                   rate: float, args, rng: random.Random) -> dict:
+    """Offer load at one rate for ``--duration`` seconds and wait for it to drain"""
+    for scenario in scenarios:
+        scenario.reset()
+    tasks = set()
+    dropped = 0
+    lag: List[float] = []
+    stop_event = asyncio.Event()
+    lag_task = asyncio.create_task(sample_client_lag(lag, stop_event))
+
+    start = time.perf_counter()
+    next_arrival = start
+    n = 0
+    while True:
+        gap = rng.expovariate(rate) if args.arrivals == "poisson" else 1 / rate
+        next_arrival += gap
+        if next_arrival - start >= args.duration:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        n += 1
+        if len(tasks) >= args.max_in_flight:
+            dropped += 1
+            continue
+        scenario = rng.choices(scenarios, weights)[0]
+        task = asyncio.create_task(scenario.run(client, n, rng, next_arrival))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(set(tasks), timeout=args.drain_timeout)
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    await lag_task
+
+    completed = sum(len(s.latencies) for s in scenarios)
+    errors = sum(s.errors for s in scenarios)
+    return {
+        "rate": rate,
+        "offered": n,
+        "completed": completed,
+        "errors": errors,
+        "dropped": dropped,
+        "unfinished": len(tasks),
+        "error_rate": round((errors + dropped) / n, 4) if n else 0.0,
+        "achieved_rps": round(completed / args.duration, 2),
+        "elapsed_s": round(elapsed, 3),
+        **summarize([latency for s in scenarios for latency in s.latencies]),
+        "scenarios": {s.name: s.report(args.duration) for s in scenarios},
+        "client_loop_lag": summarize(lag),
+    }
+
+
+async def drive(base_url: str, args) -> List[dict]:
+    """Run every load step against a server"""
+    weights_by_name = parse_mix(args.mix)
+    scenarios = [Scenario(name) for name in weights_by_name]
+    weights = list(weights_by_name.values())
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+
+    steps = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        with httpx.Client() as scraper:
+            if args.warmup > 0:
+                warmup = argparse.Namespace(**{**vars(args), "duration": args.warmup})
+                await run_step(client, scenarios, weights, min(args.rates), warmup, rng)
+            for rate in args.rates:
+                before = await asyncio.to_thread(scrape_loop_lag, scraper, base_url)
+                step = await run_step(client, scenarios, weights, rate, args, rng)
+                after = await asyncio.to_thread(scrape_loop_lag, scraper, base_url)
+                step["server_loop_lag"] = loop_lag_delta(before, after)
+                steps.append(step)
+    return steps
+
+
+def start_stack(args, data_dir: str):
+    """Start the mock providers and the server; return (processes, base url)"""
+    mock_port, port = free_port(), free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "benchmarks", "mock_providers.py"),
+         "--port", str(mock_port),
+         "--latency-ms", str(args.provider_latency_ms),
+         "--jitter-ms", str(args.provider_jitter_ms),
+         "--tokens-per-second", str(args.tokens_per_second),
+         "--output-tokens", str(args.output_tokens),
+         "--error-rate", str(args.error_rate),
+         "--error-status", str(args.error_status),
+         "--seed", str(args.seed)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    env = dict(os.environ)
+    env.update(
+        API_HOST="127.0.0.1",
+        API_PORT=str(port),
+        API_DEBUG="false",
+        API_WORKERS=str(args.workers),
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"{mock_url}/v1",
+        ANTHROPIC_API_KEY="bench",
+        ANTHROPIC_BASE_URL=mock_url,
+        GOOGLE_API_KEY="bench",
+        GOOGLE_BASE_URL=mock_url,
+        OLLAMA_BASE_URL=mock_url,
+        DEFAULT_MODEL="ollama",
+        FALLBACK_CHAIN="",
+        HEDGE_ENABLED="false",
+        RESPONSE_CACHE_ENABLED="false",
+        METRICS_ENABLED="true",
+        TRACING_ENABLED="false",
+        MEMORY_BACKEND=args.memory_backend,
+        MEMORY_FILE=os.path.join(data_dir, "memory.json"),
+        MEMORY_DB_FILE=os.path.join(data_dir, "memory.db"),
+        JOBS_DB_FILE=os.path.join(data_dir, "jobs.db"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    processes = [server, mock]
+    try:
+        wait_ready(mock_url)
+        wait_ready(f"http://127.0.0.1:{port}/health")
+    except RuntimeError:
+        for process in processes:
+            stop(process)
+        raise
+    return processes, f"http://127.0.0.1:{port}"
+
+
+def compare(steps: List[dict], baseline: dict, max_regression: float) -> List[str]:
+    """Describe regressions of p99 latency and throughput against a baseline run"""
+    regressions = []
+    previous = {step["rate"]: step for step in baseline.get("steps", [])}
+    for step in steps:
+        base = previous.get(step["rate"])
+        if base is None:
+            continue
+        if base.get("p99_ms") and step.get("p99_ms") and step["p99_ms"] > base["p99_ms"] * (1 + max_regression):
+            regressions.append(f"rate {step['rate']}: p99 {step['p99_ms']}ms vs {base['p99_ms']}ms")
+        if base.get("achieved_rps") and step["achieved_rps"] < base["achieved_rps"] * (1 - max_regression):
+            regressions.append(f"rate {step['rate']}: {step['achieved_rps']} rps vs {base['achieved_rps']} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", default="20,50", help="Comma-separated arrival rates (requests/s), one step each")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per rate")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unrecorded load first")
+    parser.add_argument("--arrivals", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights as name=weight pairs")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Outstanding requests before dropping")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Wait for in-flight requests per step")
+    parser.add_argument("--target", help="Base URL of a running server; skips starting the mock and server")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--memory-backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--provider-latency-ms", type=float, default=50.0, help="Mock time to first byte")
+    parser.add_argument("--provider-jitter-ms", type=float, default=20.0, help="Mock random extra latency")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Mock generation rate")
+    parser.add_argument("--output-tokens", type=int, default=20, help="Mock tokens per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock provider calls that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Allowed share of failed or dropped")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--compare", help="Baseline result JSON to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p99/throughput change")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rate.split(",")]
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        processes = []
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            processes, base_url = start_stack(args, data_dir)
+        try:
+            steps = asyncio.run(drive(base_url, args))
+        finally:
+            for process in processes:
+                stop(process)
+
+    result = {
+        "config": {
+            "target": args.target,
+            "workers": args.workers,
+            "memory_backend": args.memory_backend,
+            "arrivals": args.arrivals,
+            "duration_s": args.duration,
+            "mix": parse_mix(args.mix),
+            "max_in_flight": args.max_in_flight,
+            "provider_latency_ms": args.provider_latency_ms,
+            "provider_jitter_ms": args.provider_jitter_ms,
+            "tokens_per_second": args.tokens_per_second,
+            "output_tokens": args.output_tokens,
+            "error_rate": args.error_rate,
+        },
+        "steps": steps,
+        "max_error_rate": args.max_error_rate,
+    }
+    failures = [
+        f"rate {step['rate']}: error rate {step['error_rate']}"
+        for step in steps
+        if step["error_rate"] > args.max_error_rate
+    ]
+    if args.compare:
+        with open(args.compare) as f:
+            failures += compare(steps, json.load(f), args.max_regression)
+        result["max_regression"] = args.max_regression
+    result["failures"] = failures
+    result["passed"] = not failures
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
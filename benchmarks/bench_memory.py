@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark: memory store operations against history size and entry size.
+
+For every backend, history size and entry size it builds a synthetic
+conversation of that many entries (all retained) in a temporary
+directory, then measures:
+
+    add_entry        appending one entry to the conversation
+    flush            write-behind backends only: writing the queued
+                     add_entry calls to the store, per entry
+    get_recent       the last 10 entries, from a store that has read before
+    get_recent_cold  the last 10 entries, from a freshly opened store
+    get_context      the last 5 entries formatted as context
+    clear            removing the conversation (measured once per store)
+
+Each operation reports latency (p50/p99/mean), bytes allocated at peak
+while it runs (tracemalloc, in a separate pass so tracing overhead stays
+out of the timings) and bytes passed to write() (``/proc/self/io``;
+file growth where that is unavailable), all per operation.
+
+Budgets cap p99 latency, allocations and bytes written per operation.
+Size budgets are ``[fixed, per_entry_byte]`` pairs, scaled by the entry
+size. A store whose appends or reads grow with history size fails at the
+larger sizes, so a new backend has to meet them at every size to pass.
+``get_recent_cold`` and ``clear`` have no default budgets: both touch the
+whole conversation in the current backends. Pass ``--budgets file.json``
+to override the defaults, ``--compare`` to also fail on p99 regressions
+against a saved result.
+
+Usage:
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --sizes 1000,10000,100000,1000000 --entry-bytes 200
+    python benchmarks/bench_memory.py --backends sqlite,sqlite+write-behind --output memory.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.memory import JSONMemory, SQLiteMemory, WriteBehindMemory
+from src.memory.json_memory import ConversationEntry
+
+BACKENDS = ("json", "sqlite", "json+write-behind", "sqlite+write-behind")
+CONVERSATION = "bench"
+POPULATE_BATCH = 10000
+
+# p99 latency in microseconds; sizes as [fixed bytes, bytes per entry byte]
+DEFAULT_BUDGETS = {
+    "add_entry": {"p99_us": 20000, "alloc_bytes": [65536, 4], "written_bytes": [131072, 2]},
+    "flush": {"p99_us": 20000, "alloc_bytes": [65536, 4], "written_bytes": [131072, 2]},
+    "get_recent": {"p99_us": 5000, "alloc_bytes": [65536, 20], "written_bytes": [4096, 0]},
+    "get_context": {"p99_us": 5000, "alloc_bytes": [65536, 20], "written_bytes": [4096, 0]},
+}
+
+
+def written_bytes() -> Optional[int]:
+    """Bytes this process has passed to write() so far, if the OS reports it"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def make_entry(n: int, entry_bytes: int) -> ConversationEntry:
+    """A synthetic entry whose content is ``entry_bytes`` long"""
+    role = "user" if n % 2 == 0 else "assistant"
+    prefix = f"message {n} "
+    content = prefix + "x" * max(0, entry_bytes - len(prefix))
+    return ConversationEntry.create(role, content, None if role == "user" else "bench", None, CONVERSATION)
+
+
+def open_store(backend: str, directory: str, size: int):
+    """Open a backend keeping ``size`` entries per conversation"""
+    if backend.startswith("json"):
+        store = JSONMemory(os.path.join(directory, "memory.json"), size, max_conversation_entries=size)
+    else:
+        store = SQLiteMemory(os.path.join(directory, "memory.db"), size, max_conversation_entries=size)
+    return WriteBehindMemory(store, batch_size=1000000, flush_interval_ms=3600000) \
+        if backend.endswith("write-behind") else store
+
+
+def close_store(memory):
+    """Close a store's database connection, if it has one"""
+    store = getattr(memory, "store", memory)
+    if isinstance(store, SQLiteMemory):
+        store.close()
+
+
+def populate(directory: str, backend: str, size: int, entry_bytes: int):
+    """Write a conversation of ``size`` entries"""
+    store = open_store(backend.split("+")[0], directory, size)
+    for start in range(0, size, POPULATE_BATCH):
+        store.add_entries([make_entry(n, entry_bytes) for n in range(start, min(size, start + POPULATE_BATCH))])
+    close_store(store)
+
+
+class Measurement:
+    """Latency, allocation and write samples of one operation"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.latencies_us: List[float] = []
+        self.allocations: List[int] = []
+        self.written: List[float] = []
+
+    def time(self, call: Callable, count: int):
+        """Time ``count`` calls and record bytes written per call"""
+        before = written_bytes()
+        size_before = directory_size(self.directory) if before is None else 0
+        for _ in range(count):
+            start = time.perf_counter_ns()
+            call()
+            self.latencies_us.append((time.perf_counter_ns() - start) / 1000)
+        after = written_bytes()
+        total = after - before if before is not None else max(0, directory_size(self.directory) - size_before)
+        self.written.append(total / count)
+
+    def allocate(self, call: Callable, count: int):
+        """Record the peak traced allocation of ``count`` calls"""
+        tracemalloc.start()
+        try:
+            for _ in range(count):
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                call()
+                self.allocations.append(tracemalloc.get_traced_memory()[1] - current)
+        finally:
+            tracemalloc.stop()
+
+    def report(self) -> dict:
+        """Summary of the samples"""
+        values = sorted(self.latencies_us)
+        return {
+            "samples": len(values),
+            "p50_us": round(statistics.median(values), 2) if values else None,
+            "p99_us": round(values[max(0, int(round(0.99 * len(values))) - 1)], 2) if values else None,
+            "mean_us": round(statistics.fmean(values), 2) if values else None,
+            "alloc_bytes": int(statistics.fmean(self.allocations)) if self.allocations else None,
+            "written_bytes": int(statistics.fmean(self.written)) if self.written else None,
+        }
+
+
+def bench_store(backend: str, size: int, entry_bytes: int, args) -> Dict[str, dict]:
+    """Measure every operation on one backend at one history and entry size"""
+    directory = tempfile.mkdtemp(prefix="bench-memory-", dir=args.tmpdir)
+    try:
+        populate(directory, backend, size, entry_bytes)
+        return asyncio.run(_bench_operations(backend, directory, size, entry_bytes, args))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def _bench_operations(backend: str, directory: str, size: int, entry_bytes: int, args) -> Dict[str, dict]:
+    """Run the operations on a populated store (write-behind needs a running loop)"""
+    results: Dict[str, Measurement] = {}
+    write_behind = backend.endswith("write-behind")
+
+    def measure(name: str) -> Measurement:
+        return results.setdefault(name, Measurement(directory))
+
+    def cold_read():
+        store = open_store(backend, directory, size)
+        store.get_recent(10, CONVERSATION)
+        close_store(store)
+
+    cold = measure("get_recent_cold")
+    cold.time(cold_read, args.cold_iterations)
+    cold.allocate(cold_read, 1)
+
+    memory = open_store(backend, directory, size)
+    if write_behind:
+        await memory.start()
+    content = make_entry(0, entry_bytes).content
+
+    def add():
+        memory.add_entry("user", content, conversation_id=CONVERSATION)
+
+    add_entry = measure("add_entry")
+    add_entry.time(add, args.iterations)
+    if write_behind:
+        # Everything queued above goes out in one batch; report it per entry
+        flush = measure("flush")
+        before = written_bytes()
+        start = time.perf_counter_ns()
+        await memory.flush()
+        flush.latencies_us.append((time.perf_counter_ns() - start) / 1000 / args.iterations)
+        after = written_bytes()
+        if before is not None:
+            flush.written.append((after - before) / args.iterations)
+    add_entry.allocate(add, args.alloc_iterations)
+    if write_behind:
+        await memory.flush()
+
+    # Load the store's in-memory copy so the reads below measure steady state
+    memory.get_recent(10, CONVERSATION)
+    measure("get_recent").time(lambda: memory.get_recent(10, CONVERSATION), args.iterations)
+    measure("get_recent").allocate(lambda: memory.get_recent(10, CONVERSATION), args.alloc_iterations)
+    measure("get_context").time(lambda: memory.get_context(5, CONVERSATION), args.iterations)
+    measure("get_context").allocate(lambda: memory.get_context(5, CONVERSATION), args.alloc_iterations)
+
+    measure("clear").time(lambda: memory.clear(CONVERSATION), 1)
+
+    if write_behind:
+        await memory.stop()
+    close_store(memory)
+    return {name: m.report() for name, m in results.items()}
+
+
+def check_budgets(runs: List[dict], budgets: dict) -> List[str]:
+    """Describe every operation that exceeded its budget"""
+    failures = []
+    for run in runs:
+        label = f"{run['backend']} size={run['size']} entry_bytes={run['entry_bytes']}"
+        for operation, result in run["operations"].items():
+            budget = budgets.get(operation, {})
+            if budget.get("p99_us") is not None and result["p99_us"] > budget["p99_us"]:
+                failures.append(f"{label} {operation}: p99 {result['p99_us']}us > {budget['p99_us']}us")
+            for key in ("alloc_bytes", "written_bytes"):
+                if budget.get(key) is None or result[key] is None:
+                    continue
+                fixed, per_byte = budget[key]
+                limit = fixed + per_byte * run["entry_bytes"]
+                if result[key] > limit:
+                    failures.append(f"{label} {operation}: {key} {result[key]} > {limit}")
+    return failures
+
+
+def compare(runs: List[dict], baseline: dict, max_regression: float) -> List[str]:
+    """Describe p99 regressions against a baseline result"""
+    previous = {
+        (run["backend"], run["size"], run["entry_bytes"]): run["operations"] for run in baseline.get("runs", [])
+    }
+    regressions = []
+    for run in runs:
+        base = previous.get((run["backend"], run["size"], run["entry_bytes"]), {})
+        for operation, result in run["operations"].items():
+            before = base.get(operation, {}).get("p99_us")
+            if before and result["p99_us"] > before * (1 + max_regression):
+                regressions.append(
+                    f"{run['backend']} size={run['size']} entry_bytes={run['entry_bytes']} {operation}: "
+                    f"p99 {result['p99_us']}us vs {before}us"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backends")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated history sizes")
+    parser.add_argument("--entry-bytes", default="200,4000", help="Comma-separated entry content sizes")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per operation")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="Calls traced for allocations")
+    parser.add_argument("--cold-iterations", type=int, default=5, help="Freshly opened stores for cold reads")
+    parser.add_argument("--budgets", help="JSON file of per-operation budgets, replacing the defaults")
+    parser.add_argument("--tmpdir", help="Directory for the synthetic stores (defaults to the system temp dir)")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--compare", help="Baseline result JSON to check for p99 regressions")
+    parser.add_argument("--max-regression", type=float, default=0.5, help="Allowed p99 increase over the baseline")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Unknown backends: {', '.join(sorted(unknown))}")
+    budgets = DEFAULT_BUDGETS
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+
+    runs = []
+    for backend in backends:
+        for size in (int(s) for s in args.sizes.split(",")):
+            for entry_bytes in (int(b) for b in args.entry_bytes.split(",")):
+                runs.append({
+                    "backend": backend,
+                    "size": size,
+                    "entry_bytes": entry_bytes,
+                    "operations": bench_store(backend, size, entry_bytes, args),
+                })
+
+    failures = check_budgets(runs, budgets)
+    if args.compare:
+        with open(args.compare) as f:
+            failures += compare(runs, json.load(f), args.max_regression)
+
+    result = {
+        "iterations": args.iterations,
+        "budgets": budgets,
+        "runs": runs,
+        "failures": failures,
+        "passed": not failures,
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
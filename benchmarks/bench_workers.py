@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+Throughput benchmark: how the server scales with worker processes.
+
+Starts the mock provider server (``mock_providers.py``), then for each
+worker count runs ``main.py --workers N`` against it with memory in a
+temporary directory, and drives ``/api/chat`` from several client
+processes with a fixed number of requests in flight for a fixed time.
+Every request uses its own text so coalescing and caching don't apply,
+and goes to one of a few conversations so the workers share memory logs.
+
+The run fails if throughput at the largest worker count is below
+``--min-efficiency`` times the ideal, which is the single-worker
+throughput multiplied by the worker count (capped at the CPU count).
+
+Usage:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --duration 10 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    """Poll a URL until it answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    """Stop a server and its worker processes"""
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def client_loop(url: str, concurrency: int, duration: float, client_id: int) -> list:
+    """Keep ``concurrency`` chat requests in flight; return (ok, latency) pairs"""
+    results = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def one_slot(slot: int):
+            n = 0
+            while time.monotonic() < deadline:
+                n += 1
+                payload = {
+                    "messages": [{"role": "user", "content": f"bench {client_id}-{slot}-{n}"}],
+                    "model": "ollama",
+                    "conversation_id": f"bench-{slot % 8}",
+                }
+                start = time.monotonic()
+                try:
+                    response = await client.post(url, json=payload)
+                    ok = response.status_code == 200 and not response.json().get("error")
+                except httpx.HTTPError:
+                    ok = False
+                results.append((ok, time.monotonic() - start))
+
+        await asyncio.gather(*(one_slot(slot) for slot in range(concurrency)))
+    return results
+
+
+def client_process(args: tuple) -> list:
+    """Entry point of one load generating process"""
+    url, concurrency, duration, client_id = args
+    return asyncio.run(client_loop(url, concurrency, duration, client_id))
+
+
+def measure(workers: int, args, provider_url: str, data_dir: str) -> dict:
+    """Run the server with a worker count and measure its throughput"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update(
+        API_HOST="127.0.0.1",
+        API_PORT=str(port),
+        API_DEBUG="false",
+        OPENAI_API_KEY="",
+        ANTHROPIC_API_KEY="",
+        GOOGLE_API_KEY="",
+        DEFAULT_MODEL="ollama",
+        OLLAMA_BASE_URL=provider_url,
+        MEMORY_FILE=os.path.join(data_dir, f"w{workers}", "memory.json"),
+        MEMORY_DB_FILE=os.path.join(data_dir, f"w{workers}", "memory.db"),
+        JOBS_DB_FILE=os.path.join(data_dir, f"w{workers}", "jobs.db"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{port}/health")
+        url = f"http://127.0.0.1:{port}/api/chat"
+        # Warm every worker's connections and provider clients
+        client_process((url, args.concurrency, 1.0, -1))
+
+        per_client = max(1, args.concurrency // args.clients)
+        jobs = [(url, per_client, args.duration, i) for i in range(args.clients)]
+        with multiprocessing.Pool(args.clients) as pool:
+            results = [r for batch in pool.map(client_process, jobs) for r in batch]
+    finally:
+        stop(server)
+
+    ok = [latency for success, latency in results if success]
+    ok_ms = sorted(latency * 1000 for latency in ok)
+    return {
+        "workers": workers,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "rps": round(len(ok) / args.duration, 1),
+        "p50_ms": round(statistics.median(ok_ms), 3) if ok_ms else None,
+        "p99_ms": round(ok_ms[max(0, int(len(ok_ms) * 0.99) - 1)], 3) if ok_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per worker count")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests kept in flight")
+    parser.add_argument("--clients", type=int, default=2, help="Load generating processes")
+    parser.add_argument("--provider-delay-ms", type=float, default=5.0, help="Mock provider response delay")
+    parser.add_argument("--min-efficiency", type=float, default=0.6, help="Required share of ideal scaling")
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    provider_port = free_port()
+    provider = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "benchmarks", "mock_providers.py"),
+         "--port", str(provider_port), "--latency-ms", str(args.provider_delay_ms)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        provider_url = f"http://127.0.0.1:{provider_port}"
+        wait_ready(provider_url)
+        with tempfile.TemporaryDirectory() as data_dir:
+            runs = [measure(n, args, provider_url, data_dir) for n in worker_counts]
+    finally:
+        stop(provider)
+
+    cpus = os.cpu_count() or 1
+    base = runs[0]["rps"] / worker_counts[0]
+    for run in runs:
+        ideal = base * min(run["workers"], cpus)
+        run["scaling_efficiency"] = round(run["rps"] / ideal, 3) if ideal else 0.0
+
+    result = {
+        "cpus": cpus,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "provider_delay_ms": args.provider_delay_ms,
+        "runs": runs,
+        "min_efficiency": args.min_efficiency,
+        "passed": runs[-1]["scaling_efficiency"] >= args.min_efficiency and all(r["errors"] == 0 for r in runs),
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
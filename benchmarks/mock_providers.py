@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+"""
+Mock model provider server for benchmarks.
+
+Speaks enough of four provider protocols for the app's adapters to work
+against it unchanged:
+
+    OpenAI     POST /v1/chat/completions (JSON or SSE), POST /v1/embeddings
+    Anthropic  POST /v1/messages (JSON or SSE)
+    Gemini     POST /v1beta/models/{model}:generateContent,
+               :streamGenerateContent, :embedContent, :batchEmbedContents (REST)
+    Ollama     POST /api/generate (JSON or NDJSON), POST /api/embeddings
+
+Every response waits ``--latency-ms`` (plus up to ``--jitter-ms``) before
+its first byte, then produces ``--output-tokens`` tokens (capped by the
+request's max tokens) at ``--tokens-per-second``; non-streaming responses
+are sent once all tokens would have been generated. ``--error-rate``
+injects failures with ``--error-status`` in each protocol's error format.
+Injected errors carry ``x-should-retry: false`` so the OpenAI and Anthropic
+SDKs report them instead of retrying, unless ``--allow-retries`` is given.
+
+Point the app at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:11500/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:11500
+    GOOGLE_BASE_URL=http://127.0.0.1:11500 OLLAMA_BASE_URL=http://127.0.0.1:11500
+
+Usage:
+    python benchmarks/mock_providers.py --port 11500 --latency-ms 50 --tokens-per-second 200
+    python benchmarks/mock_providers.py --error-rate 0.05 --error-status 429
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Optional
+
+import uvicorn
+
+WORDS = "the quick brown fox jumps over a lazy dog while mock tokens stream back to the benchmark".split()
+
+GEMINI_PATH = re.compile(r"^/v1beta/models/(?P<model>[^:/]+):(?P<method>[A-Za-z]+)$")
+
+
+async def read_body(receive) -> bytes:
+    """Read a complete request body"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, payload, status: int = 200, headers: Optional[list] = None):
+    """Send a JSON response"""
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def start_stream(send, content_type: bytes):
+    """Start a chunked streaming response"""
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+
+
+async def send_chunk(send, data: str, more: bool = True):
+    """Send one piece of a streaming response"""
+    await send({"type": "http.response.body", "body": data.encode("utf-8"), "more_body": more})
+
+
+def sse(payload: dict, event: Optional[str] = None) -> str:
+    """One Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+class MockBehaviour:
+    """Latency, token rate and error injection shared by every protocol"""
+
+    def __init__(self, latency: float, jitter: float, tokens_per_second: float, output_tokens: int,
+                 error_rate: float, error_status: int, allow_retries: bool, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.allow_retries = allow_retries
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def tokens(self, max_tokens: Optional[int]) -> list:
+        """Words of one response"""
+        count = min(self.output_tokens, max_tokens) if max_tokens else self.output_tokens
+        return [WORDS[i % len(WORDS)] if i == 0 else " " + WORDS[i % len(WORDS)] for i in range(max(1, count))]
+
+    async def first_byte(self):
+        """Wait for the time to first byte"""
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def next_token(self):
+        """Wait for the next streamed token"""
+        if self.token_interval:
+            await asyncio.sleep(self.token_interval)
+
+    async def generate(self, tokens: list):
+        """Wait as long as generating a whole non-streamed response takes"""
+        await self.first_byte()
+        if self.token_interval:
+            await asyncio.sleep(self.token_interval * len(tokens))
+
+    def should_fail(self) -> bool:
+        """Decide whether to inject an error into this request"""
+        self.requests += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def error_headers(self) -> list:
+        headers = [] if self.allow_retries else [(b"x-should-retry", b"false")]
+        if self.error_status == 429:
+            headers.append((b"retry-after", b"1"))
+        return headers
+
+
+def prompt_tokens(text: str) -> int:
+    """Rough prompt token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+def create_app(behaviour: MockBehaviour):
+    """
+    Build the mock provider ASGI app.
+
+    Args:
+        behaviour: Latency, token rate and error settings
+    """
+
+    async def fail(send, payload: dict):
+        await behaviour.first_byte()
+        await send_json(send, payload, status=behaviour.error_status, headers=behaviour.error_headers())
+
+    # OpenAI
+
+    async def openai_chat(request: dict, send, _):
+        if behaviour.should_fail():
+            await fail(send, {"error": {"message": "Injected mock error", "type": "server_error", "code": None}})
+            return
+        model = request.get("model", "mock")
+        tokens = behaviour.tokens(request.get("max_tokens"))
+        prompt = prompt_tokens(json.dumps(request.get("messages", [])))
+        usage = {"prompt_tokens": prompt, "completion_tokens": len(tokens), "total_tokens": prompt + len(tokens)}
+        base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": model}
+
+        if not request.get("stream"):
+            await behaviour.generate(tokens)
+            await send_json(send, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        await behaviour.first_byte()
+        await start_stream(send, b"text/event-stream")
+        chunk = {**base, "object": "chat.completion.chunk"}
+        for i, token in enumerate(tokens):
+            if i:
+                await behaviour.next_token()
+            delta = {"content": token, **({"role": "assistant"} if i == 0 else {})}
+            await send_chunk(send, sse({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+        await send_chunk(send, sse({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await send_chunk(send, sse({**chunk, "choices": [], "usage": usage}))
+        await send_chunk(send, "data: [DONE]\n\n", more=False)
+
+    async def openai_embeddings(request: dict, send, _):
+        if behaviour.should_fail():
+            await fail(send, {"error": {"message": "Injected mock error", "type": "server_error", "code": None}})
+            return
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        await behaviour.first_byte()
+        tokens = sum(prompt_tokens(str(text)) for text in inputs)
+        await send_json(send, {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": embedding(str(text))}
+                     for i, text in enumerate(inputs)],
+            "model": request.get("model", "mock"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    # Anthropic
+
+    async def anthropic_messages(request: dict, send, _):
+        if behaviour.should_fail():
+            await fail(send, {"type": "error", "error": {"type": "api_error", "message": "Injected mock error"}})
+            return
+        model = request.get("model", "mock")
+        tokens = behaviour.tokens(request.get("max_tokens"))
+        prompt = prompt_tokens(json.dumps([request.get("system"), request.get("messages", [])]))
+        message = {"id": "msg_mock", "type": "message", "role": "assistant", "model": model,
+                   "stop_sequence": None}
+
+        if not request.get("stream"):
+            await behaviour.generate(tokens)
+            await send_json(send, {
+                **message,
+                "content": [{"type": "text", "text": "".join(tokens)}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": prompt, "output_tokens": len(tokens)},
+            })
+            return
+
+        await behaviour.first_byte()
+        await start_stream(send, b"text/event-stream")
+        start = {**message, "content": [], "stop_reason": None, "usage": {"input_tokens": prompt, "output_tokens": 1}}
+        await send_chunk(send, sse({"type": "message_start", "message": start}, "message_start"))
+        await send_chunk(send, sse({"type": "content_block_start", "index": 0,
+                                    "content_block": {"type": "text", "text": ""}}, "content_block_start"))
+        for i, token in enumerate(tokens):
+            if i:
+                await behaviour.next_token()
+            await send_chunk(send, sse({"type": "content_block_delta", "index": 0,
+                                        "delta": {"type": "text_delta", "text": token}}, "content_block_delta"))
+        await send_chunk(send, sse({"type": "content_block_stop", "index": 0}, "content_block_stop"))
+        await send_chunk(send, sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                    "usage": {"output_tokens": len(tokens)}}, "message_delta"))
+        await send_chunk(send, sse({"type": "message_stop"}, "message_stop"), more=False)
+
+    # Gemini (REST)
+
+    def gemini_error() -> dict:
+        return {"error": {"code": behaviour.error_status, "message": "Injected mock error", "status": "INTERNAL"}}
+
+    def gemini_candidate(text: str, finish: Optional[str]) -> dict:
+        candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finish:
+            candidate["finishReason"] = finish
+        return candidate
+
+    async def gemini(request: dict, send, match):
+        method = match.group("method")
+        if behaviour.should_fail():
+            await fail(send, gemini_error())
+            return
+
+        if method in ("embedContent", "batchEmbedContents"):
+            await behaviour.first_byte()
+            requests = request.get("requests", [request])
+            texts = ["".join(p.get("text", "") for p in r.get("content", {}).get("parts", [])) for r in requests]
+            embeddings = [{"values": embedding(text)} for text in texts]
+            if method == "embedContent":
+                await send_json(send, {"embedding": embeddings[0]})
+            else:
+                await send_json(send, {"embeddings": embeddings})
+            return
+
+        max_tokens = (request.get("generationConfig") or {}).get("maxOutputTokens")
+        tokens = behaviour.tokens(max_tokens)
+        prompt = prompt_tokens(json.dumps(request.get("contents", [])))
+        usage = {"promptTokenCount": prompt, "candidatesTokenCount": len(tokens),
+                 "totalTokenCount": prompt + len(tokens)}
+
+        if method == "generateContent":
+            await behaviour.generate(tokens)
+            await send_json(send, {"candidates": [gemini_candidate("".join(tokens), "STOP")], "usageMetadata": usage})
+            return
+
+        # streamGenerateContent: a JSON array sent one element at a time, or SSE with alt=sse
+        as_sse = b"alt=sse" in match.string_query
+        await behaviour.first_byte()
+        await start_stream(send, b"text/event-stream" if as_sse else b"application/json")
+        if not as_sse:
+            await send_chunk(send, "[")
+        for i, token in enumerate(tokens):
+            if i:
+                await behaviour.next_token()
+            last = i == len(tokens) - 1
+            element = {"candidates": [gemini_candidate(token, "STOP" if last else None)]}
+            if last:
+                element["usageMetadata"] = usage
+            if as_sse:
+                await send_chunk(send, sse(element))
+            else:
+                await send_chunk(send, ("," if i else "") + json.dumps(element) + "\n")
+        await send_chunk(send, "" if as_sse else "]", more=False)
+
+    # Ollama
+
+    async def ollama_generate(request: dict, send, _):
+        if behaviour.should_fail():
+            await fail(send, {"error": "Injected mock error"})
+            return
+        tokens = behaviour.tokens((request.get("options") or {}).get("num_predict"))
+        if not request.get("stream", True):
+            await behaviour.generate(tokens)
+            await send_json(send, {"model": request.get("model"), "response": "".join(tokens), "done": True,
+                                   "eval_count": len(tokens)})
+            return
+
+        await behaviour.first_byte()
+        await start_stream(send, b"application/x-ndjson")
+        for i, token in enumerate(tokens):
+            if i:
+                await behaviour.next_token()
+            await send_chunk(send, json.dumps({"response": token, "done": False}) + "\n")
+        await send_chunk(send, json.dumps({"response": "", "done": True, "eval_count": len(tokens)}) + "\n", more=False)
+
+    async def ollama_embeddings(request: dict, send, _):
+        if behaviour.should_fail():
+            await fail(send, {"error": "Injected mock error"})
+            return
+        await behaviour.first_byte()
+        await send_json(send, {"embedding": embedding(request.get("prompt", ""))})
+
+    async def stats(request: dict, send, _):
+        await send_json(send, {"requests": behaviour.requests, "errors": behaviour.errors})
+
+    routes = {
+        ("POST", "/v1/chat/completions"): openai_chat,
+        ("POST", "/v1/embeddings"): openai_embeddings,
+        ("POST", "/v1/messages"): anthropic_messages,
+        ("POST", "/api/generate"): ollama_generate,
+        ("POST", "/api/embeddings"): ollama_embeddings,
+        ("GET", "/stats"): stats,
+    }
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        handler = routes.get((method, path))
+        match = None
+        if handler is None and method == "POST":
+            gemini_match = GEMINI_PATH.match(path)
+            if gemini_match is not None:
+                handler = gemini
+                match = _Match(gemini_match, scope.get("query_string", b""))
+        body = await read_body(receive)
+        if handler is None:
+            await send_json(send, {"error": f"No mock for {method} {path}"}, status=404)
+            return
+        try:
+            request = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            await send_json(send, {"error": "Invalid JSON"}, status=400)
+            return
+        await handler(request, send, match)
+
+    return app
+
+
+def embedding(text: str) -> list:
+    """A small deterministic vector for a text"""
+    return [len(text) / 100, (hash(text) % 1000) / 1000, 0.25]
+
+
+class _Match:
+    """A regex match plus the request's query string"""
+
+    def __init__(self, match, query: bytes):
+        self._match = match
+        self.string_query = query
+
+    def group(self, name: str) -> str:
+        return self._match.group(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Time to first byte of every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this much")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation rate; 0 is instant")
+    parser.add_argument("--output-tokens", type=int, default=20, help="Tokens per response, capped by max tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--allow-retries", action="store_true", help="Let SDKs retry injected failures")
+    parser.add_argument("--seed", type=int, help="Random seed for jitter and error injection")
+    args = parser.parse_args()
+
+    behaviour = MockBehaviour(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        allow_retries=args.allow_retries,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(behaviour), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
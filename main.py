@@ -1,6 +1,8 @@
 """Main entry point for the AI Assistant FastAPI server"""
 
-import uvicorn
+import argparse
+import os
+
 from src.backend import create_app
 from src.config import get_settings
 
@@ -8,13 +10,34 @@ from src.config import get_settings
 app = create_app()
 
 if __name__ == "__main__":
-    settings = get_settings()
-
-    # Run server
-    uvicorn.run(
-        "main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=settings.api_debug,
-        log_level="info",
+    parser = argparse.ArgumentParser(description="Run the AI Assistant server")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print an import-time breakdown of app import and startup instead of serving",
     )
+    parser.add_argument("--top", type=int, default=15, help="Rows per section of the startup profile")
+    parser.add_argument("--workers", type=int, help="Server processes (default: API_WORKERS)")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from src.backend.profiling import format_profile, profile_startup
+
+        print(format_profile(profile_startup(), args.top))
+    else:
+        import uvicorn
+
+        settings = get_settings()
+        workers = args.workers or settings.api_workers
+        # Workers import main on their own and split the concurrency limits by API_WORKERS
+        os.environ["API_WORKERS"] = str(workers)
+
+        # Run server; reload mode always runs a single process
+        uvicorn.run(
+            "main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=settings.api_debug,
+            workers=None if settings.api_debug else workers,
+            log_level="info",
+        )
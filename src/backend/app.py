@@ -1,13 +1,37 @@
 """FastAPI application factory and configuration"""
 
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
-from .routes import chat_routes
+from src.observability import CONTENT_TYPE, REGISTRY, MetricsMiddleware, TracingMiddleware
+from src.observability.diagnostics import DiagnosticsMiddleware
+from .routes import chat_routes, debug_routes, job_routes, ws_routes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services with the application"""
+    diagnostics = chat_routes.settings.diagnostics_enabled
+    if diagnostics:
+        # First, so stalls during the rest of startup are reported too
+        await debug_routes.watchdog.start()
+    await chat_routes.startup()
+    if chat_routes.settings.jobs_enabled:
+        await job_routes.startup()
+    try:
+        yield
+    finally:
+        # Workers first, so no job is running when the router and memory store close
+        if chat_routes.settings.jobs_enabled:
+            await job_routes.shutdown()
+        await chat_routes.shutdown()
+        if diagnostics:
+            await debug_routes.watchdog.stop()
 
 
 def create_app() -> FastAPI:
@@ -17,6 +41,7 @@ def create_app() -> FastAPI:
         title="Private AI Assistant",
         description="A modular AI assistant with multi-model support",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
     # Add CORS middleware
@@ -28,13 +53,37 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Time every request; added last so it also covers the CORS middleware
+    if chat_routes.settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+    # Open a server span per request; the tracer itself is set up on startup
+    if chat_routes.settings.tracing_enabled:
+        app.add_middleware(TracingMiddleware)
+    # Name the requests in flight when the event loop stalls
+    if chat_routes.settings.diagnostics_enabled:
+        app.add_middleware(DiagnosticsMiddleware, watchdog=debug_routes.watchdog)
+
     # Include routers
     app.include_router(chat_routes.router)
+    app.include_router(ws_routes.router)
+    if chat_routes.settings.jobs_enabled:
+        app.include_router(job_routes.router)
+    if chat_routes.settings.diagnostics_enabled:
+        app.include_router(debug_routes.router)
 
     # Health check endpoint
     @app.get("/health")
     async def health_check():
-        return {"status": "healthy"}
+        providers = chat_routes.get_router().get_health()
+        degraded = any(p["state"] != "closed" for p in providers.values())
+        return {"status": "degraded" if degraded else "healthy", "providers": providers}
+
+    # Prometheus scrape endpoint
+    if chat_routes.settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
     # Mount static files for UI
     ui_path = Path(__file__).parent.parent.parent / "ui"
@@ -52,7 +101,12 @@ def create_app() -> FastAPI:
             "version": "1.0.0",
             "endpoints": {
                 "health": "/health",
+                "metrics": "/metrics",
                 "chat": "/api/chat",
+                "chat_stream": "/api/chat/stream",
+                "chat_batch": "/api/chat/batch",
+                "websocket": "/api/ws",
+                "jobs": "/api/jobs",
                 "models": "/api/models",
                 "ui": "/ui/index.html",
             },
@@ -0,0 +1,164 @@
+"""Cold start profiling of the FastAPI application"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Settings naming the files the app reads and writes, and their names in a scratch data directory
+DATA_FILE_SETTINGS = {
+    "MEMORY_FILE": "memory.json",
+    "MEMORY_DB_FILE": "memory.db",
+    "JOBS_DB_FILE": "jobs.db",
+    "TRACING_FILE": "traces.jsonl",
+}
+
+# Written to stderr between phases so import times can be attributed to them
+PHASE_MARKER = "import time: -- phase "
+
+# Runs in a fresh interpreter: import the app, then run its lifespan startup and shutdown
+_PROBE = f"""
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+sys.stderr.write("{PHASE_MARKER}startup\\n")
+
+async def lifespan():
+    async with main.app.router.lifespan_context(main.app):
+        started = time.perf_counter()
+    return started
+
+started = asyncio.run(lifespan())
+stopped = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "startup_s": started - imported,
+    "shutdown_s": stopped - started,
+}}))
+"""
+
+
+def parse_importtime(output: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Parse ``python -X importtime`` output.
+
+    Args:
+        output: The interpreter's stderr, with phase markers
+
+    Returns:
+        Phase name -> modules imported in that phase, each with its own
+        and cumulative import time in seconds and its nesting depth
+    """
+    phases: Dict[str, List[Dict[str, Any]]] = {"import": []}
+    current = phases["import"]
+    for line in output.splitlines():
+        if line.startswith(PHASE_MARKER):
+            current = phases.setdefault(line[len(PHASE_MARKER):].strip(), [])
+            continue
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        current.append({
+            "module": module,
+            "self_s": int(parts[0]) / 1e6,
+            "cumulative_s": int(parts[1]) / 1e6,
+            "depth": (len(name) - len(module) - 1) // 2,
+        })
+    return phases
+
+
+def isolated_env(data_dir: str, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Environment running the app against a scratch data directory.
+
+    Startup opens the memory store and starts the job workers, which would
+    otherwise claim jobs queued in the real ``data/jobs.db``.
+
+    Args:
+        data_dir: Directory for memory, job, trace and disk cache files
+        base: Environment to start from, defaulting to this process's
+
+    Returns:
+        The environment with every data file setting pointing into ``data_dir``
+    """
+    env = dict(os.environ if base is None else base)
+    env.update({name: os.path.join(data_dir, file) for name, file in DATA_FILE_SETTINGS.items()})
+    if env.get("RESPONSE_CACHE_DB_FILE"):
+        env["RESPONSE_CACHE_DB_FILE"] = os.path.join(data_dir, "response_cache.db")
+    return env
+
+
+def profile_startup(importtime: bool = True, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Import the app and run its startup and shutdown in a fresh interpreter.
+
+    Args:
+        importtime: Record per-module import times (adds some overhead)
+        env: Environment of the interpreter, defaulting to this process's
+            with its data files in a temporary directory
+
+    Returns:
+        Phase timings in seconds, plus parsed import times when requested
+    """
+    if env is None:
+        with tempfile.TemporaryDirectory() as data_dir:
+            return profile_startup(importtime, isolated_env(data_dir))
+
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    result = subprocess.run(
+        command + ["-c", _PROBE],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-4000:]}")
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        profile["imports"] = parse_importtime(result.stderr)
+    return profile
+
+
+def format_profile(profile: Dict[str, Any], top: int = 15) -> str:
+    """
+    Render a startup profile as text.
+
+    Shows the time of each phase, then per phase the packages that spent
+    the most time importing and the slowest top-level imports.
+    """
+    lines = [
+        f"import app     {profile['import_s'] * 1000:9.1f} ms",
+        f"startup        {profile['startup_s'] * 1000:9.1f} ms",
+        f"shutdown       {profile['shutdown_s'] * 1000:9.1f} ms",
+    ]
+    for phase, modules in profile.get("imports", {}).items():
+        if not modules:
+            continue
+        packages: Dict[str, float] = {}
+        for module in modules:
+            package = module["module"].split(".")[0]
+            packages[package] = packages.get(package, 0.0) + module["self_s"]
+        total = sum(packages.values())
+
+        lines += ["", f"{phase} phase: {len(modules)} modules, {total * 1000:.1f} ms importing", "  by package:"]
+        for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"    {seconds * 1000:9.1f} ms  {package}")
+        lines.append("  slowest top-level imports (cumulative):")
+        roots = sorted((m for m in modules if m["depth"] == 0), key=lambda m: -m["cumulative_s"])
+        for module in roots[:top]:
+            lines.append(f"    {module['cumulative_s'] * 1000:9.1f} ms  {module['module']}")
+    return "\n".join(lines)
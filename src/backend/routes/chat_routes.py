@@ -1,15 +1,27 @@
 """Chat API routes"""
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+import asyncio
+import json
+import logging
+import math
+import time
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional
 
 from src.config import get_settings
-from src.models import ModelRouter
-from src.memory import JSONMemory
+from src.models import ModelRouter, RequestCoalescer, background_traffic, create_response_cache, provider_specs
+from src.memory import ConversationEntry, create_memory, WriteBehindMemory
+from src.observability import metrics, tracing
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+# Conversation IDs name memory shards, so only allow file-name-safe characters
+CONVERSATION_ID_PATTERN = r"^[A-Za-z0-9_-]{1,128}$"
+
 # Request/Response models
 class Message(BaseModel):
     """Message model for API"""
@@ -23,6 +35,8 @@ class ChatRequest(BaseModel):
     model: Optional[str] = None
     temperature: float = 0.7
     max_tokens: int = 2000
+    conversation_id: Optional[str] = Field(default=None, pattern=CONVERSATION_ID_PATTERN)
+    hedge: Optional[bool] = None  # None uses HEDGE_ENABLED
 
 
 class ChatResponse(BaseModel):
@@ -30,20 +44,189 @@ class ChatResponse(BaseModel):
     model: str
     content: str
     usage: Optional[dict] = None
+    hedge: Optional[dict] = None
     error: Optional[str] = None
 
 
-# Initialize router and memory
+class BatchChatRequest(BaseModel):
+    """Batch of independent chat requests"""
+    requests: List[ChatRequest] = Field(min_length=1)
+    max_concurrency: Optional[int] = Field(default=None, ge=1)  # None uses BATCH_MAX_CONCURRENCY
+
+
+# Settings are cheap to load; the router, response cache and memory store are
+# built by startup() or on first use so that importing the app stays fast
 settings = get_settings()
-model_config = {
-    "default_model": settings.default_model,
-    "openai": settings.get_model_config("openai"),
-    "anthropic": settings.get_model_config("anthropic"),
-    "google": settings.get_model_config("google"),
-    "ollama": settings.get_model_config("ollama"),
-}
-router_instance = ModelRouter(model_config)
-memory = JSONMemory(settings.memory_file, settings.max_memory_entries)
+_router: Optional[ModelRouter] = None
+_response_cache = None
+_memory = None
+_loop_lag = metrics.LoopLagMonitor()
+
+
+def build_model_config() -> dict:
+    """Collect the ModelRouter configuration from settings"""
+    model_config = {
+        "default_model": settings.default_model,
+        "openai": settings.get_model_config("openai"),
+        "anthropic": settings.get_model_config("anthropic"),
+        "google": settings.get_model_config("google"),
+        "ollama": settings.get_model_config("ollama"),
+        "http": settings.get_http_config(),
+        "routing": settings.get_routing_config(),
+        "hedging": settings.get_hedging_config(),
+        "limits": settings.get_limits_config(),
+        "context": settings.get_context_config(),
+        "prompt_cache": settings.get_prompt_cache_config(),
+        "providers": settings.model_providers,
+    }
+    for provider_name in provider_specs(settings.model_providers):
+        model_config.setdefault(provider_name, settings.get_model_config(provider_name))
+    return model_config
+
+
+def get_router() -> ModelRouter:
+    """Get the shared model router, creating it on first use"""
+    global _router, _response_cache
+    if _router is None:
+        _response_cache = create_response_cache(settings)
+        _router = ModelRouter(
+            build_model_config(),
+            cache=_response_cache,
+            coalescer=RequestCoalescer() if settings.coalesce_requests else None,
+        )
+    return _router
+
+
+def get_memory_store():
+    """Get the shared memory store, creating it on first use"""
+    global _memory
+    if _memory is None:
+        _memory = create_memory(settings)
+    return _memory
+
+
+async def startup():
+    """Create the router and memory store and start their background services"""
+    tracer = tracing.configure(settings.get_tracing_config())
+    if tracer is not None:
+        await tracer.start()
+    if settings.metrics_enabled:
+        _loop_lag.start()
+    router_instance = get_router()
+    if settings.provider_warmup:
+        await router_instance.startup()
+    memory = get_memory_store()
+    if isinstance(memory, WriteBehindMemory):
+        await memory.start()
+
+
+async def shutdown():
+    """Stop background services, flushing queued memory writes"""
+    if isinstance(_memory, WriteBehindMemory):
+        await _memory.stop()
+    if _router is not None:
+        await _router.aclose()
+    if _response_cache is not None:
+        _response_cache.close()
+    await _loop_lag.stop()
+    tracer = tracing.get_tracer()
+    if tracer is not None:
+        await tracer.stop()
+
+
+def collect_metrics():
+    """Copy queue depths and counters kept by the router and memory store into the metrics"""
+    if _router is not None:
+        for provider, stats in _router.get_limiter_stats().items():
+            metrics.PROVIDER_IN_FLIGHT.set(stats["in_flight"], provider=provider)
+            metrics.PROVIDER_QUEUE_DEPTH.set(stats["queued_now"], provider=provider)
+            metrics.PROVIDER_CONCURRENCY_LIMIT.set(stats["limit"], provider=provider)
+            metrics.PROVIDER_REJECTED.set(stats["rejected"], provider=provider, reason="rejected")
+            metrics.PROVIDER_REJECTED.set(stats["timed_out"], provider=provider, reason="timed_out")
+        for provider, health in _router.get_health().items():
+            metrics.PROVIDER_HEALTH.set(health["health_score"], provider=provider)
+
+        hedge = _router.hedge_stats
+        for outcome, value in (
+            ("hedged", hedge.hedged),
+            ("not_hedged", hedge.requests - hedge.hedged),
+            ("primary_won", hedge.primary_wins),
+            ("secondary_won", hedge.secondary_wins),
+            ("failed", hedge.failed),
+        ):
+            metrics.HEDGE_REQUESTS.set(value, outcome=outcome)
+        metrics.HEDGE_WASTED.set(hedge.wasted_seconds)
+
+        for provider, counters in _router.runtime.prompt_cache_stats.providers.items():
+            for kind in ("prompt_tokens", "cached_tokens", "cache_write_tokens"):
+                metrics.PROMPT_CACHE_TOKENS.set(counters[kind], provider=provider, kind=kind[: -len("_tokens")])
+
+        if _router.coalescer is not None:
+            metrics.COALESCED_REQUESTS.set(_router.coalescer.coalesced)
+
+    if _response_cache is not None:
+        metrics.RESPONSE_CACHE_LOOKUPS.set(_response_cache.memory_hits, result="memory_hit")
+        metrics.RESPONSE_CACHE_LOOKUPS.set(_response_cache.disk_hits, result="disk_hit")
+        metrics.RESPONSE_CACHE_LOOKUPS.set(_response_cache.misses, result="miss")
+
+    if isinstance(_memory, WriteBehindMemory):
+        queue = _memory.stats()
+        metrics.MEMORY_QUEUE_DEPTH.set(queue["queue_depth"] + queue["in_flight"])
+
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+
+def to_messages(request: ChatRequest) -> List[dict]:
+    """Convert request messages to the dict format used by ModelRouter"""
+    return [{"role": msg.role, "content": msg.content} for msg in request.messages]
+
+
+def user_entry(request: ChatRequest, messages: List[dict]) -> Optional[ConversationEntry]:
+    """Memory entry for the latest user message of a request, if it ends with one"""
+    if messages and messages[-1]["role"] == "user":
+        return ConversationEntry.create(
+            role="user",
+            content=messages[-1]["content"],
+            metadata={"model_requested": request.model},
+            conversation_id=request.conversation_id,
+        )
+    return None
+
+
+def assistant_entry(
+    request: ChatRequest, content: str, usage: Optional[dict], model: Optional[str] = None
+) -> ConversationEntry:
+    """Memory entry for a model response, under the provider that produced it"""
+    return ConversationEntry.create(
+        role="assistant",
+        content=content,
+        model=model or request.model or settings.default_model,
+        metadata=usage,
+        conversation_id=request.conversation_id,
+    )
+
+
+def store_entries(entries: List[ConversationEntry], span_name: str = "memory.add_entries", **attributes):
+    """Write entries to memory in one call"""
+    start = time.perf_counter()
+    with tracing.span(span_name, **attributes):
+        get_memory_store().add_entries(entries)
+    metrics.MEMORY_OPERATION_DURATION.observe(time.perf_counter() - start, operation="write")
+
+
+def store_user_message(request: ChatRequest, messages: List[dict]):
+    """Store the latest user message of a request in memory"""
+    entry = user_entry(request, messages)
+    if entry is not None:
+        store_entries([entry], "memory.add_entry", role="user")
+
+
+def store_assistant_message(
+    request: ChatRequest, content: str, usage: Optional[dict], model: Optional[str] = None
+):
+    """Store a model response in memory, under the provider that produced it"""
+    store_entries([assistant_entry(request, content, usage, model)], "memory.add_entry", role="assistant")
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -57,70 +240,326 @@ async def chat(request: ChatRequest) -> ChatResponse:
     Returns:
         ChatResponse with model output
     """
-    try:
-        # Convert request messages to dict format
-        messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
-
-        # Store user message in memory
-        if messages:
-            last_msg = messages[-1]
-            if last_msg["role"] == "user":
-                memory.add_entry(
-                    role="user",
-                    content=last_msg["content"],
-                    metadata={"model_requested": request.model},
-                )
-
-        # Get response from router
-        response = await router_instance.chat(
+    with tracing.span("chat.handler", model=request.model, conversation_id=request.conversation_id) as span:
+        try:
+            # Convert request messages to dict format
+            messages = to_messages(request)
+
+            # Store user message in memory
+            store_user_message(request, messages)
+
+            # Get response from router
+            response = await get_router().chat(
+                messages=messages,
+                model=request.model,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                hedge=request.hedge,
+            )
+
+            # Check for errors; overloaded providers get a fast 503 with a retry hint
+            if "error" in response:
+                if "retry_after" in response:
+                    raise HTTPException(
+                        status_code=503,
+                        detail=response["error"],
+                        headers={"Retry-After": str(max(1, math.ceil(response["retry_after"])))},
+                    )
+                raise HTTPException(status_code=400, detail=response["error"])
+
+            # Store assistant response in memory
+            store_assistant_message(request, response["content"], response.get("usage"), response["model"])
+
+            return ChatResponse(
+                model=response["model"],
+                content=response["content"],
+                usage=response.get("usage"),
+                hedge=response.get("hedge"),
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            span.set_error(str(e))
+            return ChatResponse(
+                model=request.model or settings.default_model,
+                content="",
+                error=f"Error processing request: {str(e)}",
+            )
+
+
+async def chat_with_backoff(request: ChatRequest, messages: List[dict]) -> dict:
+    """
+    Run one chat request, waiting and retrying while its provider is overloaded.
+
+    Admission control answers a full queue with ``retry_after``; a batch item
+    waits that long and tries again, for up to BATCH_OVERLOAD_WAIT_SECONDS,
+    instead of failing the way an interactive request does.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.batch_overload_wait_seconds
+    while True:
+        response = await get_router().chat(
             messages=messages,
             model=request.model,
             temperature=request.temperature,
             max_tokens=request.max_tokens,
+            hedge=request.hedge,
         )
+        retry_after = response.get("retry_after")
+        if "error" not in response or retry_after is None or loop.time() + retry_after > deadline:
+            return response
+        await asyncio.sleep(retry_after)
 
-        # Check for errors
-        if "error" in response:
-            raise HTTPException(status_code=400, detail=response["error"])
-
-        # Store assistant response in memory
-        memory.add_entry(
-            role="assistant",
-            content=response["content"],
-            model=request.model or settings.default_model,
-            metadata=response.get("usage"),
-        )
 
-        return ChatResponse(
-            model=response["model"],
-            content=response["content"],
-            usage=response.get("usage"),
-        )
+def batch_error_line(index: int, request: ChatRequest, error: str, status_code: int) -> dict:
+    """Result line of a failed batch item"""
+    return {
+        "index": index,
+        "model": request.model or settings.default_model,
+        "error": error,
+        "status_code": status_code,
+    }
 
-    except HTTPException:
-        raise
+
+async def run_batch_item(
+    index: int,
+    request: ChatRequest,
+    semaphore: asyncio.Semaphore,
+    entries: List[ConversationEntry],
+    results: asyncio.Queue,
+):
+    """Run one batch item and queue exactly one result line; memory entries are collected, not written"""
+    try:
+        async with semaphore:
+            messages = to_messages(request)
+            entry = user_entry(request, messages)
+            if entry is not None:
+                entries.append(entry)
+            with background_traffic():
+                response = await chat_with_backoff(request, messages)
+
+        if "error" in response:
+            line = batch_error_line(
+                index, request, response["error"],
+                503 if "retry_after" in response else response.get("status_code") or 400,
+            )
+        else:
+            result = ChatResponse(
+                model=response["model"],
+                content=response["content"],
+                usage=response.get("usage"),
+                hedge=response.get("hedge"),
+            )
+            entries.append(assistant_entry(request, result.content, result.usage, result.model))
+            line = {"index": index, **result.model_dump(exclude_none=True)}
     except Exception as e:
-        return ChatResponse(
-            model=request.model or settings.default_model,
-            content="",
-            error=f"Error processing request: {str(e)}",
+        logger.exception("Batch item %d failed", index)
+        line = batch_error_line(index, request, f"Error processing request: {str(e)}", 500)
+    await results.put(line)
+
+
+async def run_batch(requests: List[ChatRequest], concurrency: int, results: asyncio.Queue):
+    """Run batch items concurrently, then store the memory entries of all of them in one write"""
+    entries: List[ConversationEntry] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    with tracing.span("chat.batch", items=len(requests), concurrency=concurrency):
+        try:
+            await asyncio.gather(
+                *(run_batch_item(i, r, semaphore, entries, results) for i, r in enumerate(requests))
+            )
+        finally:
+            # Also when the client went away mid-batch: keep what was answered
+            if entries:
+                try:
+                    store_entries(entries, count=len(entries))
+                except Exception:
+                    logger.exception("Failed to store %d memory entries of a chat batch", len(entries))
+
+
+@router.post("/chat/batch")
+async def chat_batch(batch: BatchChatRequest) -> StreamingResponse:
+    """
+    Run many independent chat requests concurrently.
+
+    Items go through the router like ``/chat`` requests, so provider
+    concurrency limits, fallback and caching all apply; at most
+    ``max_concurrency`` of them are in flight at once. Results stream back
+    as NDJSON in completion order, one line per item tagged with its
+    ``index`` in the batch; failed items carry ``error`` and
+    ``status_code`` instead of content. Memory entries of the whole batch
+    are written together once it finishes.
+
+    Args:
+        batch: BatchChatRequest with the requests and an optional concurrency cap
+
+    Returns:
+        application/x-ndjson response
+    """
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400, detail=f"A batch holds at most {settings.batch_max_items} requests"
         )
+    concurrency = min(batch.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+
+    async def lines() -> AsyncIterator[str]:
+        results: asyncio.Queue = asyncio.Queue()
+        runner = asyncio.create_task(run_batch(batch.requests, concurrency, results))
+        missing = set(range(len(batch.requests)))
+        try:
+            while missing and not (runner.done() and results.empty()):
+                get = asyncio.ensure_future(results.get())
+                # Stop waiting if the runner ends without posting every line
+                await asyncio.wait({get, runner}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    continue
+                line = get.result()
+                missing.discard(line["index"])
+                yield json.dumps(line) + "\n"
+
+            # Let it finish writing the batch's memory entries
+            try:
+                await runner
+            except Exception:
+                logger.exception("Chat batch failed")
+            for index in sorted(missing):
+                line = batch_error_line(index, batch.requests[index], "Batch item was not run", 500)
+                yield json.dumps(line) + "\n"
+        finally:
+            if not runner.done():
+                runner.cancel()
+                try:
+                    await runner
+                except asyncio.CancelledError:
+                    pass
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Stream a chat response as Server-Sent Events.
+
+    Emits ``delta`` events with pieces of text as the provider produces
+    them, followed by a single ``done`` or ``error`` event. The full
+    response is stored in memory once the stream completes.
+
+    Args:
+        request: ChatRequest with messages and optional model specification
+
+    Returns:
+        text/event-stream response
+    """
+    messages = to_messages(request)
+    store_user_message(request, messages)
+
+    async def event_stream() -> AsyncIterator[str]:
+        parts = []
+        async for event in get_router().stream_chat(
+            messages=messages,
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            hedge=request.hedge,
+        ):
+            if event["type"] == "delta":
+                parts.append(event["content"])
+            elif event["type"] == "done":
+                store_assistant_message(request, "".join(parts), event.get("usage"), event.get("model"))
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/models")
 async def get_available_models():
     """Get list of available models"""
-    available_models = router_instance.get_available_models()
+    available_models = get_router().get_available_models()
     return {
         "available_models": available_models,
         "default_model": settings.default_model,
     }
 
 
+@router.get("/models/connections")
+async def get_connection_stats():
+    """Get connection reuse statistics of the pooled provider clients"""
+    return {"connections": get_router().get_connection_stats()}
+
+
+@router.get("/models/coalescing")
+async def get_coalescing_stats():
+    """Get single-flight request coalescing counters"""
+    coalescer = get_router().coalescer
+    if coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **coalescer.stats()}
+
+
+@router.get("/models/hedging")
+async def get_hedging_stats():
+    """Get hedged request counters and current per-provider hedge delays"""
+    return {"enabled_by_default": settings.hedge_enabled, **get_router().get_hedge_stats()}
+
+
+@router.get("/models/limits")
+async def get_limiter_stats():
+    """Get adaptive concurrency limits and admission queue counters"""
+    return {"enabled": settings.concurrency_limit_enabled, "providers": get_router().get_limiter_stats()}
+
+
+@router.get("/models/context")
+async def get_context_stats():
+    """Get context window trimming and token counting statistics"""
+    return get_router().get_context_stats()
+
+
+@router.get("/models/prompt-cache")
+async def get_prompt_cache_stats():
+    """Get provider prompt caching counters"""
+    return get_router().get_prompt_cache_stats()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get response cache hit/miss counters"""
+    get_router()
+    if _response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_response_cache.stats()}
+
+
 @router.get("/memory")
-async def get_memory(limit: int = 10):
-    """Get recent conversation history"""
-    entries = memory.get_recent(limit)
+async def get_memory(
+    limit: int = 10,
+    role: Optional[str] = None,
+    model: Optional[str] = None,
+    conversation_id: Optional[str] = Query(default=None, pattern=CONVERSATION_ID_PATTERN),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """Get recent conversation history, optionally filtered"""
+    memory = get_memory_store()
+    start = time.perf_counter()
+    with tracing.span("memory.read", limit=limit):
+        if any((role, model, since, until)):
+            entries = memory.query(
+                limit=limit,
+                role=role,
+                model=model,
+                conversation_id=conversation_id,
+                since=since,
+                until=until,
+            )
+        else:
+            entries = memory.get_recent(limit, conversation_id)
+    metrics.MEMORY_OPERATION_DURATION.observe(time.perf_counter() - start, operation="read")
     return {
         "entries": [
             {
@@ -128,14 +567,25 @@ async def get_memory(limit: int = 10):
                 "role": e.role,
                 "content": e.content,
                 "model": e.model,
+                "conversation_id": e.conversation_id,
             }
             for e in entries
         ]
     }
 
 
+@router.get("/memory/stats")
+async def get_memory_stats():
+    """Get memory write queue depth and flush latency"""
+    memory = get_memory_store()
+    return {
+        "backend": settings.memory_backend,
+        "write_behind": memory.stats() if isinstance(memory, WriteBehindMemory) else None,
+    }
+
+
 @router.delete("/memory")
-async def clear_memory():
-    """Clear all conversation history"""
-    memory.clear()
+async def clear_memory(conversation_id: Optional[str] = Query(default=None, pattern=CONVERSATION_ID_PATTERN)):
+    """Clear one conversation, or all conversation history"""
+    get_memory_store().clear(conversation_id)
     return {"message": "Memory cleared"}
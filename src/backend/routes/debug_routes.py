@@ -0,0 +1,73 @@
+"""Diagnostics routes: event loop stalls and on-demand sampling profiles"""
+
+import asyncio
+import secrets
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from src.config import get_settings
+from src.observability.diagnostics import LoopWatchdog, SamplingProfiler
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+config = get_settings().get_diagnostics_config()
+watchdog = LoopWatchdog(config["block_threshold_ms"] / 1000, config["max_reports"])
+profiler = SamplingProfiler()
+
+
+def require_debug_access(request: Request, x_debug_token: Optional[str] = Header(default=None)):
+    """
+    Allow a request carrying the configured ``X-Debug-Token``, or any
+    loopback client when no token is configured.
+    """
+    token = config["token"]
+    if token:
+        if not x_debug_token or not secrets.compare_digest(x_debug_token, token):
+            raise HTTPException(status_code=403, detail="Invalid or missing X-Debug-Token")
+    elif request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Debug endpoints are only served to loopback clients")
+
+
+router = APIRouter(
+    prefix="/debug", tags=["debug"], dependencies=[Depends(require_debug_access)], include_in_schema=False
+)
+
+
+@router.get("/blocking")
+async def get_blocking():
+    """Event loop lag and recent stalls with the stack of the blocking code"""
+    return watchdog.stats()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(default=10.0, gt=0),
+    interval_ms: float = Query(default=5.0, ge=1),
+    threads: str = Query(default="loop", pattern="^(loop|all)$"),
+    idle: bool = False,
+):
+    """
+    Sample stacks for a while and return them in collapsed (flame graph) format.
+
+    Args:
+        seconds: How long to sample
+        interval_ms: Time between samples
+        threads: ``loop`` for the event loop thread, ``all`` for every thread
+        idle: Keep samples of threads that are only waiting
+    """
+    if seconds > config["max_profile_seconds"]:
+        raise HTTPException(
+            status_code=400, detail=f"seconds must be at most {config['max_profile_seconds']}"
+        )
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    # This handler runs on the event loop thread
+    thread_ids = {threading.get_ident()} if threads == "loop" else None
+    try:
+        return await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, thread_ids, idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,179 @@
+"""Asynchronous job routes for long-running generations"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import Field
+
+from src.jobs import JobQueue, JobStore
+from src.models import background_traffic
+from src.observability import metrics
+from . import chat_routes
+from .chat_routes import ChatRequest, ChatResponse
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+config = chat_routes.settings.get_jobs_config()
+_queue: Optional[JobQueue] = None
+
+
+class JobRequest(ChatRequest):
+    """Chat request run in the background"""
+    priority: int = 0  # Higher runs first
+    max_attempts: Optional[int] = Field(default=None, ge=1)  # None uses JOBS_MAX_ATTEMPTS
+
+
+async def run_job(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one attempt of a job's chat request and store the response in memory"""
+    chat_request = ChatRequest.model_validate(request)
+    with background_traffic():
+        response = await chat_routes.get_router().chat(
+            messages=chat_routes.to_messages(chat_request),
+            model=chat_request.model,
+            temperature=chat_request.temperature,
+            max_tokens=chat_request.max_tokens,
+            hedge=chat_request.hedge,
+        )
+    if "error" in response:
+        return response
+    chat_routes.store_assistant_message(
+        chat_request, response["content"], response.get("usage"), response["model"]
+    )
+    return ChatResponse(
+        model=response["model"],
+        content=response["content"],
+        usage=response.get("usage"),
+        hedge=response.get("hedge"),
+    ).model_dump(exclude_none=True)
+
+
+def get_job_queue() -> JobQueue:
+    """Get the shared job queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(
+            JobStore(config["db_file"]),
+            run_job,
+            workers=config["workers"],
+            lease_seconds=config["lease_seconds"],
+            retry_base=config["retry_base"],
+            retry_max=config["retry_max"],
+            retention_seconds=config["retention_seconds"],
+            poll_interval=config["poll_interval"],
+        )
+    return _queue
+
+
+async def startup():
+    """Start the job workers"""
+    await get_job_queue().start()
+
+
+async def shutdown():
+    """Stop the job workers; jobs they were running go back to the queue"""
+    if _queue is not None:
+        await _queue.stop()
+        _queue.store.close()
+
+
+def collect_metrics():
+    """Copy the number of jobs in each status into the metrics"""
+    if _queue is not None:
+        for status, count in _queue.store.counts().items():
+            metrics.JOBS.set(count, status=status)
+
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public fields of a job"""
+    view = {
+        "id": job["id"],
+        "status": job["status"],
+        "model": job["request"].get("model") or chat_routes.settings.default_model,
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "created_at": _isoformat(job["created_at"]),
+        "started_at": _isoformat(job["started_at"]),
+        "finished_at": _isoformat(job["finished_at"]),
+        "result": job["result"],
+        "error": job["error"],
+    }
+    if job["status"] == "queued" and job["attempts"]:
+        view["next_attempt_at"] = _isoformat(job["available_at"])
+    return view
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: JobRequest) -> Dict[str, Any]:
+    """
+    Queue a chat request to run in the background.
+
+    The job survives server restarts. Poll ``GET /api/jobs/{id}`` for the
+    result, optionally with ``wait`` to hold the request open until the job
+    finishes.
+
+    Args:
+        request: JobRequest with the chat request, priority and attempt limit
+
+    Returns:
+        The queued job
+    """
+    if request.model is not None and request.model not in chat_routes.get_router().provider_specs:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {request.model}")
+
+    messages = chat_routes.to_messages(request)
+    chat_routes.store_user_message(request, messages)
+
+    job = await get_job_queue().submit(
+        request.model_dump(exclude={"priority", "max_attempts"}),
+        priority=request.priority,
+        max_attempts=request.max_attempts or config["max_attempts"],
+    )
+    return job_view(job)
+
+
+@router.get("/jobs/stats")
+async def get_job_stats() -> Dict[str, Any]:
+    """Number of jobs in each status"""
+    counts = await asyncio.to_thread(get_job_queue().store.counts)
+    return {"jobs": counts, "workers": config["workers"]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(default=0.0, ge=0)) -> Dict[str, Any]:
+    """
+    Get a job and, once it has succeeded, its result.
+
+    Args:
+        job_id: Job ID returned when the job was created
+        wait: Seconds to wait for the job to finish before answering
+            (at most JOBS_MAX_WAIT_SECONDS)
+
+    Returns:
+        The job
+    """
+    job = await get_job_queue().wait(job_id, min(wait, config["max_wait"]))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a job that has not started running"""
+    queue = get_job_queue()
+    if not await queue.cancel(job_id):
+        job = await queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} and can no longer be cancelled")
+    return job_view(await queue.get(job_id))
@@ -0,0 +1,174 @@
+"""WebSocket chat routes"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from . import chat_routes
+from .chat_routes import ChatRequest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["websocket"])
+
+
+async def _send_loop(websocket: WebSocket, outbox: asyncio.Queue):
+    """
+    Send queued events to the client one at a time.
+
+    The outbox is bounded, so when the client reads slowly this loop stalls
+    on the socket, the outbox fills up and generations pause on ``put``
+    until the client catches up. A failed send closes the connection; the
+    loop then discards events, so nothing stays blocked on ``put`` while the
+    handler winds down.
+    """
+    while True:
+        event = await outbox.get()
+        try:
+            await websocket.send_json(event)
+        except Exception as e:
+            if not isinstance(e, WebSocketDisconnect):
+                logger.warning("Closing WebSocket after a failed send: %s", e)
+                try:
+                    await websocket.close(code=1011)
+                except Exception:
+                    pass
+            break
+    while True:
+        await outbox.get()
+
+
+async def _receive_json(websocket: WebSocket) -> Any:
+    """
+    Receive one client message and parse it as JSON.
+
+    Text frames and binary frames holding UTF-8 JSON are both accepted.
+
+    Raises:
+        WebSocketDisconnect: The client went away
+        ValueError: The message is not valid JSON
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    data = message.get("text")
+    if data is None:
+        data = message.get("bytes") or b""
+    return json.loads(data)
+
+
+async def _run_chat(request_id: str, request: ChatRequest, outbox: asyncio.Queue):
+    """
+    Stream one chat request, tagging every event with its request ID.
+
+    Every request ends with a ``done``, ``error`` or ``cancelled`` event,
+    including when storing messages or the router raises.
+    """
+    parts = []
+    try:
+        messages = chat_routes.to_messages(request)
+        chat_routes.store_user_message(request, messages)
+        async for event in chat_routes.get_router().stream_chat(
+            messages=messages,
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            hedge=request.hedge,
+        ):
+            if event["type"] == "delta":
+                parts.append(event["content"])
+            elif event["type"] == "done":
+                chat_routes.store_assistant_message(
+                    request, "".join(parts), event.get("usage"), event.get("model")
+                )
+            await outbox.put({**event, "id": request_id})
+    except asyncio.CancelledError:
+        # Never wait here: on disconnect nothing drains the outbox any more
+        try:
+            outbox.put_nowait({"type": "cancelled", "id": request_id})
+        except asyncio.QueueFull:
+            pass
+        raise
+    except Exception as e:
+        logger.exception("WebSocket request %s failed", request_id)
+        await outbox.put({"type": "error", "id": request_id, "error": f"Error processing request: {str(e)}"})
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Multiplexed chat over a single WebSocket connection.
+
+    Client messages, as JSON in text or binary frames:
+        ``{"type": "chat", "id": "...", "messages": [...], ...ChatRequest fields}``
+        starts a generation; ``{"type": "cancel", "id": "..."}`` cancels one.
+
+    Server messages carry the request ``id`` and are one of ``delta``,
+    ``done``, ``error`` or ``cancelled``, interleaved across requests.
+    """
+    await websocket.accept()
+    settings = chat_routes.settings
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+    in_flight: Dict[str, asyncio.Task] = {}
+    sender = asyncio.create_task(_send_loop(websocket, outbox))
+
+    async def reject(request_id, error: str):
+        await outbox.put({"type": "error", "id": request_id, "error": error})
+
+    try:
+        while True:
+            try:
+                payload = await _receive_json(websocket)
+            except ValueError:
+                await reject(None, "Invalid JSON")
+                continue
+            if not isinstance(payload, dict):
+                await reject(None, "Expected a JSON object")
+                continue
+
+            kind = payload.pop("type", None)
+            request_id = payload.pop("id", None)
+
+            if kind == "cancel":
+                task = in_flight.get(request_id)
+                if task is None:
+                    await reject(request_id, f"No request in flight with id {request_id!r}")
+                else:
+                    task.cancel()
+                continue
+
+            if kind != "chat":
+                await reject(request_id, f"Unknown message type: {kind!r}")
+                continue
+            if not isinstance(request_id, str) or not request_id:
+                await reject(request_id, "Chat messages need a string 'id'")
+                continue
+            if request_id in in_flight:
+                await reject(request_id, f"Request {request_id!r} is already in flight")
+                continue
+            if len(in_flight) >= settings.ws_max_in_flight:
+                await reject(request_id, "Too many requests in flight on this connection")
+                continue
+
+            try:
+                request = ChatRequest.model_validate(payload)
+            except ValidationError as e:
+                await reject(request_id, str(e))
+                continue
+
+            task = asyncio.create_task(_run_chat(request_id, request, outbox))
+            in_flight[request_id] = task
+            task.add_done_callback(lambda _, rid=request_id: in_flight.pop(rid, None))
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Wait for every task, so none is left holding a limiter slot or a provider stream
+        tasks = [*in_flight.values(), sender]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
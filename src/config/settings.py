@@ -15,30 +15,164 @@ class Settings:
         # OpenAI Configuration
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4")
+        # Empty uses the SDK default; set for proxies, compatible servers or benchmark mocks
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL", "")
 
         # Anthropic Configuration
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY", "")
         self.anthropic_model = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
+        self.anthropic_base_url = os.getenv("ANTHROPIC_BASE_URL", "")
 
         # Google Configuration
         self.google_api_key = os.getenv("GOOGLE_API_KEY", "")
         self.google_model = os.getenv("GOOGLE_MODEL", "gemini-1.5-pro")
+        self.google_max_workers = int(os.getenv("GOOGLE_MAX_WORKERS", "4"))
+        # Setting an endpoint switches the Gemini SDK to its REST transport
+        self.google_base_url = os.getenv("GOOGLE_BASE_URL", "")
 
         # Ollama Configuration
         self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "llama2")
 
+        # Additional provider adapters, as name=module:Class pairs
+        self.model_providers = dict(
+            entry.strip().split("=", 1)
+            for entry in os.getenv("MODEL_PROVIDERS", "").split(",")
+            if "=" in entry
+        )
+
         # Default Model
         self.default_model = os.getenv("DEFAULT_MODEL", "openai")
 
+        # Fallback Routing and Circuit Breakers
+        self.fallback_chain = [
+            name.strip().lower() for name in os.getenv("FALLBACK_CHAIN", "").split(",") if name.strip()
+        ]
+        self.min_health_score = float(os.getenv("MIN_HEALTH_SCORE", "0.5"))
+        self.breaker_window = int(os.getenv("BREAKER_WINDOW", "20"))
+        self.breaker_window_seconds = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+        self.breaker_min_requests = int(os.getenv("BREAKER_MIN_REQUESTS", "5"))
+        self.breaker_failure_rate = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+        self.breaker_slow_call_seconds = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "30"))
+        self.breaker_slow_call_rate = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+        self.breaker_open_seconds = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+        self.breaker_half_open_probes = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+        # Hedged Requests
+        self.hedge_enabled = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_secondary = os.getenv("HEDGE_SECONDARY", "").strip().lower()
+        self.hedge_percentile = float(os.getenv("HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_default_delay_ms = float(os.getenv("HEDGE_DEFAULT_DELAY_MS", "2000"))
+        self.hedge_min_delay_ms = float(os.getenv("HEDGE_MIN_DELAY_MS", "100"))
+        self.hedge_max_delay_ms = float(os.getenv("HEDGE_MAX_DELAY_MS", "10000"))
+
+        # Adaptive Concurrency Limits and Admission Control
+        self.concurrency_limit_enabled = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+        self.concurrency_limit_initial = float(os.getenv("CONCURRENCY_LIMIT_INITIAL", "20"))
+        self.concurrency_limit_min = float(os.getenv("CONCURRENCY_LIMIT_MIN", "1"))
+        self.concurrency_limit_max = float(os.getenv("CONCURRENCY_LIMIT_MAX", "200"))
+        self.admission_queue_size = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+        self.admission_max_wait_ms = float(os.getenv("ADMISSION_MAX_WAIT_MS", "5000"))
+        self.concurrency_decrease_factor = float(os.getenv("CONCURRENCY_DECREASE_FACTOR", "0.7"))
+        self.concurrency_latency_tolerance = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "3"))
+
+        # Context Window Management
+        self.context_management_enabled = os.getenv("CONTEXT_MANAGEMENT_ENABLED", "true").lower() == "true"
+        self.context_max_input_tokens = int(os.getenv("CONTEXT_MAX_INPUT_TOKENS", "0"))
+        self.context_overflow = os.getenv("CONTEXT_OVERFLOW", "drop").lower()  # "drop" or "summarize"
+        self.context_summary_max_tokens = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "256"))
+        self.token_cache_size = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+        # Provider prompt caching
+        self.prompt_cache_enabled = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+        self.prompt_cache_min_tokens = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+        self.prompt_cache_ttl = float(os.getenv("PROMPT_CACHE_TTL", "300"))
+
+        # Provider HTTP Connection Pools
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        self.http_max_keepalive_connections = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http_http2 = os.getenv("HTTP_HTTP2", "false").lower() == "true"
+        self.http_timeout = float(os.getenv("HTTP_TIMEOUT", "120"))
+
+        # Response Cache (opt-in; only deterministic requests are cached)
+        self.response_cache_enabled = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+        self.response_cache_max_temperature = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0"))
+        self.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        self.response_cache_max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+        self.response_cache_max_bytes = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.response_cache_db_file = os.getenv("RESPONSE_CACHE_DB_FILE", "")
+        self.response_cache_disk_max_entries = int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "100000"))
+        self.response_cache_disk_max_bytes = int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(500 * 1024 * 1024)))
+
+        # Share one provider call between identical concurrent requests
+        self.coalesce_requests = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+
         # Server Configuration
         self.api_host = os.getenv("API_HOST", "0.0.0.0")
         self.api_port = int(os.getenv("API_PORT", "8000"))
         self.api_debug = os.getenv("API_DEBUG", "false").lower() == "true"
+        # Server processes; memory is shared through file locks or SQLite, other state is per worker
+        self.api_workers = max(1, int(os.getenv("API_WORKERS", "1")))
+        # Import provider SDKs and open their clients at startup rather than on first request
+        self.provider_warmup = os.getenv("PROVIDER_WARMUP", "true").lower() == "true"
+        # Serve Prometheus metrics at /metrics and time every request
+        self.metrics_enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+        # Tracing Configuration
+        self.tracing_enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.tracing_exporter = os.getenv("TRACING_EXPORTER", "file").lower()  # "file" or "otlp"
+        self.tracing_file = os.getenv("TRACING_FILE", "data/traces.jsonl")
+        self.tracing_otlp_endpoint = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318")
+        self.tracing_sample_ratio = float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))
+        self.tracing_service_name = os.getenv("TRACING_SERVICE_NAME", "pro-ai")
+        self.tracing_max_queue_size = int(os.getenv("TRACING_MAX_QUEUE_SIZE", "2048"))
+
+        # Diagnostics: event loop blocking detector and /debug endpoints
+        self.diagnostics_enabled = os.getenv("DIAGNOSTICS_ENABLED", "false").lower() == "true"
+        self.diagnostics_block_threshold_ms = float(os.getenv("DIAGNOSTICS_BLOCK_THRESHOLD_MS", "100"))
+        self.diagnostics_max_reports = int(os.getenv("DIAGNOSTICS_MAX_REPORTS", "50"))
+        # Required in an X-Debug-Token header; empty allows loopback clients only
+        self.diagnostics_token = os.getenv("DIAGNOSTICS_TOKEN", "")
+        self.diagnostics_max_profile_seconds = float(os.getenv("DIAGNOSTICS_MAX_PROFILE_SECONDS", "60"))
+
+        # WebSocket Configuration
+        self.ws_send_queue_size = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+        self.ws_max_in_flight = int(os.getenv("WS_MAX_IN_FLIGHT", "8"))
+
+        # Batch Chat Configuration
+        self.batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+        self.batch_max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+        # How long an item keeps retrying while its provider is at its concurrency limit
+        self.batch_overload_wait_seconds = float(os.getenv("BATCH_OVERLOAD_WAIT_SECONDS", "60"))
+
+        # Job Queue Configuration (/api/jobs)
+        self.jobs_enabled = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+        self.jobs_db_file = os.getenv("JOBS_DB_FILE", "data/jobs.db")
+        self.jobs_workers = int(os.getenv("JOBS_WORKERS", "4"))
+        self.jobs_max_attempts = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+        self.jobs_retry_base_seconds = float(os.getenv("JOBS_RETRY_BASE_SECONDS", "2"))
+        self.jobs_retry_max_seconds = float(os.getenv("JOBS_RETRY_MAX_SECONDS", "300"))
+        # Time limit of one attempt; jobs of a worker that died run again after it
+        self.jobs_lease_seconds = float(os.getenv("JOBS_LEASE_SECONDS", "900"))
+        # How long finished jobs and their results are kept; 0 keeps them forever
+        self.jobs_retention_seconds = float(os.getenv("JOBS_RETENTION_SECONDS", "86400"))
+        self.jobs_max_wait_seconds = float(os.getenv("JOBS_MAX_WAIT_SECONDS", "60"))
+        self.jobs_poll_interval_ms = int(os.getenv("JOBS_POLL_INTERVAL_MS", "1000"))
 
         # Memory Configuration
+        self.memory_backend = os.getenv("MEMORY_BACKEND", "json").lower()  # "json" or "sqlite"
         self.memory_file = os.getenv("MEMORY_FILE", "data/memory.json")
+        self.memory_db_file = os.getenv("MEMORY_DB_FILE", "data/memory.db")
         self.max_memory_entries = int(os.getenv("MAX_MEMORY_ENTRIES", "1000"))
+        self.max_conversation_entries = int(os.getenv("MAX_CONVERSATION_ENTRIES", "200"))
+        self.memory_max_resident_shards = int(os.getenv("MEMORY_MAX_RESIDENT_SHARDS", "128"))
+        self.memory_write_behind = os.getenv("MEMORY_WRITE_BEHIND", "true").lower() == "true"
+        self.memory_flush_batch_size = int(os.getenv("MEMORY_FLUSH_BATCH_SIZE", "100"))
+        self.memory_flush_interval_ms = int(os.getenv("MEMORY_FLUSH_INTERVAL_MS", "50"))
+        # Consecutive failed flushes, with growing backoff, before queued entries are dropped
+        self.memory_flush_max_retries = int(os.getenv("MEMORY_FLUSH_MAX_RETRIES", "10"))
 
     def get_model_config(self, model_name: str) -> dict:
         """Get configuration for a specific model"""
@@ -46,21 +180,146 @@ class Settings:
             "openai": {
                 "api_key": self.openai_api_key,
                 "model": self.openai_model,
+                "base_url": self.openai_base_url,
             },
             "anthropic": {
                 "api_key": self.anthropic_api_key,
                 "model": self.anthropic_model,
+                "base_url": self.anthropic_base_url,
             },
             "google": {
                 "api_key": self.google_api_key,
                 "model": self.google_model,
+                "max_workers": self.google_max_workers,
+                "base_url": self.google_base_url,
             },
             "ollama": {
                 "base_url": self.ollama_base_url,
                 "model": self.ollama_model,
             },
         }
-        return configs.get(model_name, {})
+        if model_name in configs:
+            return configs[model_name]
+        # Provider adapters added by plugins read <NAME>_API_KEY, <NAME>_MODEL and <NAME>_BASE_URL
+        prefix = model_name.upper().replace("-", "_")
+        return {
+            "api_key": os.getenv(f"{prefix}_API_KEY", ""),
+            "model": os.getenv(f"{prefix}_MODEL", ""),
+            "base_url": os.getenv(f"{prefix}_BASE_URL", ""),
+        }
+
+    def get_routing_config(self) -> dict:
+        """Get fallback chain and circuit breaker settings"""
+        return {
+            "fallback_chain": self.fallback_chain,
+            "min_health_score": self.min_health_score,
+            "breaker": {
+                "window": self.breaker_window,
+                "window_seconds": self.breaker_window_seconds,
+                "min_requests": self.breaker_min_requests,
+                "failure_rate": self.breaker_failure_rate,
+                "slow_call_seconds": self.breaker_slow_call_seconds,
+                "slow_call_rate": self.breaker_slow_call_rate,
+                "open_seconds": self.breaker_open_seconds,
+                "half_open_probes": self.breaker_half_open_probes,
+            },
+        }
+
+    def get_hedging_config(self) -> dict:
+        """Get hedged request settings, with delays in seconds"""
+        return {
+            "enabled": self.hedge_enabled,
+            "secondary": self.hedge_secondary,
+            "percentile": self.hedge_percentile,
+            "min_samples": self.hedge_min_samples,
+            "default_delay": self.hedge_default_delay_ms / 1000,
+            "min_delay": self.hedge_min_delay_ms / 1000,
+            "max_delay": self.hedge_max_delay_ms / 1000,
+        }
+
+    def get_limits_config(self) -> dict:
+        """
+        Get adaptive concurrency limit settings, with the queue wait in seconds.
+
+        The configured limits and queue size are for the whole deployment;
+        each worker process limits itself to its share.
+        """
+        workers = self.api_workers
+        return {
+            "enabled": self.concurrency_limit_enabled,
+            "initial_limit": max(self.concurrency_limit_min, self.concurrency_limit_initial / workers),
+            "min_limit": self.concurrency_limit_min,
+            "max_limit": max(self.concurrency_limit_min, self.concurrency_limit_max / workers),
+            "queue_size": max(1, -(-self.admission_queue_size // workers)),
+            "max_wait": self.admission_max_wait_ms / 1000,
+            "decrease_factor": self.concurrency_decrease_factor,
+            "latency_tolerance": self.concurrency_latency_tolerance,
+        }
+
+    def get_context_config(self) -> dict:
+        """Get context window management settings"""
+        return {
+            "enabled": self.context_management_enabled,
+            "max_input_tokens": self.context_max_input_tokens,
+            "overflow": self.context_overflow,
+            "summary_max_tokens": self.context_summary_max_tokens,
+            "token_cache_size": self.token_cache_size,
+        }
+
+    def get_prompt_cache_config(self) -> dict:
+        """Get provider prompt caching settings"""
+        return {
+            "enabled": self.prompt_cache_enabled,
+            "min_tokens": self.prompt_cache_min_tokens,
+            "ttl": self.prompt_cache_ttl,
+        }
+
+    def get_tracing_config(self) -> dict:
+        """Get request tracing configuration"""
+        return {
+            "enabled": self.tracing_enabled,
+            "exporter": self.tracing_exporter,
+            "file": self.tracing_file,
+            "otlp_endpoint": self.tracing_otlp_endpoint,
+            "sample_ratio": self.tracing_sample_ratio,
+            "service_name": self.tracing_service_name,
+            "max_queue_size": self.tracing_max_queue_size,
+        }
+
+    def get_diagnostics_config(self) -> dict:
+        """Get event loop diagnostics and profiling configuration"""
+        return {
+            "enabled": self.diagnostics_enabled,
+            "block_threshold_ms": self.diagnostics_block_threshold_ms,
+            "max_reports": self.diagnostics_max_reports,
+            "token": self.diagnostics_token,
+            "max_profile_seconds": self.diagnostics_max_profile_seconds,
+        }
+
+    def get_jobs_config(self) -> dict:
+        """Get job queue settings, with the poll interval in seconds"""
+        return {
+            "enabled": self.jobs_enabled,
+            "db_file": self.jobs_db_file,
+            "workers": self.jobs_workers,
+            "max_attempts": self.jobs_max_attempts,
+            "retry_base": self.jobs_retry_base_seconds,
+            "retry_max": self.jobs_retry_max_seconds,
+            "lease_seconds": self.jobs_lease_seconds,
+            "retention_seconds": self.jobs_retention_seconds,
+            "max_wait": self.jobs_max_wait_seconds,
+            "poll_interval": self.jobs_poll_interval_ms / 1000,
+        }
+
+    def get_http_config(self) -> dict:
+        """Get connection pool settings for provider HTTP clients"""
+        return {
+            "max_connections": self.http_max_connections,
+            "max_keepalive_connections": self.http_max_keepalive_connections,
+            "keepalive_expiry": self.http_keepalive_expiry,
+            "http2": self.http_http2,
+            "timeout": self.http_timeout,
+        }
 
 
 @lru_cache
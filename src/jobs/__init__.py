@@ -0,0 +1,6 @@
+"""Persistent queue for long-running generations"""
+
+from .queue import JobQueue
+from .store import JobStore
+
+__all__ = ["JobQueue", "JobStore"]
@@ -0,0 +1,262 @@
+"""Asyncio worker pool running jobs from the persistent queue"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from src.observability import metrics
+from .store import FINISHED, JobStore
+
+logger = logging.getLogger(__name__)
+
+# Statuses of failed attempts worth retrying; other 4xx responses would fail again
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+
+def is_retryable(response: Dict[str, Any]) -> bool:
+    """Whether a failed response is transient: overload, timeouts, server errors or no status at all"""
+    if "retry_after" in response:
+        return True
+    status = response.get("status_code")
+    return status is None or status in RETRYABLE_STATUS or status >= 500
+
+
+class JobQueue:
+    """
+    Runs queued jobs on a fixed number of asyncio worker tasks.
+
+    Workers claim jobs from the store in a thread so SQLite never blocks the
+    event loop. A new job wakes an idle worker at once; otherwise idle
+    workers poll every ``poll_interval``, which also picks up jobs submitted
+    by other server processes and retries whose backoff has elapsed.
+
+    ``run`` receives the job's request and returns a router-style response
+    dict: a result, or one with ``error`` (plus ``status_code`` or
+    ``retry_after``). Transient errors are retried with exponential backoff
+    and jitter, or after ``retry_after`` when the provider gave one, until
+    the job's attempts are used up. On ``stop`` the jobs this process holds
+    go straight back to the queue.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        workers: int = 4,
+        lease_seconds: float = 900.0,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+        retention_seconds: float = 86400.0,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            store: Persistent job store
+            run: Coroutine function running one job's request
+            workers: Number of jobs run at once by this process
+            lease_seconds: Time limit of one attempt; a job whose worker died
+                runs again once its lease expires
+            retry_base: Backoff before the first retry, doubled on each further attempt
+            retry_max: Longest backoff between attempts
+            retention_seconds: How long finished jobs are kept (0 keeps them forever)
+            poll_interval: Seconds between checks for jobs when idle
+        """
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+
+        self._wakeup = asyncio.Event()
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._tasks: List[asyncio.Task] = []
+        # Jobs claimed by this process, with their lease expiry
+        self._leases: Dict[str, float] = {}
+        self._claims: Set[asyncio.Future] = set()
+
+    async def start(self):
+        """Start the workers and the retention purge"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+        if self.retention_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._purge_loop(), name="job-purge"))
+
+    async def stop(self):
+        """
+        Stop the workers.
+
+        Jobs cut short are put back in the queue without counting the
+        attempt, so another process, or this one once restarted, runs them
+        again at once instead of after their lease expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # A claim cannot be interrupted once its thread runs; wait so its job is handed back too
+        await asyncio.gather(*self._claims, return_exceptions=True)
+        if self._leases:
+            requeued = await asyncio.to_thread(self.store.requeue, dict(self._leases))
+            self._leases.clear()
+            if requeued:
+                logger.info("Requeued %d running jobs", requeued)
+
+    async def submit(self, request: Dict[str, Any], priority: int = 0, max_attempts: int = 3) -> Dict[str, Any]:
+        """Queue a job and wake a worker for it"""
+        job = await asyncio.to_thread(self.store.submit, request, priority, max_attempts)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started"""
+        cancelled = await asyncio.to_thread(self.store.cancel, job_id)
+        if cancelled:
+            self._notify(job_id)
+        return cancelled
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Get a job, first waiting up to ``timeout`` seconds for it to finish.
+
+        Jobs run by this process wake the waiter as soon as they finish; the
+        store is also checked every ``poll_interval`` for jobs run elsewhere.
+
+        Returns:
+            The job, finished or not, or None if there is no such job
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED or timeout <= 0:
+            return job
+
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                job = await self.get(job_id)
+                if job is None or job["status"] in FINISHED:
+                    return job
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def _notify(self, job_id: str):
+        for event in self._waiters.get(job_id, ()):
+            event.set()
+
+    def retry_delay(self, attempts: int, response: Dict[str, Any]) -> float:
+        """Backoff before the next attempt: the provider's hint, or jittered exponential"""
+        if response.get("retry_after") is not None:
+            return float(response["retry_after"])
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Claim the next runnable job in a thread, remembering its lease"""
+        claim = asyncio.ensure_future(asyncio.to_thread(self.store.claim, self.lease_seconds))
+        self._claims.add(claim)
+        claim.add_done_callback(self._claimed)
+        return await asyncio.shield(claim)
+
+    def _claimed(self, claim: asyncio.Future):
+        self._claims.discard(claim)
+        if not claim.cancelled() and claim.exception() is None and claim.result() is not None:
+            job = claim.result()
+            self._leases[job["id"]] = job["lease_expires_at"]
+
+    async def _idle(self):
+        """Sleep until a job is submitted, the next retry is due or the poll interval passes"""
+        timeout = self.poll_interval
+        next_at = await asyncio.to_thread(self.store.next_available_at)
+        if next_at is not None:
+            timeout = max(0.0, min(timeout, next_at - time.time()))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self):
+        while True:
+            try:
+                # Clear first: a submit after this point is either claimed below or wakes the wait
+                self._wakeup.clear()
+                job = await self._claim()
+                if job is None:
+                    await self._idle()
+                    continue
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker failed; retrying in %.1fs", self.poll_interval)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _execute(self, job: Dict[str, Any]):
+        """Run one attempt of a job and record its outcome"""
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.run(job["request"]), self.lease_seconds)
+        except asyncio.TimeoutError:
+            response = {"error": f"Job timed out after {self.lease_seconds:g}s"}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Job %s raised", job["id"])
+            response = {"error": f"Error processing job: {str(e)}"}
+        metrics.JOB_RUN_DURATION.observe(time.perf_counter() - start)
+
+        if "error" not in response:
+            await asyncio.to_thread(self.store.complete, job["id"], response)
+            outcome = "succeeded"
+        elif job["attempts"] < job["max_attempts"] and is_retryable(response):
+            delay = self.retry_delay(job["attempts"], response)
+            await asyncio.to_thread(self.store.fail, job["id"], response["error"], delay)
+            outcome = "retried"
+            logger.info(
+                "Job %s attempt %d failed (%s); retrying in %.1fs",
+                job["id"], job["attempts"], response["error"], delay,
+            )
+        else:
+            await asyncio.to_thread(self.store.fail, job["id"], response["error"])
+            outcome = "failed"
+        self._leases.pop(job["id"], None)
+        metrics.JOB_ATTEMPTS.inc(outcome=outcome)
+        self._notify(job["id"])
+
+    async def _purge_loop(self):
+        """Delete finished jobs once they are older than the retention period"""
+        interval = min(self.retention_seconds, 300.0)
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.store.purge, time.time() - self.retention_seconds)
+                if purged:
+                    logger.info("Purged %d finished jobs", purged)
+            except Exception:
+                logger.exception("Job purge failed")
+            await asyncio.sleep(interval)
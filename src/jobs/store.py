@@ -0,0 +1,273 @@
+"""SQLite-backed persistent job queue"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "id, status, priority, request, result, error, attempts, max_attempts, "
+    "created_at, available_at, started_at, finished_at, lease_expires_at"
+)
+
+
+class JobStore:
+    """
+    Durable job queue in a WAL-mode SQLite database.
+
+    Jobs are claimed highest priority first, then oldest first, inside an
+    immediate transaction, so several server processes can share one
+    database without running a job twice. A claim holds a lease; if the
+    process dies mid-job the lease expires and another worker picks the job
+    up again, counting it as an attempt.
+    """
+
+    def __init__(self, db_file: str = "data/jobs.db"):
+        """
+        Initialize the job store.
+
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        # Other server workers may hold the write lock; wait for it rather than fail
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row_to_job(row: tuple) -> Dict[str, Any]:
+        """Convert a database row to a job dictionary"""
+        job = dict(zip((c.strip() for c in _COLUMNS.split(",")), row))
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, request: Dict[str, Any], priority: int = 0, max_attempts: int = 3) -> Dict[str, Any]:
+        """
+        Add a job to the queue.
+
+        Args:
+            request: Chat request to run
+            priority: Higher runs first
+            max_attempts: Attempts before the job fails
+
+        Returns:
+            The queued job
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, priority, request, max_attempts, created_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, priority, json.dumps(request), max_attempts, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Take the next runnable job, marking it running under a lease.
+
+        A running job whose lease has expired belongs to a worker that died;
+        it is claimed again, or failed if that was its last attempt.
+
+        Args:
+            lease_seconds: How long the claim holds before others may retry the job
+
+        Returns:
+            The claimed job, or None if no job is runnable now
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        f"SELECT {_COLUMNS} FROM jobs WHERE status = ? AND available_at <= ? "
+                        "ORDER BY priority DESC, available_at LIMIT 1",
+                        (QUEUED, now),
+                    ).fetchone()
+                    if row is None:
+                        row = self._conn.execute(
+                            f"SELECT {_COLUMNS} FROM jobs WHERE status = ? AND lease_expires_at < ? "
+                            "ORDER BY priority DESC, lease_expires_at LIMIT 1",
+                            (RUNNING, now),
+                        ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+
+                    job = self._row_to_job(row)
+                    if job["status"] == RUNNING and job["attempts"] >= job["max_attempts"]:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                            "WHERE id = ?",
+                            (FAILED, "Worker stopped while running the job", now, job["id"]),
+                        )
+                        self._conn.execute("COMMIT")
+                        continue
+
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, "
+                        "lease_expires_at = ? WHERE id = ?",
+                        (RUNNING, now, now + lease_seconds, job["id"]),
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                job.update(status=RUNNING, attempts=job["attempts"] + 1, started_at=now,
+                           lease_expires_at=now + lease_seconds)
+                return job
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Record a job's result"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ?",
+                (SUCCEEDED, json.dumps(result), time.time(), job_id, RUNNING),
+            )
+
+    def fail(self, job_id: str, error: str, retry_in: Optional[float] = None):
+        """
+        Record a failed attempt.
+
+        Args:
+            job_id: Job that failed
+            error: Error message
+            retry_in: Seconds until the job may run again; None fails it for good
+        """
+        now = time.time()
+        with self._lock:
+            if retry_in is None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                    "WHERE id = ? AND status = ?",
+                    (FAILED, error, now, job_id, RUNNING),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL "
+                    "WHERE id = ? AND status = ?",
+                    (QUEUED, error, now + retry_in, job_id, RUNNING),
+                )
+
+    def requeue(self, leases: Dict[str, float]) -> int:
+        """
+        Put running jobs back in the queue, as when their worker stops cleanly.
+
+        The interrupted attempt does not count, and the jobs are runnable at
+        once. A job is only requeued while it still holds the given lease,
+        never after another worker has claimed it again.
+
+        Args:
+            leases: Job ID -> lease expiry returned by ``claim``
+
+        Returns:
+            Number of jobs requeued
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), available_at = ?, "
+                "lease_expires_at = NULL WHERE id = ? AND status = ? AND lease_expires_at = ?",
+                [(QUEUED, now, job_id, RUNNING, expires) for job_id, expires in leases.items()],
+            )
+        return cursor.rowcount
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started.
+
+        Returns:
+            Whether the job was waiting and is now cancelled
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+        return cursor.rowcount > 0
+
+    def next_available_at(self) -> Optional[float]:
+        """When the earliest queued job becomes runnable, if any is queued"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return row[0]
+
+    def purge(self, older_than: float) -> int:
+        """
+        Delete finished jobs.
+
+        Args:
+            older_than: Epoch time; jobs finished before it are deleted
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at < ? AND status IN (?, ?, ?)", (older_than, *FINISHED)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED)}
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -1,5 +1,8 @@
 """Memory module for conversation history and context management"""
 
-from .json_memory import JSONMemory, ConversationEntry
+from .json_memory import JSONMemory, ConversationEntry, PartialWriteError
+from .sqlite_memory import SQLiteMemory
+from .write_behind import WriteBehindMemory
+from .factory import create_memory
 
-__all__ = ["JSONMemory", "ConversationEntry"]
+__all__ = ["JSONMemory", "SQLiteMemory", "WriteBehindMemory", "ConversationEntry", "PartialWriteError", "create_memory"]
@@ -0,0 +1,45 @@
+"""Memory backend selection"""
+
+from typing import Union
+
+from .json_memory import JSONMemory
+from .sqlite_memory import SQLiteMemory
+from .write_behind import WriteBehindMemory
+
+
+def create_memory(settings) -> Union[JSONMemory, SQLiteMemory, WriteBehindMemory]:
+    """
+    Create the memory store selected by ``settings.memory_backend``.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A JSONMemory or SQLiteMemory instance, wrapped in a WriteBehindMemory
+        when ``settings.memory_write_behind`` is enabled
+    """
+    backend = settings.memory_backend
+    if backend == "json":
+        store = JSONMemory(
+            settings.memory_file,
+            settings.max_memory_entries,
+            max_conversation_entries=settings.max_conversation_entries,
+            max_resident_shards=settings.memory_max_resident_shards,
+        )
+    elif backend == "sqlite":
+        store = SQLiteMemory(
+            settings.memory_db_file,
+            settings.max_memory_entries,
+            max_conversation_entries=settings.max_conversation_entries,
+        )
+    else:
+        raise ValueError(f"Unknown memory backend: {backend}")
+
+    if settings.memory_write_behind:
+        return WriteBehindMemory(
+            store,
+            batch_size=settings.memory_flush_batch_size,
+            flush_interval_ms=settings.memory_flush_interval_ms,
+            max_retries=settings.memory_flush_max_retries,
+        )
+    return store
@@ -1,11 +1,37 @@
-"""JSON-based memory storage for conversations"""
+"""JSON Lines memory storage for conversations"""
 
 import json
 import os
+import re
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Optional, Deque, Iterator
 from dataclasses import dataclass, asdict
 
+from ..observability import tracing
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, so only one process may use the logs
+    fcntl = None
+
+# Bytes read per step when scanning a log backwards for recent entries
+_TAIL_CHUNK_SIZE = 64 * 1024
+
+# Conversation IDs become file names, so keep them to a safe character set
+_CONVERSATION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class PartialWriteError(Exception):
+    """Raised when a multi-conversation write failed after some conversations were written"""
+
+    def __init__(self, unwritten: List["ConversationEntry"]):
+        super().__init__(f"{len(unwritten)} entries were not written")
+        self.unwritten = unwritten
+
 
 @dataclass
 class ConversationEntry:
@@ -16,34 +42,416 @@ class ConversationEntry:
     content: str
     model: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None
+
+    @classmethod
+    def create(
+        cls,
+        role: str,
+        content: str,
+        model: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        conversation_id: Optional[str] = None,
+    ) -> "ConversationEntry":
+        """Create an entry timestamped now"""
+        return cls(
+            timestamp=datetime.now().isoformat(),
+            role=role,
+            content=content,
+            model=model,
+            metadata=metadata or {},
+            conversation_id=conversation_id,
+        )
+
+    def matches(
+        self,
+        role: Optional[str] = None,
+        model: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> bool:
+        """Check whether the entry passes the given query filters"""
+        return (
+            (role is None or self.role == role)
+            and (model is None or self.model == model)
+            and (conversation_id is None or self.conversation_id == conversation_id)
+            and (since is None or self.timestamp >= since)
+            and (until is None or self.timestamp < until)
+        )
+
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool = True) -> Iterator[None]:
+    """
+    Hold an advisory lock shared by every process that uses a log.
+
+    The lock lives in a ``.lock`` file next to the log, because compaction
+    replaces the log file itself.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def validate_conversation_id(conversation_id: str) -> str:
+    """
+    Check that a conversation ID is safe to use as a shard name.
+
+    Raises:
+        ValueError: If the ID contains anything but letters, digits, '_' or '-'
+    """
+    if not _CONVERSATION_ID_PATTERN.match(conversation_id):
+        raise ValueError(f"Invalid conversation ID: {conversation_id!r}")
+    return conversation_id
+
+
+class _ConversationLog:
+    """
+    Append-only JSON Lines log holding one conversation.
+
+    Every entry is one line, so adding an entry is a single append. The most
+    recent entries are loaded from the end of the file on first read and kept
+    in memory afterwards. Retention is enforced by a background compaction
+    that runs once the file has grown past ``compaction_threshold`` lines.
+
+    Several processes (server workers) may share a log: every access holds
+    a file lock, and the in-memory copy is dropped whenever the file's
+    identity or size differs from what this process last saw.
+    """
+
+    def __init__(self, log_file: str, max_entries: int, compaction_ratio: float):
+        self.log_file = log_file
+        self.max_entries = max_entries
+        self.compaction_threshold = max(int(max_entries * compaction_ratio), max_entries + 1)
+
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._entries: Optional[Deque[ConversationEntry]] = None
+        self._file_state: Optional[tuple] = None
+        self._line_count = 0
+
+        with _file_lock(log_file):
+            self._sync()
+
+    @property
+    def is_compacting(self) -> bool:
+        """Whether a background compaction is running"""
+        return self._compaction_thread is not None and self._compaction_thread.is_alive()
+
+    def _count_lines(self) -> int:
+        """Count entries in the log, terminating a torn final line if needed"""
+        count = 0
+        last_byte = b"\n"
+        with open(self.log_file, "rb") as f:
+            for chunk in iter(lambda: f.read(_TAIL_CHUNK_SIZE), b""):
+                count += chunk.count(b"\n")
+                last_byte = chunk[-1:]
+
+        if last_byte != b"\n":
+            # A crash mid-append left a partial line; close it so the next
+            # append starts on a fresh line (the partial one is skipped on read)
+            with open(self.log_file, "ab") as f:
+                f.write(b"\n")
+            count += 1
+        return count
+
+    def _stat(self) -> tuple:
+        """Identity and size of the log file, creating it if missing"""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            open(self.log_file, "ab").close()
+            st = os.stat(self.log_file)
+        return st.st_ino, st.st_size
+
+    def _sync(self):
+        """
+        Pick up changes other processes made to the log (caller holds the
+        file lock and, after construction, the thread lock).
+        """
+        state = self._stat()
+        if state != self._file_state:
+            self._entries = None
+            self._line_count = self._count_lines()
+            self._file_state = self._stat()
+
+    def _read_tail(self, limit: int, end: Optional[int] = None) -> List[bytes]:
+        """
+        Read the last lines of the log by scanning backwards from the end.
+
+        Args:
+            limit: Number of lines to return
+            end: Byte offset to treat as the end of the log
+
+        Returns:
+            Up to ``limit`` raw lines, oldest first
+        """
+        with open(self.log_file, "rb") as f:
+            if end is None:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+            position = end
+            # Collect chunks newest first and join once, so reading a long
+            # tail stays linear in its size
+            chunks = []
+            newlines = 0
+            while position > 0 and newlines <= limit:
+                read_size = min(_TAIL_CHUNK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                chunk = f.read(read_size)
+                chunks.append(chunk)
+                newlines += chunk.count(b"\n")
+            chunks.reverse()
+            buffer = b"".join(chunks)
+
+        lines = [line for line in buffer.split(b"\n") if line.strip()]
+        if position > 0 and len(lines) > limit:
+            # The first line may have been cut by the chunk boundary
+            lines = lines[1:]
+        return lines[-limit:] if limit else []
+
+    def _load(self) -> Deque[ConversationEntry]:
+        """Load retained entries into memory on first use (caller holds the locks)"""
+        if self._entries is None:
+            entries = (JSONMemory._decode(line) for line in self._read_tail(self.max_entries))
+            self._entries = deque((e for e in entries if e is not None), maxlen=self.max_entries)
+        return self._entries
+
+    def append(self, entries: List[ConversationEntry]):
+        """Append entries with a single write"""
+        data = b"".join(JSONMemory._encode(asdict(entry)) for entry in entries)
+
+        with self._lock, _file_lock(self.log_file):
+            self._sync()
+            with open(self.log_file, "ab") as f:
+                f.write(data)
+            self._line_count += len(entries)
+            if self._entries is not None:
+                self._entries.extend(entries)
+            self._file_state = self._stat()
+
+            if self._line_count > self.compaction_threshold and not self.is_compacting:
+                self._compaction_thread = threading.Thread(
+                    target=self.compact, name="memory-compaction", daemon=True
+                )
+                self._compaction_thread.start()
+
+    def compact(self):
+        """
+        Rewrite the log so it only holds the most recent max_entries entries.
+
+        The expensive part (reading the tail and writing the new file) runs
+        without the locks; only entries appended meanwhile are copied over
+        while holding them, right before the new log replaces the old one.
+        """
+        with tracing.span("memory.json.compact", file=os.path.basename(self.log_file)) as span:
+            with self._lock, _file_lock(self.log_file, exclusive=False):
+                self._sync()
+                generation = self._generation
+                inode, end = self._file_state
+
+            kept = self._read_tail(self.max_entries, end=end)
+            span.set_attributes(bytes_before=end, kept_entries=len(kept))
+            tmp_file = f"{self.log_file}.{os.getpid()}.compact"
+            try:
+                with open(tmp_file, "wb") as f:
+                    f.writelines(line + b"\n" for line in kept)
+
+                with self._lock, _file_lock(self.log_file):
+                    if generation != self._generation:
+                        # The log was cleared while compacting; drop the stale copy
+                        return
+                    current_inode, size = self._stat()
+                    if current_inode != inode or size < end:
+                        # Another process compacted or cleared the log meanwhile
+                        return
+                    with open(self.log_file, "rb") as src, open(tmp_file, "ab") as dst:
+                        src.seek(end)
+                        appended = src.read()
+                        dst.write(appended)
+                    os.replace(tmp_file, self.log_file)
+                    self._line_count = len(kept) + appended.count(b"\n")
+                    self._file_state = self._stat()
+            finally:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+
+    def recent(self, limit: Optional[int]) -> List[ConversationEntry]:
+        """Get up to ``limit`` most recent entries, oldest first"""
+        with self._lock, _file_lock(self.log_file, exclusive=False):
+            self._sync()
+            entries = self._load()
+            if not limit or limit >= len(entries):
+                return list(entries)
+            # Walk from the newest end so a short read costs O(limit), not O(retention)
+            recent = list(islice(reversed(entries), limit))
+        recent.reverse()
+        return recent
+
+    def clear(self):
+        """Remove every entry from the log"""
+        with self._lock, _file_lock(self.log_file):
+            open(self.log_file, "wb").close()
+            self._line_count = 0
+            self._generation += 1
+            self._entries = deque(maxlen=self.max_entries)
+            self._file_state = self._stat()
 
 
 class JSONMemory:
-    """JSON-based memory management for conversation history"""
+    """
+    Append-only JSON Lines memory management for conversation history.
+
+    Each conversation is stored in its own shard (a JSON Lines file) with
+    its own retention, so reads and writes cost O(conversation size) rather
+    than O(global history). Entries without a conversation ID go to the
+    default shard at ``memory_file``. Shards are opened lazily and at most
+    ``max_resident_shards`` of them are kept in memory, least recently used
+    first out.
+    """
 
-    def __init__(self, memory_file: str = "data/memory.json", max_entries: int = 1000):
+    def __init__(
+        self,
+        memory_file: str = "data/memory.json",
+        max_entries: int = 1000,
+        compaction_ratio: float = 1.5,
+        max_conversation_entries: Optional[int] = None,
+        max_resident_shards: int = 128,
+        shard_directory: Optional[str] = None,
+    ):
         """
         Initialize JSON memory storage.
 
         Args:
-            memory_file: Path to the JSON memory file
-            max_entries: Maximum number of entries to keep
+            memory_file: Path to the memory file. A legacy ``.json`` document is
+                migrated to a ``.jsonl`` log next to it on first use.
+            max_entries: Maximum number of entries to keep in the default shard
+            compaction_ratio: Log size, relative to its retention, that triggers compaction
+            max_conversation_entries: Maximum number of entries to keep per conversation
+                (defaults to max_entries)
+            max_resident_shards: Maximum number of conversation shards cached in memory
+            shard_directory: Directory for conversation shards
+                (defaults to a ``conversations`` directory next to memory_file)
         """
         self.memory_file = memory_file
         self.max_entries = max_entries
-        self._ensure_file_exists()
+        self.max_conversation_entries = max_conversation_entries or max_entries
+        self.compaction_ratio = compaction_ratio
+        self.max_resident_shards = max(1, max_resident_shards)
+        self.log_file = self._log_path(memory_file)
+        self.shard_directory = shard_directory or os.path.join(
+            os.path.dirname(self.log_file), "conversations"
+        )
+
+        self._shards: "OrderedDict[Optional[str], _ConversationLog]" = OrderedDict()
+        self._shards_lock = threading.Lock()
+
+        os.makedirs(self.shard_directory, exist_ok=True)
+        with _file_lock(self.log_file):
+            self._migrate_legacy_file()
+
+    @staticmethod
+    def _log_path(memory_file: str) -> str:
+        """Get the JSON Lines log path for a configured memory file"""
+        if memory_file.endswith(".jsonl"):
+            return memory_file
+        return os.path.splitext(memory_file)[0] + ".jsonl"
 
-    def _ensure_file_exists(self):
-        """Create memory file and directory if they don't exist"""
-        directory = os.path.dirname(self.memory_file)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
+    def _migrate_legacy_file(self):
+        """Convert a legacy ``{"conversations": [...]}`` memory file to the log format"""
+        legacy_file = self.memory_file
+        if legacy_file == self.log_file or not os.path.exists(legacy_file):
+            return
+        if os.path.exists(self.log_file):
+            return
 
-        if not os.path.exists(self.memory_file):
-            with open(self.memory_file, "w") as f:
-                json.dump({"conversations": []}, f, indent=2)
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                return
 
-    def add_entry(self, role: str, content: str, model: Optional[str] = None, metadata: Optional[Dict] = None):
+        conversations = data.get("conversations", []) if isinstance(data, dict) else []
+        tmp_file = self.log_file + ".migrate"
+        with open(tmp_file, "wb") as f:
+            for entry in conversations[-self.max_entries :]:
+                f.write(self._encode(entry))
+        os.replace(tmp_file, self.log_file)
+        os.replace(legacy_file, legacy_file + ".bak")
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> bytes:
+        """Serialize an entry dictionary as one log line"""
+        return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[ConversationEntry]:
+        """Parse one log line, returning None for blank or corrupt lines"""
+        try:
+            e = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(e, dict) or not {"timestamp", "role", "content"} <= e.keys():
+            return None
+        return ConversationEntry(
+            timestamp=e["timestamp"],
+            role=e["role"],
+            content=e["content"],
+            model=e.get("model"),
+            metadata=e.get("metadata"),
+            conversation_id=e.get("conversation_id"),
+        )
+
+    def _shard_path(self, conversation_id: Optional[str]) -> str:
+        """Get the log file holding a conversation"""
+        if conversation_id is None:
+            return self.log_file
+        return os.path.join(self.shard_directory, validate_conversation_id(conversation_id) + ".jsonl")
+
+    def _shard(self, conversation_id: Optional[str]) -> _ConversationLog:
+        """Get a conversation shard, opening it and evicting idle shards as needed"""
+        with self._shards_lock:
+            shard = self._shards.get(conversation_id)
+            if shard is not None:
+                self._shards.move_to_end(conversation_id)
+                return shard
+
+            retention = self.max_entries if conversation_id is None else self.max_conversation_entries
+            shard = _ConversationLog(self._shard_path(conversation_id), retention, self.compaction_ratio)
+            self._shards[conversation_id] = shard
+
+            # Never drop a shard mid-compaction: a second instance for the
+            # same file could lose appends when the compacted log is swapped in
+            idle = [key for key, s in self._shards.items() if not s.is_compacting and key != conversation_id]
+            for key in idle[: max(0, len(self._shards) - self.max_resident_shards)]:
+                del self._shards[key]
+            return shard
+
+    def conversation_ids(self) -> List[str]:
+        """List every conversation that has a shard on disk"""
+        return sorted(
+            name[: -len(".jsonl")]
+            for name in os.listdir(self.shard_directory)
+            if name.endswith(".jsonl")
+        )
+
+    def add_entry(
+        self,
+        role: str,
+        content: str,
+        model: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        conversation_id: Optional[str] = None,
+    ):
         """
         Add a new entry to memory.
 
@@ -52,74 +460,134 @@ class JSONMemory:
             content: The message content
             model: The model used (if assistant)
             metadata: Additional metadata
+            conversation_id: Conversation the entry belongs to
         """
-        entry = ConversationEntry(
-            timestamp=datetime.now().isoformat(),
-            role=role,
-            content=content,
-            model=model,
-            metadata=metadata or {},
-        )
+        self.add_entries([ConversationEntry.create(role, content, model, metadata, conversation_id)])
 
-        with open(self.memory_file, "r") as f:
-            data = json.load(f)
+    def add_entries(self, entries: List[ConversationEntry]):
+        """
+        Append several entries with one write per conversation.
 
-        data["conversations"].append(asdict(entry))
+        Args:
+            entries: Entries to store, oldest first
 
-        # Keep only recent entries
-        if len(data["conversations"]) > self.max_entries:
-            data["conversations"] = data["conversations"][-self.max_entries :]
+        Raises:
+            PartialWriteError: If a write failed after other conversations were written
+        """
+        by_conversation: Dict[Optional[str], List[ConversationEntry]] = {}
+        for entry in entries:
+            by_conversation.setdefault(entry.conversation_id, []).append(entry)
+        with tracing.span("memory.json.add_entries", entries=len(entries), shards=len(by_conversation)):
+            written = set()
+            try:
+                for conversation_id, group in by_conversation.items():
+                    self._shard(conversation_id).append(group)
+                    written.add(conversation_id)
+            except Exception as e:
+                if not written:
+                    raise
+                unwritten = [entry for entry in entries if entry.conversation_id not in written]
+                raise PartialWriteError(unwritten) from e
+
+    def compact(self, conversation_id: Optional[str] = None):
+        """
+        Compact a conversation shard down to its retention limit.
 
-        with open(self.memory_file, "w") as f:
-            json.dump(data, f, indent=2)
+        Args:
+            conversation_id: Conversation to compact (the default shard if None)
+        """
+        self._shard(conversation_id).compact()
 
-    def get_recent(self, limit: int = 10) -> List[ConversationEntry]:
+    def get_recent(self, limit: int = 10, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
         """
         Get recent conversation entries.
 
         Args:
             limit: Number of recent entries to retrieve
+            conversation_id: Conversation to read (the default shard if None)
 
         Returns:
             List of recent ConversationEntry objects
         """
-        with open(self.memory_file, "r") as f:
-            data = json.load(f)
+        with tracing.span("memory.json.get_recent", limit=limit):
+            return self._shard(conversation_id).recent(limit)
 
-        entries = data.get("conversations", [])
-        entries = entries[-limit:] if limit else entries
+    def get_all(self, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
+        """Get all entries of a conversation"""
+        return self.get_recent(limit=None, conversation_id=conversation_id)
 
-        return [
-            ConversationEntry(
-                timestamp=e["timestamp"],
-                role=e["role"],
-                content=e["content"],
-                model=e.get("model"),
-                metadata=e.get("metadata"),
-            )
-            for e in entries
-        ]
+    def query(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        model: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[ConversationEntry]:
+        """
+        Get recent entries matching the given filters.
 
-    def get_all(self) -> List[ConversationEntry]:
-        """Get all conversation entries"""
-        return self.get_recent(limit=None)
+        The JSON logs have no indexes: a query for one conversation scans
+        that shard, and a query without a conversation scans every shard.
+        Use the SQLite backend when filtered lookups matter.
 
-    def clear(self):
-        """Clear all conversation history"""
-        with open(self.memory_file, "w") as f:
-            json.dump({"conversations": []}, f, indent=2)
+        Args:
+            limit: Maximum number of entries to return
+            role: Only return entries with this role
+            model: Only return entries produced by this model
+            conversation_id: Only return entries from this conversation
+            since: Only return entries with a timestamp at or after this ISO time
+            until: Only return entries with a timestamp before this ISO time
+
+        Returns:
+            List of matching ConversationEntry objects, oldest first
+        """
+        with tracing.span("memory.json.query", limit=limit) as span:
+            if conversation_id is not None:
+                candidates = self.get_all(conversation_id)
+            else:
+                candidates = self.get_all()
+                for other_id in self.conversation_ids():
+                    candidates.extend(self.get_all(other_id))
+                candidates.sort(key=lambda e: e.timestamp)
+
+            matches = [e for e in candidates if e.matches(role, model, conversation_id, since, until)]
+            span.set_attributes(scanned=len(candidates), matched=len(matches))
+            return matches[-limit:] if limit else matches
+
+    def clear(self, conversation_id: Optional[str] = None):
+        """
+        Clear conversation history.
+
+        Args:
+            conversation_id: Conversation to clear; clears every conversation if None
+        """
+        with tracing.span("memory.json.clear", all=conversation_id is None):
+            if conversation_id is not None:
+                self._shard(conversation_id).clear()
+                return
+
+            self._shard(None).clear()
+            for other_id in self.conversation_ids():
+                with self._shards_lock:
+                    shard = self._shards.pop(other_id, None)
+                if shard is not None:
+                    shard.clear()
+                os.remove(self._shard_path(other_id))
 
-    def get_context(self, limit: int = 5) -> str:
+    def get_context(self, limit: int = 5, conversation_id: Optional[str] = None) -> str:
         """
         Get conversation context as a formatted string.
 
         Args:
             limit: Number of recent entries to include
+            conversation_id: Conversation to read (the default shard if None)
 
         Returns:
             Formatted conversation history
         """
-        entries = self.get_recent(limit)
+        entries = self.get_recent(limit, conversation_id)
         context = []
 
         for entry in entries:
@@ -0,0 +1,255 @@
+"""SQLite-based memory storage for conversations"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Optional
+
+from ..observability import tracing
+from .json_memory import ConversationEntry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    model TEXT,
+    conversation_id TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_conversation ON entries (conversation_id, id);
+CREATE INDEX IF NOT EXISTS idx_entries_role ON entries (role, id);
+CREATE INDEX IF NOT EXISTS idx_entries_model ON entries (model, id);
+CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp);
+"""
+
+_COLUMNS = "timestamp, role, content, model, metadata, conversation_id"
+
+
+class SQLiteMemory:
+    """
+    SQLite-based memory management for conversation history.
+
+    Implements the same interface as JSONMemory. Entries live in a WAL-mode
+    database with indexes on conversation, role, model and timestamp, so
+    filtered lookups don't have to scan the whole history. Retention is
+    enforced per conversation.
+    """
+
+    def __init__(
+        self,
+        db_file: str = "data/memory.db",
+        max_entries: int = 1000,
+        max_conversation_entries: Optional[int] = None,
+    ):
+        """
+        Initialize SQLite memory storage.
+
+        Args:
+            db_file: Path to the SQLite database file
+            max_entries: Maximum number of entries to keep outside any conversation
+            max_conversation_entries: Maximum number of entries to keep per conversation
+                (defaults to max_entries)
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.max_conversation_entries = max_conversation_entries or max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        # Other server workers may hold the write lock; wait for it rather than fail
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row_to_entry(row: tuple) -> ConversationEntry:
+        """Convert a database row to a ConversationEntry"""
+        timestamp, role, content, model, metadata, conversation_id = row
+        return ConversationEntry(
+            timestamp=timestamp,
+            role=role,
+            content=content,
+            model=model,
+            metadata=json.loads(metadata) if metadata else None,
+            conversation_id=conversation_id,
+        )
+
+    def add_entry(
+        self,
+        role: str,
+        content: str,
+        model: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        conversation_id: Optional[str] = None,
+    ):
+        """
+        Add a new entry to memory.
+
+        Args:
+            role: "user" or "assistant"
+            content: The message content
+            model: The model used (if assistant)
+            metadata: Additional metadata
+            conversation_id: Conversation the entry belongs to
+        """
+        self.add_entries([ConversationEntry.create(role, content, model, metadata, conversation_id)])
+
+    def add_entries(self, entries: List[ConversationEntry]):
+        """
+        Insert several entries in a single transaction.
+
+        Args:
+            entries: Entries to store, oldest first
+        """
+        if not entries:
+            return
+        rows = [
+            (e.timestamp, e.role, e.content, e.model, json.dumps(e.metadata or {}), e.conversation_id)
+            for e in entries
+        ]
+
+        with tracing.span("memory.sqlite.add_entries", entries=len(entries)), self._lock:
+            # Take the write lock up front so concurrent workers queue on busy_timeout
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO entries ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for conversation_id in {e.conversation_id for e in entries}:
+                self._prune(conversation_id)
+
+    def _retention(self, conversation_id: Optional[str]) -> int:
+        """Get the retention limit for a conversation"""
+        return self.max_entries if conversation_id is None else self.max_conversation_entries
+
+    def _prune(self, conversation_id: Optional[str]):
+        """Delete a conversation's rows beyond its retention (caller holds the lock)"""
+        self._conn.execute(
+            "DELETE FROM entries WHERE conversation_id IS ? AND id < "
+            "(SELECT id FROM entries WHERE conversation_id IS ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (conversation_id, conversation_id, self._retention(conversation_id) - 1),
+        )
+
+    def get_recent(self, limit: int = 10, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
+        """
+        Get recent conversation entries.
+
+        Args:
+            limit: Number of recent entries to retrieve
+            conversation_id: Conversation to read (entries without one if None)
+
+        Returns:
+            List of recent ConversationEntry objects
+        """
+        retention = self._retention(conversation_id)
+        limit = min(limit, retention) if limit else retention
+
+        with tracing.span("memory.sqlite.get_recent", limit=limit), self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE conversation_id IS ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, limit),
+            ).fetchall()
+
+        return [self._row_to_entry(row) for row in reversed(rows)]
+
+    def get_all(self, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
+        """Get all entries of a conversation"""
+        return self.get_recent(limit=None, conversation_id=conversation_id)
+
+    def query(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        model: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[ConversationEntry]:
+        """
+        Get recent entries matching the given filters.
+
+        Args:
+            limit: Maximum number of entries to return
+            role: Only return entries with this role
+            model: Only return entries produced by this model
+            conversation_id: Only return entries from this conversation
+            since: Only return entries with a timestamp at or after this ISO time
+            until: Only return entries with a timestamp before this ISO time
+
+        Returns:
+            List of matching ConversationEntry objects, oldest first
+        """
+        clauses = []
+        params: list = []
+        for column, value in (("role", role), ("model", model), ("conversation_id", conversation_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit = limit or self.max_entries
+        params.append(limit)
+
+        with tracing.span("memory.sqlite.query", limit=limit), self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries {where} ORDER BY id DESC LIMIT ?",
+                params,
+            ).fetchall()
+
+        return [self._row_to_entry(row) for row in reversed(rows)]
+
+    def clear(self, conversation_id: Optional[str] = None):
+        """
+        Clear conversation history.
+
+        Args:
+            conversation_id: Conversation to clear; clears every conversation if None
+        """
+        with tracing.span("memory.sqlite.clear", all=conversation_id is None), self._lock:
+            if conversation_id is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE conversation_id = ?", (conversation_id,))
+
+    def get_context(self, limit: int = 5, conversation_id: Optional[str] = None) -> str:
+        """
+        Get conversation context as a formatted string.
+
+        Args:
+            limit: Number of recent entries to include
+            conversation_id: Conversation to read (entries without one if None)
+
+        Returns:
+            Formatted conversation history
+        """
+        entries = self.get_recent(limit, conversation_id)
+        context = []
+
+        for entry in entries:
+            role = entry.role.capitalize()
+            context.append(f"{role}: {entry.content}")
+
+        return "\n".join(context)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
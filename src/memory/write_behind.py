@@ -0,0 +1,337 @@
+"""Asynchronous write-behind layer for memory stores"""
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Optional, Any
+
+from ..observability.metrics import MEMORY_OPERATION_DURATION
+from .json_memory import ConversationEntry, PartialWriteError
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between flush retries while the store keeps failing
+_MAX_RETRY_DELAY = 30.0
+
+
+def _is_cleared(entry: ConversationEntry, cleared: List[Optional[str]]) -> bool:
+    """Whether a clear of these conversations (None for all) removes an entry"""
+    return None in cleared or entry.conversation_id in cleared
+
+
+class WriteBehindMemory:
+    """
+    Buffers memory writes and flushes them from a background task.
+
+    ``add_entry`` only appends to an in-process queue and returns, so request
+    handlers never wait on disk I/O. A background task coalesces queued
+    entries into one ``add_entries`` call on the wrapped store per
+    ``batch_size`` entries or ``flush_interval_ms`` milliseconds, whichever
+    comes first, and runs it in a worker thread. Reads merge the store with
+    entries still waiting to be flushed.
+
+    A failed flush puts back the entries the store did not write and is
+    retried with exponential backoff. After ``max_retries`` consecutive
+    failures the queued entries are dropped and logged, so a broken store
+    cannot grow the queue without bound.
+    """
+
+    def __init__(self, store, batch_size: int = 100, flush_interval_ms: int = 50, max_retries: int = 10):
+        """
+        Initialize the write-behind layer.
+
+        Args:
+            store: Memory store to flush into (JSONMemory or SQLiteMemory)
+            batch_size: Number of queued entries that triggers an immediate flush
+            flush_interval_ms: Maximum time an entry waits in the queue
+            max_retries: Consecutive failed flushes before queued entries are dropped
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_retries = max_retries
+
+        self._pending: List[ConversationEntry] = []
+        self._in_flight: List[ConversationEntry] = []
+        # Clears made while a batch was being written, repeated once it has landed
+        self._clears_after_flush: List[Optional[str]] = []
+        self._has_pending: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Flush statistics
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.consecutive_failures = 0
+        self.entries_dropped = 0
+        self.entries_flushed = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def max_entries(self) -> int:
+        """Retention limit of the wrapped store"""
+        return self.store.max_entries
+
+    async def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is not None:
+            return
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        if self._pending:
+            self._has_pending.set()
+        self._task = asyncio.create_task(self._run(), name="memory-write-behind")
+
+    async def stop(self):
+        """Stop the background task and flush everything still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def _run(self):
+        """Flush loop: wait for the first entry, then for a full batch or the interval"""
+        while True:
+            await self._has_pending.wait()
+            if self.consecutive_failures:
+                # Back off while the store keeps failing, however full the queue gets
+                await asyncio.sleep(min(_MAX_RETRY_DELAY, self.flush_interval * 2 ** self.consecutive_failures))
+            else:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            # Shielded: stop() must not interrupt a batch being written, only wait for it
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write all queued entries to the store in one batch"""
+        if self._flush_lock is None:
+            self._flush_sync()
+            return
+
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            self._has_pending.clear()
+            self._batch_full.clear()
+            if not batch:
+                return
+
+            self._in_flight = batch
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.store.add_entries, batch)
+            except Exception as e:
+                unwritten = e.unwritten if isinstance(e, PartialWriteError) else batch
+                cleared = await self._repeat_clears()
+                self._flush_failed([entry for entry in unwritten if not _is_cleared(entry, cleared)])
+                return
+            finally:
+                self._in_flight = []
+            await self._repeat_clears()
+            self.consecutive_failures = 0
+            self._record_flush(len(batch), started)
+
+    async def _repeat_clears(self) -> List[Optional[str]]:
+        """
+        Clear again the conversations cleared while a batch was being written.
+
+        Returns:
+            The conversations cleared; ``[None]`` when everything was
+        """
+        clears, self._clears_after_flush = self._clears_after_flush, []
+        cleared = [None] if None in clears else list(dict.fromkeys(clears))
+        for conversation_id in cleared:
+            await asyncio.to_thread(self.store.clear, conversation_id)
+        return cleared
+
+    def _flush_failed(self, unwritten: List[ConversationEntry]):
+        """Queue the entries a failed flush did not write for a retry, or drop them once retries run out"""
+        self.failed_flushes += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures > self.max_retries:
+            self.consecutive_failures = 0
+            self.entries_dropped += len(unwritten)
+            logger.exception(
+                "Dropping %d memory entries after %d failed flushes", len(unwritten), self.max_retries + 1
+            )
+            return
+        # Only what the store did not write, so the retry does not duplicate entries
+        self._pending[:0] = unwritten
+        self._has_pending.set()
+        logger.exception("Failed to flush %d memory entries", len(unwritten))
+
+    def _flush_sync(self):
+        """Flush from outside the event loop (before start or after stop)"""
+        batch, self._pending = self._pending, []
+        if batch:
+            started = time.perf_counter()
+            self.store.add_entries(batch)
+            self._record_flush(len(batch), started)
+
+    def _record_flush(self, count: int, started: float):
+        """Update flush statistics"""
+        elapsed = time.perf_counter() - started
+        MEMORY_OPERATION_DURATION.observe(elapsed, operation="flush")
+        elapsed_ms = elapsed * 1000
+        self.flush_count += 1
+        self.entries_flushed += count
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def add_entry(
+        self,
+        role: str,
+        content: str,
+        model: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        conversation_id: Optional[str] = None,
+    ):
+        """
+        Queue a new entry for writing.
+
+        Args:
+            role: "user" or "assistant"
+            content: The message content
+            model: The model used (if assistant)
+            metadata: Additional metadata
+            conversation_id: Conversation the entry belongs to
+        """
+        self.add_entries([ConversationEntry.create(role, content, model, metadata, conversation_id)])
+
+    def add_entries(self, entries: List[ConversationEntry]):
+        """
+        Queue several entries for writing.
+
+        Without a running flush task the entries are written through directly.
+
+        Args:
+            entries: Entries to store, oldest first
+        """
+        if not entries:
+            return
+        if self._task is None:
+            self.store.add_entries(entries)
+            return
+
+        self._pending.extend(entries)
+        self._has_pending.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+
+    def get_recent(self, limit: int = 10, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
+        """
+        Get recent conversation entries, including ones not yet flushed.
+
+        Args:
+            limit: Number of recent entries to retrieve
+            conversation_id: Conversation to read (entries without one if None)
+
+        Returns:
+            List of recent ConversationEntry objects
+        """
+        pending = [e for e in self._in_flight + self._pending if e.conversation_id == conversation_id]
+        if limit and len(pending) >= limit:
+            return pending[-limit:]
+        stored = self.store.get_recent(limit, conversation_id)
+        entries = stored + pending
+        return entries[-limit:] if limit else entries
+
+    def get_all(self, conversation_id: Optional[str] = None) -> List[ConversationEntry]:
+        """Get all entries of a conversation"""
+        return self.get_recent(limit=None, conversation_id=conversation_id)
+
+    def query(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        model: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[ConversationEntry]:
+        """
+        Get recent entries matching the given filters, including queued ones.
+
+        Args:
+            limit: Maximum number of entries to return
+            role: Only return entries with this role
+            model: Only return entries produced by this model
+            conversation_id: Only return entries from this conversation
+            since: Only return entries with a timestamp at or after this ISO time
+            until: Only return entries with a timestamp before this ISO time
+
+        Returns:
+            List of matching ConversationEntry objects, oldest first
+        """
+        limit = limit or self.max_entries
+        filters = (role, model, conversation_id, since, until)
+        pending = [e for e in self._in_flight + self._pending if e.matches(*filters)]
+        stored = self.store.query(limit, *filters) if len(pending) < limit else []
+        return (stored + pending)[-limit:]
+
+    def clear(self, conversation_id: Optional[str] = None):
+        """
+        Clear conversation history, including queued entries.
+
+        A batch being flushed meanwhile may still write entries of the
+        conversation; the flush clears it again once the batch has landed,
+        so they cannot reappear.
+
+        Args:
+            conversation_id: Conversation to clear; clears every conversation if None
+        """
+        self._pending = [e for e in self._pending if not _is_cleared(e, [conversation_id])]
+        if self._in_flight:
+            self._in_flight = [e for e in self._in_flight if not _is_cleared(e, [conversation_id])]
+            self._clears_after_flush.append(conversation_id)
+        if self._has_pending is not None and not self._pending:
+            self._has_pending.clear()
+            self._batch_full.clear()
+        self.store.clear(conversation_id)
+
+    def get_context(self, limit: int = 5, conversation_id: Optional[str] = None) -> str:
+        """
+        Get conversation context as a formatted string.
+
+        Args:
+            limit: Number of recent entries to include
+            conversation_id: Conversation to read (entries without one if None)
+
+        Returns:
+            Formatted conversation history
+        """
+        entries = self.get_recent(limit, conversation_id)
+        context = []
+
+        for entry in entries:
+            role = entry.role.capitalize()
+            context.append(f"{role}: {entry.content}")
+
+        return "\n".join(context)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and flush latency statistics"""
+        return {
+            "queue_depth": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flushes": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "entries_dropped": self.entries_dropped,
+            "entries_flushed": self.entries_flushed,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
@@ -1,5 +1,17 @@
 """Models module with multi-model router"""
 
 from .router import ModelRouter
+from .cache import ResponseCache, create_response_cache
+from .coalescing import RequestCoalescer
+from .limiter import background_traffic
+from .providers import Provider, provider_specs
 
-__all__ = ["ModelRouter"]
+__all__ = [
+    "ModelRouter",
+    "ResponseCache",
+    "RequestCoalescer",
+    "Provider",
+    "background_traffic",
+    "create_response_cache",
+    "provider_specs",
+]
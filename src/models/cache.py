@@ -0,0 +1,370 @@
+"""Response cache for deterministic chat requests"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+def make_request_key(
+    provider: str,
+    model_name: Optional[str],
+    messages: list,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """
+    Build a canonical hash identifying a chat request.
+
+    Args:
+        provider: Model provider name
+        model_name: Provider-specific model name
+        messages: List of message dictionaries
+        temperature: Temperature for generation
+        max_tokens: Maximum tokens to generate
+
+    Returns:
+        Hex digest that is equal for equal requests
+    """
+    payload = json.dumps(
+        [provider, model_name, messages, temperature, max_tokens],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheTier:
+    """In-process LRU cache bounded by entry count and total bytes, with TTL"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024, ttl: float = 3600):
+        """
+        Initialize the in-memory tier.
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses
+            ttl: Seconds a response stays valid
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a serialized response, or None if missing or expired"""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, size, value = item
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a serialized response, evicting least recently used entries"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.total_bytes += size
+
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+        self.total_bytes = 0
+
+
+class SQLiteCacheTier:
+    """
+    On-disk LRU cache in SQLite, bounded by entry count and total bytes, with TTL.
+
+    Server workers can share one database file. Each keeps running totals of
+    what it wrote and re-reads the real totals every ``RESYNC_INTERVAL``
+    writes and before evicting, so the bounds hold across processes.
+    """
+
+    RESYNC_INTERVAL = 64
+
+    def __init__(
+        self,
+        db_file: str = "data/response_cache.db",
+        max_entries: int = 100000,
+        max_bytes: int = 500 * 1024 * 1024,
+        ttl: float = 86400,
+    ):
+        """
+        Initialize the on-disk tier.
+
+        Args:
+            db_file: Path to the SQLite database file
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses
+            ttl: Seconds a response stays valid
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        directory = os.path.dirname(db_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access);
+            """
+        )
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        self._resync()
+
+    def _resync(self):
+        """Re-read the totals, which other processes may have changed"""
+        self.entries, self.total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a serialized response, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.entries -= 1
+                self.total_bytes -= size
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: str):
+        """Store a serialized response, evicting least recently used entries"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now + self.ttl, now),
+            )
+            if old is None:
+                self.entries += 1
+            self.total_bytes += size - (old[0] if old else 0)
+
+            self._writes += 1
+            if self._writes % self.RESYNC_INTERVAL == 0 or (
+                self.entries > self.max_entries or self.total_bytes > self.max_bytes
+            ):
+                self._resync()
+            while self.entries > self.max_entries or self.total_bytes > self.max_bytes:
+                row = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access LIMIT 1").fetchone()
+                if row is None:
+                    break
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (row[0],))
+                self.entries -= 1
+                self.total_bytes -= row[1]
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self.entries = 0
+            self.total_bytes = 0
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of provider responses for deterministic requests.
+
+    Lookups check the in-memory tier first and fall back to the optional
+    SQLite tier, promoting disk hits into memory. Only requests with a
+    temperature at or below ``max_temperature`` are cached, and error
+    responses are never stored.
+    """
+
+    def __init__(
+        self,
+        memory_tier: MemoryCacheTier,
+        disk_tier: Optional[SQLiteCacheTier] = None,
+        max_temperature: float = 0.0,
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            memory_tier: In-process tier
+            disk_tier: Optional on-disk tier
+            max_temperature: Highest temperature whose responses are cached
+        """
+        self.memory_tier = memory_tier
+        self.disk_tier = disk_tier
+        self.max_temperature = max_temperature
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Whether requests at this temperature are deterministic enough to cache"""
+        return temperature <= self.max_temperature
+
+    async def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Request key from make_request_key
+
+        Returns:
+            The cached response dictionary, or None on a miss
+        """
+        value = self.memory_tier.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return json.loads(value)
+
+        if self.disk_tier is not None:
+            value = await asyncio.to_thread(self.disk_tier.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory_tier.set(key, value)
+                return json.loads(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, response: dict):
+        """
+        Store a response in every tier.
+
+        Args:
+            key: Request key from make_request_key
+            response: Provider response dictionary
+        """
+        if "error" in response:
+            return
+        value = json.dumps(response, separators=(",", ":"), ensure_ascii=False)
+        self.memory_tier.set(key, value)
+        if self.disk_tier is not None:
+            await asyncio.to_thread(self.disk_tier.set, key, value)
+        self.stores += 1
+
+    def clear(self):
+        """Remove every cached response"""
+        self.memory_tier.clear()
+        if self.disk_tier is not None:
+            self.disk_tier.clear()
+
+    def close(self):
+        """Release the on-disk tier"""
+        if self.disk_tier is not None:
+            self.disk_tier.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier sizes"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        stats = {
+            "hits": hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "memory": {
+                "hits": self.memory_hits,
+                "entries": len(self.memory_tier),
+                "bytes": self.memory_tier.total_bytes,
+                "evictions": self.memory_tier.evictions,
+            },
+            "disk": None,
+        }
+        if self.disk_tier is not None:
+            stats["disk"] = {
+                "hits": self.disk_hits,
+                "entries": len(self.disk_tier),
+                "bytes": self.disk_tier.total_bytes,
+                "evictions": self.disk_tier.evictions,
+            }
+        return stats
+
+
+def create_response_cache(settings) -> Optional[ResponseCache]:
+    """
+    Create the response cache configured in settings.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A ResponseCache, or None when ``settings.response_cache_enabled`` is off
+    """
+    if not settings.response_cache_enabled:
+        return None
+
+    memory_tier = MemoryCacheTier(
+        max_entries=settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+        ttl=settings.response_cache_ttl,
+    )
+    disk_tier = None
+    if settings.response_cache_db_file:
+        disk_tier = SQLiteCacheTier(
+            settings.response_cache_db_file,
+            max_entries=settings.response_cache_disk_max_entries,
+            max_bytes=settings.response_cache_disk_max_bytes,
+            ttl=settings.response_cache_ttl,
+        )
+    return ResponseCache(memory_tier, disk_tier, max_temperature=settings.response_cache_max_temperature)
@@ -0,0 +1,169 @@
+"""Single-flight coalescing of identical concurrent chat requests"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class _SharedCall:
+    """One in-flight provider call and the callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamBroadcast:
+    """Fans one provider stream out to every subscriber, replaying from the start"""
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self.finished = False
+        self.subscribers = 0
+        self.task: "asyncio.Task | None" = None
+        self._updated = asyncio.Event()
+
+    def publish(self, event: dict):
+        self.events.append(event)
+        self._wake()
+
+    def finish(self):
+        self.finished = True
+        self._wake()
+
+    def _wake(self):
+        # Subscribers hold on to the event they are waiting for, so swap in
+        # a fresh one for the next round instead of clearing this one
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        index = 0
+        while True:
+            updated = self._updated
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            await updated.wait()
+
+
+class RequestCoalescer:
+    """
+    Shares one provider call between concurrent identical requests.
+
+    The first caller for a key starts the call as a background task; callers
+    arriving with the same key while it runs wait on that task and receive
+    the same result. Streams are shared the same way, with late joiners
+    replaying the events produced so far. The provider call is cancelled
+    only once every caller waiting on it has gone away; its key is released
+    at that moment, so a caller arriving afterwards starts a fresh call
+    instead of joining the one being torn down.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _SharedCall] = {}
+        self._streams: Dict[str, _StreamBroadcast] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    async def call(self, key: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Run ``factory()`` once per key among concurrent callers.
+
+        Args:
+            key: Canonical request key
+            factory: Starts the provider call when no identical call is in flight
+
+        Returns:
+            The shared response dictionary
+        """
+        shared = self._calls.get(key)
+        if shared is None:
+            shared = _SharedCall(asyncio.ensure_future(factory()))
+            self._calls[key] = shared
+            shared.task.add_done_callback(lambda _: self._forget(self._calls, key, shared))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        shared.waiters += 1
+        self.max_waiters = max(self.max_waiters, shared.waiters)
+        try:
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                self._forget(self._calls, key, shared)
+                shared.task.cancel()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        """
+        Subscribe to the stream for a key, starting it if needed.
+
+        Args:
+            key: Canonical request key
+            factory: Creates the provider stream when no identical stream is in flight
+
+        Yields:
+            Every event of the shared stream, from the beginning
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _StreamBroadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._drive(key, broadcast, factory()))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        broadcast.subscribers += 1
+        self.max_waiters = max(self.max_waiters, broadcast.subscribers)
+        try:
+            async for event in broadcast.subscribe():
+                yield event
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.task.done():
+                self._forget(self._streams, key, broadcast)
+                broadcast.task.cancel()
+
+    async def _drive(self, key: str, broadcast: _StreamBroadcast, stream: AsyncIterator[dict]):
+        """
+        Pull the provider stream and publish each event to the subscribers.
+
+        An exception from the stream is published as a final error event, so
+        every subscriber sees the stream end the way an unshared one would.
+        """
+        try:
+            async for event in stream:
+                broadcast.publish(event)
+        except Exception as e:
+            logger.exception("Shared stream %s failed", key)
+            broadcast.publish({"type": "error", "error": f"Error processing request: {str(e)}"})
+        finally:
+            self._forget(self._streams, key, broadcast)
+            broadcast.finish()
+
+    @staticmethod
+    def _forget(registry: dict, key: str, entry: Any):
+        """Drop a finished or abandoned call unless a newer one already took its key"""
+        if registry.get(key) is entry:
+            del registry[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "max_waiters": self.max_waiters,
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            "current_waiters": sum(c.waiters for c in self._calls.values())
+            + sum(b.subscribers for b in self._streams.values()),
+        }
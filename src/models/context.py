@@ -0,0 +1,380 @@
+"""Token counting and context window budgeting for outgoing message lists"""
+
+import importlib.util
+import logging
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# tiktoken (optional: exact counts for OpenAI models) is imported on first
+# use, keeping its BPE extension and regex engine off the startup path
+_tiktoken: Any = None
+
+# Context windows by model name prefix; the longest matching prefix wins
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "claude-3": 200000,
+    "claude-2": 100000,
+    "gemini-1.5": 1048576,
+    "gemini-pro": 30720,
+    "llama2": 4096,
+    "llama3": 8192,
+}
+
+# Used when a model name matches none of the prefixes above
+DEFAULT_CONTEXT_WINDOWS = {
+    "openai": 8192,
+    "anthropic": 200000,
+    "google": 30720,
+    "ollama": 4096,
+}
+
+# Starting characters-per-token ratios of the estimator, refined from reported usage
+DEFAULT_CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "google": 4.0,
+    "ollama": 3.7,
+}
+
+# Tokens each message costs on top of its content (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def _load_tiktoken():
+    """Import tiktoken on first call; None if it is not installed"""
+    global _tiktoken
+    if _tiktoken is None:
+        try:
+            import tiktoken
+        except ImportError:
+            tiktoken = False
+        _tiktoken = tiktoken
+    return _tiktoken or None
+
+
+def content_text(content: Any) -> str:
+    """
+    Text of a message's content.
+
+    Multimodal content is a list of parts; only text parts are counted.
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        texts = []
+        for part in content:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, dict) and isinstance(part.get("text"), str):
+                texts.append(part["text"])
+        return "\n".join(texts)
+    return ""
+
+
+def context_window(provider: str, model_name: Optional[str]) -> int:
+    """
+    Look up the context window of a model.
+
+    Args:
+        provider: Model provider name
+        model_name: Provider-specific model name
+
+    Returns:
+        Maximum number of tokens the model accepts
+    """
+    best = None
+    for prefix, window in CONTEXT_WINDOWS.items():
+        if model_name and model_name.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, window)
+    if best is not None:
+        return best[1]
+    return DEFAULT_CONTEXT_WINDOWS.get(provider, 4096)
+
+
+class TokenCounter:
+    """
+    Counts tokens per provider and model.
+
+    OpenAI models are counted exactly with ``tiktoken`` when it is
+    installed. Everything else uses a characters-per-token estimate whose
+    ratio is calibrated against the input token counts providers report.
+    Tokenizer results are cached per text, so history that is resent on
+    every turn is only tokenized once.
+    """
+
+    def __init__(self, cache_size: int = 10000):
+        """
+        Initialize the counter.
+
+        Args:
+            cache_size: Number of tokenized texts whose counts are kept
+        """
+        self.cache_size = cache_size
+        self.chars_per_token: Dict[str, float] = dict(DEFAULT_CHARS_PER_TOKEN)
+        self.calibrations = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache: "OrderedDict[tuple, int]" = OrderedDict()
+        self._encodings: Dict[str, Any] = {}
+
+    def _encoding(self, provider: str, model_name: Optional[str]):
+        """Get the local tokenizer for a model, or None to use the estimator"""
+        if provider != "openai":
+            return None
+        key = model_name or ""
+        if key not in self._encodings:
+            tiktoken = _load_tiktoken()
+            if tiktoken is None:
+                self._encodings[key] = None
+                return None
+            try:
+                encoding = tiktoken.encoding_for_model(key)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Encodings are downloaded on first use; estimate if that fails
+                logger.warning("tiktoken unavailable for %s (%s); estimating token counts", key, e)
+                encoding = None
+            self._encodings[key] = encoding
+        return self._encodings[key]
+
+    def is_loaded(self, provider: str, model_name: Optional[str]) -> bool:
+        """Whether counting for this model needs no tokenizer loading first"""
+        return provider != "openai" or (model_name or "") in self._encodings
+
+    def load(self, provider: str, model_name: Optional[str]):
+        """
+        Load the tokenizer of a model ahead of counting.
+
+        tiktoken may download the encoding on first use, so run this at
+        startup or in a thread rather than on the event loop.
+        """
+        self._encoding(provider, model_name)
+
+    def is_exact(self, provider: str, model_name: Optional[str]) -> bool:
+        """Whether counts for this model come from a real tokenizer"""
+        return self._encoding(provider, model_name) is not None
+
+    def count(self, provider: str, model_name: Optional[str], text: str) -> int:
+        """
+        Count the tokens of a text.
+
+        Args:
+            provider: Model provider name
+            model_name: Provider-specific model name
+            text: Text to count
+
+        Returns:
+            Number of tokens, exact or estimated
+        """
+        if not text:
+            return 0
+        encoding = self._encoding(provider, model_name)
+        if encoding is None:
+            return math.ceil(len(text) / self.chars_per_token.get(provider, 4.0))
+
+        key = (encoding.name, text)
+        count = self._cache.get(key)
+        if count is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return count
+        self.cache_misses += 1
+        count = len(encoding.encode(text, disallowed_special=()))
+        self._cache[key] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return count
+
+    def count_message(self, provider: str, model_name: Optional[str], message: dict) -> int:
+        """Count the tokens a message costs, including per-message overhead"""
+        return self.count(provider, model_name, content_text(message.get("content"))) + MESSAGE_OVERHEAD
+
+    def calibrate(self, provider: str, model_name: Optional[str], messages: list, input_tokens: int):
+        """
+        Refine the estimator from the input token count a provider reported.
+
+        Args:
+            provider: Model provider name
+            model_name: Provider-specific model name
+            messages: Messages that were sent
+            input_tokens: Input tokens the provider billed for them
+        """
+        if not input_tokens or self.is_exact(provider, model_name):
+            return
+        content_tokens = input_tokens - MESSAGE_OVERHEAD * len(messages)
+        chars = sum(len(content_text(m.get("content"))) for m in messages)
+        if content_tokens <= 0 or chars <= 0:
+            return
+        observed = min(8.0, max(1.5, chars / content_tokens))
+        current = self.chars_per_token.get(provider, 4.0)
+        self.chars_per_token[provider] = 0.8 * current + 0.2 * observed
+        self.calibrations += 1
+
+
+class ContextManager:
+    """
+    Fits outgoing message lists into a model's token budget.
+
+    System messages and the most recent turns are kept; older turns that do
+    not fit are dropped or, with ``overflow="summarize"``, replaced by a
+    short extractive summary placed after the system messages.
+    """
+
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        max_input_tokens: int = 0,
+        overflow: str = "drop",
+        summary_max_tokens: int = 256,
+    ):
+        """
+        Initialize the context manager.
+
+        Args:
+            counter: Token counter; a new one is created if None
+            max_input_tokens: Cap on input tokens per request; 0 uses the
+                model's context window minus the output allowance
+            overflow: What to do with older turns that do not fit:
+                "drop" or "summarize"
+            summary_max_tokens: Token budget of the summary of dropped turns
+        """
+        self.counter = counter or TokenCounter()
+        self.max_input_tokens = max_input_tokens
+        self.overflow = overflow
+        self.summary_max_tokens = summary_max_tokens
+
+        self.requests = 0
+        self.trimmed_requests = 0
+        self.dropped_messages = 0
+        self.tokens_saved = 0
+
+    def budget(self, provider: str, model_name: Optional[str], max_tokens: int) -> int:
+        """Input tokens available for a request that may generate ``max_tokens``"""
+        budget = context_window(provider, model_name) - max_tokens
+        if self.max_input_tokens:
+            budget = min(budget, self.max_input_tokens)
+        return max(0, budget)
+
+    def fit(
+        self, messages: list, provider: str, model_name: Optional[str], max_tokens: int
+    ) -> Tuple[list, Dict[str, Any]]:
+        """
+        Fit a message list into the token budget of a model.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            provider: Model provider name
+            model_name: Provider-specific model name
+            max_tokens: Tokens reserved for the response
+
+        Returns:
+            The messages to send, and a summary of what was counted and dropped
+        """
+        self.requests += 1
+        budget = self.budget(provider, model_name, max_tokens)
+        counts = [self.counter.count_message(provider, model_name, m) for m in messages]
+        total = sum(counts)
+        info = {"input_tokens": total, "budget": budget, "dropped": 0, "summarized": False}
+        if total <= budget or not messages:
+            return messages, info
+
+        system = [i for i, m in enumerate(messages) if m.get("role") == "system"]
+        remaining = budget - sum(counts[i] for i in system)
+        # Set aside room for the summary so recent turns cannot crowd it out
+        reserved = min(self.summary_max_tokens, remaining // 2) if self.overflow == "summarize" else 0
+        remaining -= reserved
+
+        # Walk back from the newest turn; the last message is always kept
+        kept = set(system)
+        for i in range(len(messages) - 1, -1, -1):
+            if i in kept:
+                continue
+            if counts[i] > remaining and i != len(messages) - 1:
+                break
+            kept.add(i)
+            remaining -= counts[i]
+        dropped = [i for i in range(len(messages)) if i not in kept]
+
+        fitted = [messages[i] for i in sorted(kept)]
+        remaining += reserved
+        if self.overflow == "summarize" and dropped and remaining > MESSAGE_OVERHEAD:
+            summary = self._summarize(
+                [messages[i] for i in dropped], provider, model_name, min(remaining, self.summary_max_tokens)
+            )
+            if summary is not None:
+                insert_at = sum(1 for i in system if i < min(dropped))
+                fitted.insert(insert_at, summary)
+                info["summarized"] = True
+
+        fitted_total = sum(self.counter.count_message(provider, model_name, m) for m in fitted)
+        self.trimmed_requests += 1
+        self.dropped_messages += len(dropped)
+        self.tokens_saved += max(0, total - fitted_total)
+        info.update(input_tokens=fitted_total, dropped=len(dropped))
+        return fitted, info
+
+    def _summarize(self, dropped: list, provider: str, model_name: Optional[str], budget: int) -> Optional[dict]:
+        """Build a system message outlining dropped turns, newest first until the budget is spent"""
+        header = "Summary of earlier conversation (older turns omitted):"
+        used = self.counter.count(provider, model_name, header) + MESSAGE_OVERHEAD
+        lines = []
+        for message in reversed(dropped):
+            content = " ".join(content_text(message.get("content")).split())
+            if len(content) > 100:
+                content = content[:97] + "..."
+            line = f"- {message.get('role', 'user')}: {content}"
+            cost = self.counter.count(provider, model_name, line) + 1
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return None
+        return {"role": "system", "content": "\n".join([header] + lines[::-1])}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get trimming counters, tokenizer cache counters and calibrated ratios"""
+        counter = self.counter
+        lookups = counter.cache_hits + counter.cache_misses
+        return {
+            "tiktoken_installed": importlib.util.find_spec("tiktoken") is not None,
+            "requests": self.requests,
+            "trimmed_requests": self.trimmed_requests,
+            "dropped_messages": self.dropped_messages,
+            "tokens_saved": self.tokens_saved,
+            "token_cache": {
+                "entries": len(counter._cache),
+                "hits": counter.cache_hits,
+                "misses": counter.cache_misses,
+                "hit_ratio": round(counter.cache_hits / lookups, 4) if lookups else 0.0,
+            },
+            "chars_per_token": {k: round(v, 3) for k, v in counter.chars_per_token.items()},
+            "calibrations": counter.calibrations,
+        }
+
+
+def create_context_manager(context_config: dict) -> Optional[ContextManager]:
+    """
+    Create the context manager described by the "context" router config.
+
+    Returns:
+        A ContextManager, or None when context management is disabled
+    """
+    if not context_config.get("enabled", False):
+        return None
+    return ContextManager(
+        TokenCounter(cache_size=context_config.get("token_cache_size", 10000)),
+        max_input_tokens=context_config.get("max_input_tokens", 0),
+        overflow=context_config.get("overflow", "drop"),
+        summary_max_tokens=context_config.get("summary_max_tokens", 256),
+    )
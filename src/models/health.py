@@ -0,0 +1,190 @@
+"""Per-provider circuit breakers and health scores"""
+
+import time
+from collections import deque
+from typing import Any, Dict
+
+# 4xx statuses that still point at the provider: request timeouts and rate limits
+PROVIDER_FAULT_STATUS = {408, 429}
+
+
+def is_client_error(response: Dict[str, Any]) -> bool:
+    """
+    Whether a failed response was caused by the request itself.
+
+    Such errors (an invalid role, too many tokens, ...) say nothing about
+    the provider's health: they must not trip its breaker, and every other
+    provider would reject the request too.
+    """
+    status = response.get("status_code")
+    return isinstance(status, int) and 400 <= status < 500 and status not in PROVIDER_FAULT_STATUS
+
+
+class CircuitBreaker:
+    """
+    Tracks recent outcomes of one provider and stops sending it traffic
+    while it is failing.
+
+    The breaker is ``closed`` while the provider behaves. When enough of the
+    last ``window`` calls (no older than ``window_seconds``) failed, or were
+    slower than ``slow_call_seconds``, it opens and every call is refused for ``open_seconds``. After that it
+    goes ``half_open`` and lets ``half_open_probes`` calls through: if they
+    succeed quickly the breaker closes again, otherwise it reopens.
+
+    Only provider faults are failures: 429 and 5xx responses, timeouts and
+    connection errors. Calls rejected as client errors are ``release``d.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        window_seconds: float = 60.0,
+        min_requests: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            window: Number of recent calls the rates are computed over
+            window_seconds: Age after which a call no longer counts
+            min_requests: Calls needed in the window before the breaker can open
+            failure_rate: Fraction of failed calls that opens the breaker
+            slow_call_seconds: Latency above which a call counts as slow
+            slow_call_rate: Fraction of slow calls that opens the breaker
+            open_seconds: How long the breaker stays open before probing
+            half_open_probes: Concurrent trial calls allowed while half-open
+        """
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probes_in_flight = 0
+        self._outcomes: "deque[tuple]" = deque(maxlen=window)
+
+    def _refresh(self):
+        """Forget expired calls and move from open to half-open once the open period is over"""
+        now = time.monotonic()
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def is_open(self) -> bool:
+        """Whether calls are currently refused outright"""
+        self._refresh()
+        return self.state == self.OPEN
+
+    def allow(self) -> bool:
+        """
+        Ask to send a call to the provider.
+
+        Returns:
+            True if the call may go ahead; it must then be reported with
+            ``record`` or ``release``
+        """
+        self._refresh()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, latency: float):
+        """
+        Report the outcome of an allowed call.
+
+        Args:
+            success: Whether the provider returned a usable response
+            latency: Seconds the call took
+        """
+        slow = latency >= self.slow_call_seconds
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if success and not slow:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        self._refresh()
+        self._outcomes.append((time.monotonic(), success, slow))
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_requests:
+            failures, slow_calls = self._counts()
+            total = len(self._outcomes)
+            if failures / total >= self.failure_rate or slow_calls / total >= self.slow_call_rate:
+                self._open()
+
+    def release(self):
+        """Report that an allowed call was abandoned without an outcome"""
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def _counts(self) -> tuple:
+        failures = sum(1 for _, success, _ in self._outcomes if not success)
+        slow_calls = sum(1 for _, success, slow in self._outcomes if success and slow)
+        return failures, slow_calls
+
+    def health_score(self) -> float:
+        """
+        Score from 0 (unusable) to 1 (healthy) used to order providers.
+
+        Failed calls count fully against the score and slow calls half. Until
+        ``min_requests`` recent calls are known the provider gets the benefit
+        of the doubt, so one failure does not starve it of traffic. An open
+        breaker scores 0 and a half-open one at most 0.5.
+        """
+        self._refresh()
+        if self.state == self.OPEN:
+            return 0.0
+        score = 1.0
+        if len(self._outcomes) >= self.min_requests:
+            failures, slow_calls = self._counts()
+            score = max(0.0, 1.0 - (failures + 0.5 * slow_calls) / len(self._outcomes))
+        if self.state == self.HALF_OPEN:
+            score = min(score, 0.5)
+        return round(score, 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the breaker state and counters"""
+        self._refresh()
+        failures, slow_calls = self._counts()
+        return {
+            "state": self.state,
+            "health_score": self.health_score(),
+            "window_calls": len(self._outcomes),
+            "window_failures": failures,
+            "window_slow_calls": slow_calls,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_seconds": (
+                round(max(0.0, self.opened_at + self.open_seconds - time.monotonic()), 3)
+                if self.state == self.OPEN
+                else 0.0
+            ),
+        }
@@ -0,0 +1,116 @@
+"""Latency tracking and accounting for hedged requests"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class LatencyHistogram:
+    """
+    Rolling histogram of the latencies of the last ``window`` calls.
+
+    Latencies fall into exponentially sized buckets, so percentiles are
+    computed in time proportional to the number of buckets rather than the
+    number of samples, with a relative error of at most ``growth``.
+    """
+
+    def __init__(self, window: int = 500, min_seconds: float = 0.005, max_seconds: float = 300.0, growth: float = 1.2):
+        """
+        Initialize the histogram.
+
+        Args:
+            window: Number of most recent samples kept
+            min_seconds: Upper bound of the first bucket
+            max_seconds: Latencies above this share the last bucket
+            growth: Ratio between consecutive bucket bounds
+        """
+        self.bounds = []
+        bound = min_seconds
+        while bound < max_seconds:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(max_seconds)
+        self._growth = growth
+        self._min = min_seconds
+        self._counts = [0] * len(self.bounds)
+        self._samples: "deque[int]" = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self._min:
+            return 0
+        index = math.ceil(math.log(seconds / self._min, self._growth))
+        return min(index, len(self.bounds) - 1)
+
+    def record(self, seconds: float):
+        """Add one latency sample, dropping the oldest once the window is full"""
+        if len(self._samples) == self._samples.maxlen:
+            self._counts[self._samples[0]] -= 1
+        bucket = self._bucket(seconds)
+        self._samples.append(bucket)
+        self._counts[bucket] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Latency below which ``pct`` percent of the samples fall.
+
+        Returns:
+            Upper bound of the bucket holding the percentile, or None without samples
+        """
+        if not self._samples:
+            return None
+        target = math.ceil(len(self._samples) * pct / 100)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index]
+        return self.bounds[-1]
+
+
+class HedgeStats:
+    """Counts hedged requests, which provider won them and what they cost"""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.primary_wins = 0
+        self.secondary_wins = 0
+        self.failed = 0
+        self.wasted_seconds = 0.0
+        self.extra_input_tokens = 0
+
+    def record(self, info: Dict[str, Any]):
+        """
+        Add the outcome of one hedged request.
+
+        Args:
+            info: Hedge details attached to the response
+        """
+        self.requests += 1
+        if info["hedged"]:
+            self.hedged += 1
+        if info["winner"] is None:
+            self.failed += 1
+        elif info["winner"] == info["primary"]:
+            self.primary_wins += 1
+        else:
+            self.secondary_wins += 1
+        self.wasted_seconds += info["wasted_ms"] / 1000
+        self.extra_input_tokens += info["extra_input_tokens"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the counters, including how many extra provider calls hedging made"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "primary_wins": self.primary_wins,
+            "secondary_wins": self.secondary_wins,
+            "failed": self.failed,
+            "extra_requests": self.hedged,
+            "wasted_seconds": round(self.wasted_seconds, 3),
+            "extra_input_tokens": self.extra_input_tokens,
+        }
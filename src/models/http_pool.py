@@ -0,0 +1,74 @@
+"""Pooled HTTP clients shared by the model providers"""
+
+import importlib.util
+import logging
+from typing import Any, Dict
+
+import httpx
+
+from ..observability.tracing import inject_traceparent
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """Counts requests and new connections made through one pooled client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    async def _on_request(self, request: httpx.Request):
+        """Request hook: count the request and trace its connection setup"""
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        """httpcore trace callback, only called for events on this request"""
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the counters, including how many requests reused a connection"""
+        reused = max(0, self.requests - self.new_connections)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+def create_http_client(http_config: dict, stats: ConnectionStats) -> httpx.AsyncClient:
+    """
+    Create a long-lived pooled HTTP client.
+
+    Requests carry the ``traceparent`` of the current span, if any.
+
+    Args:
+        http_config: Pool settings (max_connections, max_keepalive_connections,
+            keepalive_expiry, http2, timeout)
+        stats: Counters updated for every request sent through the client
+
+    Returns:
+        An httpx.AsyncClient to be closed on shutdown
+    """
+    http2 = http_config.get("http2", False)
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=http_config.get("max_connections", 100),
+            max_keepalive_connections=http_config.get("max_keepalive_connections", 20),
+            keepalive_expiry=http_config.get("keepalive_expiry", 30.0),
+        ),
+        timeout=http_config.get("timeout", 120.0),
+        event_hooks={"request": [stats._on_request, inject_traceparent]},
+    )
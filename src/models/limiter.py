@@ -0,0 +1,210 @@
+"""Adaptive per-provider concurrency limiting with bounded admission queues"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Set while running background work, whose long calls say nothing about congestion
+_background: ContextVar[bool] = ContextVar("limiter_background", default=False)
+
+
+@contextmanager
+def background_traffic() -> Iterator[None]:
+    """
+    Mark the provider calls made inside the block as background traffic.
+
+    Jobs and batch items still take limiter slots, and their 429s and 5xx
+    still cut the limit, but their latency is left out of the congestion
+    signal: a long generation is not a sign of an overloaded provider.
+    """
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot get a provider slot within its deadline"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one provider that adapts with AIMD.
+
+    Every call that completes quickly and successfully raises the limit by
+    ``1 / limit`` (about one slot per round of calls); a 429 or 5xx
+    response, or a call slower than ``latency_tolerance`` times the recent
+    average, cuts it by ``decrease_factor``. Whole chat calls and stream
+    first events keep separate averages, and background traffic is not
+    timed at all. Calls over the limit wait in a
+    FIFO queue of at most ``queue_size`` entries for at most ``max_wait``
+    seconds. When the queue is full, or the expected wait already exceeds
+    the deadline, the call is refused at once with an estimate of when to
+    retry instead of tying up a worker until it times out.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 10,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        queue_size: int = 100,
+        max_wait: float = 5.0,
+        decrease_factor: float = 0.7,
+        latency_tolerance: float = 3.0,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial_limit: Concurrent calls allowed at start
+            min_limit: Lowest the limit can be cut to
+            max_limit: Highest the limit can grow to
+            queue_size: Calls allowed to wait for a slot
+            max_wait: Seconds a call may wait for a slot
+            decrease_factor: Multiplier applied to the limit on congestion
+            latency_tolerance: Latency, relative to the recent average, that
+                counts as congestion; 0 disables the latency signal
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        # Moving average latency per kind of call: "response" or "first_token"
+        self.avg_latency: Dict[str, float] = {}
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def _slot_seconds(self) -> Optional[float]:
+        """Typical time a call holds its slot, once latency is known"""
+        return self.avg_latency.get("response", self.avg_latency.get("first_token"))
+
+    def expected_wait(self, position: int) -> Optional[float]:
+        """Estimated seconds until a call at this queue position gets a slot, once latency is known"""
+        slot_seconds = self._slot_seconds()
+        if slot_seconds is None:
+            return None
+        return (position + 1) / max(1.0, self.limit) * slot_seconds
+
+    async def acquire(self, max_wait: Optional[float] = None):
+        """
+        Wait for a slot; every successful acquire must be followed by ``release``.
+
+        Args:
+            max_wait: Seconds this call may wait, defaulting to the limiter's
+
+        Raises:
+            Overloaded: The queue is full or the slot would come too late
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        position = len(self._waiters)
+        expected = self.expected_wait(position)
+        if position >= self.queue_size or (expected is not None and expected > max_wait):
+            self.rejected += 1
+            reason = "queue full" if position >= self.queue_size else "expected wait exceeds deadline"
+            raise Overloaded(reason, expected if expected is not None else max_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._abandon(waiter)
+            raise Overloaded("timed out waiting for a slot", self.expected_wait(len(self._waiters)) or max_wait) from None
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Withdraw a waiter, passing on a slot it was granted meanwhile"""
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            self._wake()
+        else:
+            waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(
+        self, latency: float, status_code: Optional[int] = None, success: bool = True, kind: str = "response"
+    ):
+        """
+        Return a slot and adapt the limit to how the call went.
+
+        Args:
+            latency: Seconds the call took (to the first event for streams)
+            status_code: HTTP status of a failed call, if known
+            success: Whether the call succeeded
+            kind: "response" for whole calls, "first_token" for streams
+        """
+        self.in_flight -= 1
+        congested = status_code is not None and (status_code == 429 or status_code >= 500)
+        timed = success and not _background.get()
+        baseline = self.avg_latency.get(kind)
+        if timed and self.latency_tolerance and baseline is not None and latency > baseline * self.latency_tolerance:
+            congested = True
+
+        if congested:
+            # Only back off once per round of calls, not once per failed call
+            now = time.monotonic()
+            if now - self._last_decrease >= (self._slot_seconds() or 0.0):
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self.decreases += 1
+                self._last_decrease = now
+        elif success:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        if timed:
+            self.avg_latency[kind] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+        self._wake()
+
+    def _wake(self):
+        """Hand free slots to waiters in arrival order"""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the current limit, load and counters"""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "avg_latency_ms": {kind: round(latency * 1000, 3) for kind, latency in self.avg_latency.items()},
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "decreases": self.decreases,
+        }
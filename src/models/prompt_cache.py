@@ -0,0 +1,204 @@
+"""Provider-side prompt caching of long, repeated message prefixes"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Beta flag Anthropic required for cache_control before prompt caching became generally available
+ANTHROPIC_PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def prefix_hashes(parts: List[str]) -> List[str]:
+    """
+    Hash every prefix of a sequence of texts.
+
+    Returns:
+        ``hashes[i]`` identifies ``parts[: i + 1]``
+    """
+    hashes = []
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+        hashes.append(digest.copy().hexdigest())
+    return hashes
+
+
+class PrefixTracker:
+    """
+    Remembers recently sent prompt prefixes.
+
+    A prefix is only worth a cache breakpoint once it has been sent before:
+    writing a provider cache entry costs more than a plain prompt, so
+    one-off prefixes are left unmarked.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000):
+        """
+        Initialize the tracker.
+
+        Args:
+            ttl: Seconds a prefix is remembered (the provider cache lifetime)
+            max_entries: Maximum number of remembered prefixes
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def seen_before(self, key: str) -> bool:
+        """Whether a prefix was recorded within the TTL"""
+        seen_at = self._seen.get(key)
+        return seen_at is not None and time.monotonic() - seen_at <= self.ttl
+
+    def record(self, key: str):
+        """Record that a prefix was just sent"""
+        self._seen[key] = time.monotonic()
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+
+class PromptCacheStats:
+    """Counts requests sent with cache breakpoints and the cached tokens providers report"""
+
+    def __init__(self):
+        self.providers: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, provider: str) -> Dict[str, int]:
+        return self.providers.setdefault(
+            provider,
+            {"requests": 0, "marked_requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0},
+        )
+
+    def record(self, provider: str, usage: Optional[dict], marked: bool = False):
+        """
+        Add the usage of one request.
+
+        Args:
+            provider: Model provider name
+            usage: Normalized usage with ``cached_tokens`` and ``cache_write_tokens``
+            marked: Whether the request carried cache breakpoints
+        """
+        counters = self._counters(provider)
+        counters["requests"] += 1
+        if marked:
+            counters["marked_requests"] += 1
+        if usage:
+            cached = usage.get("cached_tokens", 0)
+            written = usage.get("cache_write_tokens", 0)
+            # OpenAI's prompt_tokens include cached ones; Anthropic's input_tokens do not
+            prompt_tokens = usage.get("prompt_tokens") or (usage.get("input_tokens") or 0) + cached + written
+            counters["prompt_tokens"] += prompt_tokens
+            counters["cached_tokens"] += cached
+            counters["cache_write_tokens"] += written
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get per-provider counters and the share of prompt tokens served from cache"""
+        result = {}
+        for provider, counters in self.providers.items():
+            prompt_tokens = counters["prompt_tokens"]
+            result[provider] = {
+                **counters,
+                "cached_ratio": round(counters["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0,
+            }
+        return result
+
+
+def _text_block(text: str, cached: bool) -> dict:
+    block = {"type": "text", "text": text}
+    if cached:
+        block["cache_control"] = EPHEMERAL
+    return block
+
+
+def plan_anthropic(
+    messages: list, tracker: Optional[PrefixTracker], count_tokens, min_tokens: int
+) -> Tuple[Optional[Any], list, bool]:
+    """
+    Build the Anthropic ``system`` parameter and message list, adding cache
+    breakpoints on prefixes that were sent before.
+
+    System messages are moved to the ``system`` parameter. Breakpoints go
+    after the system prompt once it repeats, and, in a conversation whose
+    previous turn was sent before, after the previous turn (so this request
+    reads what the last one cached) and after the newest message (so the
+    next turn can read it). Prefixes shorter than ``min_tokens`` are not
+    cacheable and are left unmarked.
+
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        tracker: Recently sent prefixes; None disables breakpoints
+        count_tokens: Callable returning the token count of a text
+        min_tokens: Shortest prefix the provider will cache
+
+    Returns:
+        The system parameter (or None), the messages, and whether any
+        breakpoint was added
+    """
+    system_text = "\n\n".join(m["content"] for m in messages if m.get("role") == "system")
+    chat = [{"role": m["role"], "content": m["content"]} for m in messages if m.get("role") != "system"]
+    if tracker is None:
+        return system_text or None, chat, False
+
+    hashes = prefix_hashes([system_text] + [f"{m['role']}:{m['content']}" for m in chat])
+    tokens = [count_tokens(system_text)] + [count_tokens(m["content"]) for m in chat]
+    prefix_tokens = []
+    running = 0
+    for count in tokens:
+        running += count
+        prefix_tokens.append(running)
+
+    # Positions in the hashes list: 0 is the system prompt, i + 1 is chat[i]
+    breakpoints = []
+    if system_text and prefix_tokens[0] >= min_tokens and tracker.seen_before(hashes[0]):
+        breakpoints.append(0)
+    if len(chat) >= 3 and tracker.seen_before(hashes[len(chat) - 2]):
+        for position in (len(chat) - 2, len(chat)):
+            if prefix_tokens[position] >= min_tokens:
+                breakpoints.append(position)
+
+    tracker.record(hashes[0])
+    tracker.record(hashes[-1])
+
+    system = None
+    if system_text:
+        system = [_text_block(system_text, 0 in breakpoints)] if breakpoints else system_text
+    for position in breakpoints:
+        if position > 0:
+            message = chat[position - 1]
+            message["content"] = [_text_block(message["content"], True)]
+    return system, chat, bool(breakpoints)
+
+
+def stable_openai_messages(messages: list) -> list:
+    """
+    Order messages for OpenAI's automatic prefix caching.
+
+    OpenAI caches the longest previously seen prompt prefix on its own, so
+    the only requirement is that repeated content comes first and in the
+    same order: system messages are moved ahead of the conversation.
+    """
+    system = [m for m in messages if m.get("role") == "system"]
+    if not system or all(m.get("role") == "system" for m in messages[: len(system)]):
+        return messages
+    return system + [m for m in messages if m.get("role") != "system"]
+
+
+def normalize_openai_usage(usage: dict) -> dict:
+    """Add ``cached_tokens`` from OpenAI's prompt token details"""
+    details = usage.get("prompt_tokens_details") or {}
+    usage["cached_tokens"] = details.get("cached_tokens", 0) if isinstance(details, dict) else 0
+    return usage
+
+
+def anthropic_usage(raw_usage) -> dict:
+    """Convert Anthropic usage, including prompt cache reads and writes"""
+    return {
+        "input_tokens": getattr(raw_usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(raw_usage, "output_tokens", 0) or 0,
+        "cached_tokens": getattr(raw_usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write_tokens": getattr(raw_usage, "cache_creation_input_tokens", 0) or 0,
+    }
@@ -0,0 +1,80 @@
+"""Provider adapter registry"""
+
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Any, Dict, Optional
+
+from .base import Provider, ProviderRuntime, status_code
+
+logger = logging.getLogger(__name__)
+
+# Entry point group under which installed packages register adapters
+ENTRY_POINT_GROUP = "pro_ai.providers"
+
+# Built-in adapters as "module:Class", imported only when configured
+BUILTIN_PROVIDERS = {
+    "openai": f"{__name__}.openai_provider:OpenAIProvider",
+    "anthropic": f"{__name__}.anthropic_provider:AnthropicProvider",
+    "google": f"{__name__}.google_provider:GoogleProvider",
+    "ollama": f"{__name__}.ollama_provider:OllamaProvider",
+}
+
+# Setting that makes a provider available; "api_key" unless listed here
+REQUIRED_SETTINGS = {
+    "ollama": "base_url",
+}
+
+
+def provider_specs(extra: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Collect the adapters that can be used, without importing any of them.
+
+    Args:
+        extra: Adapters from configuration, as name -> "module:Class"
+
+    Returns:
+        Name -> "module:Class" string or entry point; configured adapters
+        override entry points, which override built-ins
+    """
+    specs: Dict[str, Any] = dict(BUILTIN_PROVIDERS)
+    try:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            specs[entry_point.name] = entry_point
+    except Exception as e:
+        logger.warning("Could not read %s entry points: %s", ENTRY_POINT_GROUP, e)
+    specs.update(extra or {})
+    return specs
+
+
+def is_configured(name: str, provider_config: dict) -> bool:
+    """Whether a provider's settings make it available"""
+    return bool(provider_config.get("enabled") or provider_config.get(REQUIRED_SETTINGS.get(name, "api_key")))
+
+
+def load_provider_class(spec: Any) -> type:
+    """
+    Import an adapter class.
+
+    Args:
+        spec: "module:Class" string or entry point
+
+    Returns:
+        The Provider subclass
+    """
+    if hasattr(spec, "load"):
+        return spec.load()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+__all__ = [
+    "BUILTIN_PROVIDERS",
+    "ENTRY_POINT_GROUP",
+    "Provider",
+    "ProviderRuntime",
+    "is_configured",
+    "load_provider_class",
+    "provider_specs",
+    "status_code",
+]
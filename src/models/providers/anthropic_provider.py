@@ -0,0 +1,94 @@
+"""Anthropic Messages API with prompt cache breakpoints"""
+
+from typing import Any, AsyncIterator, Dict
+
+from ..prompt_cache import ANTHROPIC_PROMPT_CACHING_BETA, anthropic_usage, plan_anthropic
+from .base import Provider
+
+
+class AnthropicProvider(Provider):
+    """Anthropic adapter on a shared AsyncAnthropic client"""
+
+    def __init__(self, name: str, config: dict, runtime):
+        super().__init__(name, config, runtime)
+        self._client = None
+
+    @property
+    def model_name(self) -> str:
+        return self.config.get("model", "claude-3-sonnet-20240229")
+
+    def client(self):
+        """Get the shared AsyncAnthropic client"""
+        if self._client is None:
+            from anthropic import AsyncAnthropic
+
+            self._client = AsyncAnthropic(
+                api_key=self.config.get("api_key"),
+                base_url=self.config.get("base_url") or None,
+                http_client=self.runtime.http_client(self.name),
+            )
+        return self._client
+
+    async def startup(self):
+        self.client()
+
+    async def aclose(self):
+        self._client = None
+
+    def _request(self, messages: list) -> Dict[str, Any]:
+        """Build the system, messages and cache breakpoint arguments of a call"""
+        min_tokens = self.runtime.prompt_cache_config.get("min_tokens", 1024)
+        system, chat, marked = plan_anthropic(messages, self.runtime.prefix_tracker, self.count_tokens, min_tokens)
+        kwargs: Dict[str, Any] = {"messages": chat}
+        if system is not None:
+            kwargs["system"] = system
+        if marked:
+            kwargs["extra_headers"] = {"anthropic-beta": ANTHROPIC_PROMPT_CACHING_BETA}
+        return kwargs
+
+    async def chat(self, messages: list, temperature: float, max_tokens: int) -> dict:
+        """Chat with Anthropic API"""
+        try:
+            request = self._request(messages)
+            response = await self.client().messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **request,
+            )
+
+            usage = anthropic_usage(response.usage)
+            self.runtime.prompt_cache_stats.record(self.name, usage, "extra_headers" in request)
+            return {
+                "model": self.name,
+                "content": response.content[0].text,
+                "usage": usage,
+            }
+        except Exception as e:
+            return self._error("Anthropic", e)
+
+    async def stream(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[dict]:
+        """Stream from Anthropic API"""
+        try:
+            request = self._request(messages)
+            stream = await self.client().messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **request,
+            )
+
+            usage = anthropic_usage(None)
+            async for event in stream:
+                if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                    yield {"type": "delta", "content": event.delta.text}
+                elif event.type == "message_start":
+                    usage.update(anthropic_usage(event.message.usage), output_tokens=0)
+                elif event.type == "message_delta":
+                    usage["output_tokens"] = event.usage.output_tokens
+
+            self.runtime.prompt_cache_stats.record(self.name, usage, "extra_headers" in request)
+            yield {"type": "done", "model": self.name, "usage": usage}
+        except Exception as e:
+            yield {"type": "error", **self._error("Anthropic", e)}
@@ -0,0 +1,149 @@
+"""Base class of provider adapters and the resources they share"""
+
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+from ..context import TokenCounter
+from ..prompt_cache import PrefixTracker, PromptCacheStats
+
+if TYPE_CHECKING:
+    import httpx
+
+    from ..http_pool import ConnectionStats
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a provider error, when the client library exposes one"""
+    for candidate in (
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+        getattr(error, "code", None),
+    ):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+class ProviderRuntime:
+    """
+    Resources shared by every provider adapter of a router: pooled HTTP
+    clients, connection counters, the token counter and prompt cache state.
+    """
+
+    def __init__(self, config: dict, counter: Optional[TokenCounter] = None):
+        """
+        Initialize the shared resources.
+
+        Args:
+            config: Router configuration dictionary
+            counter: Token counter of the context manager, if enabled
+        """
+        self.http_config = config.get("http", {})
+        self.prompt_cache_config = config.get("prompt_cache", {})
+        self.counter = counter or TokenCounter()
+        self.connection_stats: Dict[str, "ConnectionStats"] = {}
+        self.prompt_cache_stats = PromptCacheStats()
+        self.prefix_tracker = (
+            PrefixTracker(ttl=self.prompt_cache_config.get("ttl", 300))
+            if self.prompt_cache_config.get("enabled", False)
+            else None
+        )
+        self._http_clients: Dict[str, "httpx.AsyncClient"] = {}
+
+    def http_client(self, provider: str) -> "httpx.AsyncClient":
+        """Get the long-lived pooled HTTP client of a provider"""
+        client = self._http_clients.get(provider)
+        if client is None:
+            # httpx is imported with the first client, not with the app
+            from ..http_pool import ConnectionStats, create_http_client
+
+            stats = self.connection_stats.setdefault(provider, ConnectionStats())
+            client = create_http_client(self.http_config, stats)
+            self._http_clients[provider] = client
+        return client
+
+    async def aclose(self):
+        """Close all pooled HTTP clients"""
+        clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+class Provider:
+    """
+    Adapter for one model provider.
+
+    Subclasses implement ``chat`` and may override ``stream``, ``embed``
+    and ``count_tokens``. SDKs are imported in ``startup`` or on first use,
+    never at module level, so that providers which are not configured are
+    never imported. Adapters are registered in ``BUILTIN_PROVIDERS``, under
+    the ``pro_ai.providers`` entry point group, or with ``MODEL_PROVIDERS``.
+    """
+
+    def __init__(self, name: str, config: dict, runtime: ProviderRuntime):
+        """
+        Initialize the adapter.
+
+        Args:
+            name: Provider name used in requests and routing
+            config: This provider's configuration section
+            runtime: Resources shared with the other providers
+        """
+        self.name = name
+        self.config = config
+        self.runtime = runtime
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """Configured provider-specific model name"""
+        return self.config.get("model")
+
+    async def startup(self):
+        """Create clients so the first request does not pay for it"""
+
+    async def aclose(self):
+        """Release resources not owned by the runtime"""
+
+    async def chat(self, messages: list, temperature: float, max_tokens: int) -> dict:
+        """
+        Get a chat completion.
+
+        Returns:
+            Response with 'model', 'content' and 'usage', or an 'error' and
+            'status_code'
+        """
+        raise NotImplementedError
+
+    async def stream(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion; without native streaming, the whole
+        response arrives as a single delta.
+
+        Yields:
+            ``delta`` events, then a ``done`` or ``error`` event
+        """
+        response = await self.chat(messages, temperature, max_tokens)
+        if "error" in response:
+            yield {"type": "error", **response}
+            return
+        if response.get("content"):
+            yield {"type": "delta", "content": response["content"]}
+        yield {"type": "done", "model": response.get("model", self.name), "usage": response.get("usage", {})}
+
+    async def embed(self, texts: List[str]) -> dict:
+        """
+        Embed texts.
+
+        Returns:
+            Response with 'model', 'embeddings' (one vector per text) and
+            'usage', or an 'error'
+        """
+        return {"error": f"{self.name} does not support embeddings"}
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text for this provider's model"""
+        return self.runtime.counter.count(self.name, self.model_name, text)
+
+    def _error(self, label: str, error: Exception) -> Dict[str, Any]:
+        """Build the error response of a failed call"""
+        return {"error": f"{label} error: {str(error)}", "status_code": status_code(error)}
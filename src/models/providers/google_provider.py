@@ -0,0 +1,130 @@
+"""Google Gemini on a bounded thread pool"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .base import Provider
+
+
+class GoogleProvider(Provider):
+    """Gemini adapter; the SDK is synchronous, so its calls run on a dedicated pool"""
+
+    def __init__(self, name: str, config: dict, runtime):
+        super().__init__(name, config, runtime)
+        self._models: Dict[str, Any] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def model_name(self) -> str:
+        return self.config.get("model", "gemini-1.5-pro")
+
+    def model(self, model_name: Optional[str] = None):
+        """Get the cached GenerativeModel for a Gemini model name"""
+        model_name = model_name or self.model_name
+        model = self._models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+
+            if not self._models:
+                base_url = self.config.get("base_url")
+                if base_url:
+                    genai.configure(
+                        api_key=self.config.get("api_key"),
+                        transport="rest",
+                        client_options={"api_endpoint": base_url},
+                    )
+                else:
+                    genai.configure(api_key=self.config.get("api_key"))
+            model = genai.GenerativeModel(model_name)
+            self._models[model_name] = model
+        return model
+
+    async def startup(self):
+        self.model()
+
+    async def aclose(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Run a blocking Gemini SDK call on the dedicated bounded thread pool.
+
+        The SDK's calls are synchronous; running them here keeps a slow
+        Gemini request from stalling the event loop, and the pool size caps
+        how many threads Gemini traffic can occupy.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.config.get("max_workers", 4),
+                thread_name_prefix="gemini",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    @staticmethod
+    def _generation_config(temperature: float, max_tokens: int):
+        """Build Gemini generation settings"""
+        import google.generativeai as genai
+
+        return genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+        )
+
+    async def chat(self, messages: list, temperature: float, max_tokens: int) -> dict:
+        """Chat with Google Gemini API"""
+        try:
+            response = await self._run(
+                self.model().generate_content,
+                contents=[msg.get("content", "") for msg in messages],
+                generation_config=self._generation_config(temperature, max_tokens),
+            )
+
+            return {
+                "model": self.name,
+                "content": response.text,
+                "usage": {"total_tokens": 0},  # Google doesn't always provide token count
+            }
+        except Exception as e:
+            return self._error("Google", e)
+
+    async def stream(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[dict]:
+        """Stream from Google Gemini API"""
+        try:
+            response = await self._run(
+                self.model().generate_content,
+                contents=[msg.get("content", "") for msg in messages],
+                generation_config=self._generation_config(temperature, max_tokens),
+                stream=True,
+            )
+
+            # Each chunk is fetched by a blocking iterator step, so pull them on the pool too
+            chunks = iter(response)
+            while True:
+                chunk = await self._run(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk.text:
+                    yield {"type": "delta", "content": chunk.text}
+
+            yield {"type": "done", "model": self.name, "usage": {"total_tokens": 0}}
+        except Exception as e:
+            yield {"type": "error", **self._error("Google", e)}
+
+    async def embed(self, texts: List[str]) -> dict:
+        """Embed texts with the Gemini embedding model"""
+        try:
+            import google.generativeai as genai
+
+            self.model()  # configures the API key
+            result = await self._run(
+                genai.embed_content,
+                model=self.config.get("embedding_model", "models/embedding-001"),
+                content=texts,
+            )
+            return {"model": self.name, "embeddings": result["embedding"], "usage": {"total_tokens": 0}}
+        except Exception as e:
+            return self._error("Google", e)
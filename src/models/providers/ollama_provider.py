@@ -0,0 +1,97 @@
+"""Ollama local models over its HTTP API"""
+
+import json
+from typing import AsyncIterator, List
+
+from .base import Provider
+
+
+class OllamaProvider(Provider):
+    """Ollama adapter on the pooled HTTP client"""
+
+    @property
+    def model_name(self) -> str:
+        return self.config.get("model", "llama2")
+
+    @property
+    def base_url(self) -> str:
+        return self.config.get("base_url", "http://localhost:11434")
+
+    async def startup(self):
+        self.runtime.http_client(self.name)
+
+    @staticmethod
+    def _prompt(messages: list) -> str:
+        """Convert messages to prompt format"""
+        prompt = "\n".join([f"{msg['role'].upper()}: {msg['content']}" for msg in messages])
+        return prompt + "\nASSISTANT:"
+
+    async def chat(self, messages: list, temperature: float, max_tokens: int) -> dict:
+        """Chat with Ollama local model"""
+        try:
+            response = await self.runtime.http_client(self.name).post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": self._prompt(messages),
+                    "temperature": temperature,
+                    "stream": False,
+                },
+            )
+            response.raise_for_status()
+
+            result = response.json()
+
+            return {
+                "model": self.name,
+                "content": result.get("response", ""),
+                "usage": {"tokens": result.get("eval_count", 0)},
+            }
+        except Exception as e:
+            return self._error("Ollama", e)
+
+    async def stream(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[dict]:
+        """Stream from Ollama local model"""
+        try:
+            usage = {"tokens": 0}
+            async with self.runtime.http_client(self.name).stream(
+                "POST",
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": self._prompt(messages),
+                    "temperature": temperature,
+                    "stream": True,
+                },
+            ) as response:
+                response.raise_for_status()
+                # Ollama streams one JSON object per line
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    if result.get("response"):
+                        yield {"type": "delta", "content": result["response"]}
+                    if result.get("done"):
+                        usage = {"tokens": result.get("eval_count", 0)}
+
+            yield {"type": "done", "model": self.name, "usage": usage}
+        except Exception as e:
+            yield {"type": "error", **self._error("Ollama", e)}
+
+    async def embed(self, texts: List[str]) -> dict:
+        """Embed texts with the Ollama embeddings API, one request per text"""
+        try:
+            client = self.runtime.http_client(self.name)
+            model_name = self.config.get("embedding_model", self.model_name)
+            embeddings = []
+            for text in texts:
+                response = await client.post(
+                    f"{self.base_url}/api/embeddings",
+                    json={"model": model_name, "prompt": text},
+                )
+                response.raise_for_status()
+                embeddings.append(response.json().get("embedding", []))
+            return {"model": self.name, "embeddings": embeddings, "usage": {}}
+        except Exception as e:
+            return self._error("Ollama", e)
@@ -0,0 +1,98 @@
+"""OpenAI chat completions and embeddings"""
+
+from typing import AsyncIterator, List
+
+from ..prompt_cache import normalize_openai_usage, stable_openai_messages
+from .base import Provider
+
+
+class OpenAIProvider(Provider):
+    """OpenAI adapter on a shared AsyncOpenAI client"""
+
+    def __init__(self, name: str, config: dict, runtime):
+        super().__init__(name, config, runtime)
+        self._client = None
+
+    @property
+    def model_name(self) -> str:
+        return self.config.get("model", "gpt-4")
+
+    def client(self):
+        """Get the shared AsyncOpenAI client"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=self.config.get("api_key"),
+                base_url=self.config.get("base_url") or None,
+                http_client=self.runtime.http_client(self.name),
+            )
+        return self._client
+
+    async def startup(self):
+        self.client()
+
+    async def aclose(self):
+        self._client = None
+
+    async def chat(self, messages: list, temperature: float, max_tokens: int) -> dict:
+        """Chat with OpenAI API"""
+        try:
+            response = await self.client().chat.completions.create(
+                model=self.model_name,
+                messages=stable_openai_messages(messages),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+
+            usage = normalize_openai_usage(response.usage.model_dump()) if response.usage else {}
+            self.runtime.prompt_cache_stats.record(self.name, usage)
+            return {
+                "model": self.name,
+                "content": response.choices[0].message.content,
+                "usage": usage,
+            }
+        except Exception as e:
+            return self._error("OpenAI", e)
+
+    async def stream(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[dict]:
+        """Stream from OpenAI API"""
+        try:
+            stream = await self.client().chat.completions.create(
+                model=self.model_name,
+                messages=stable_openai_messages(messages),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                # Ask for a final chunk with token usage; the pinned SDK has no stream_options argument
+                extra_body={"stream_options": {"include_usage": True}},
+            )
+
+            usage = {}
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield {"type": "delta", "content": chunk.choices[0].delta.content}
+                chunk_usage = getattr(chunk, "usage", None)
+                if chunk_usage:
+                    # Unknown to the pinned SDK's chunk model, so it arrives as a plain dict
+                    if not isinstance(chunk_usage, dict):
+                        chunk_usage = chunk_usage.model_dump()
+                    usage = normalize_openai_usage(chunk_usage)
+
+            self.runtime.prompt_cache_stats.record(self.name, usage)
+            yield {"type": "done", "model": self.name, "usage": usage}
+        except Exception as e:
+            yield {"type": "error", **self._error("OpenAI", e)}
+
+    async def embed(self, texts: List[str]) -> dict:
+        """Embed texts with the OpenAI embeddings API"""
+        try:
+            model_name = self.config.get("embedding_model", "text-embedding-3-small")
+            response = await self.client().embeddings.create(model=model_name, input=texts)
+            return {
+                "model": self.name,
+                "embeddings": [item.embedding for item in response.data],
+                "usage": response.usage.model_dump() if response.usage else {},
+            }
+        except Exception as e:
+            return self._error("OpenAI", e)
@@ -1,21 +1,177 @@
 """Multi-model router supporting multiple AI providers"""
 
-from typing import Optional
-import httpx
-import json
+from typing import Optional, Dict, Any, AsyncIterator, List
+import asyncio
+import time
+
+from ..observability import tracing
+from ..observability.metrics import PROVIDER_FIRST_TOKEN, record_provider_call, usage_tokens
+from .cache import ResponseCache, make_request_key
+from .coalescing import RequestCoalescer
+from .context import create_context_manager
+from .health import CircuitBreaker, is_client_error
+from .hedging import HedgeStats, LatencyHistogram
+from .limiter import AdaptiveLimiter, Overloaded
+from .providers import Provider, ProviderRuntime, is_configured, load_provider_class, provider_specs
+
+
+def _usage_attributes(usage: Optional[dict]) -> Dict[str, int]:
+    """Token counts of a provider response as span attributes"""
+    input_tokens, output_tokens = usage_tokens(usage)
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens}
 
 
 class ModelRouter:
     """Routes requests to different AI model providers"""
 
-    def __init__(self, config: dict):
+    def __init__(
+        self,
+        config: dict,
+        cache: Optional[ResponseCache] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+    ):
         """
         Initialize model router.
 
         Args:
             config: Configuration dictionary with model settings
+            cache: Optional response cache for deterministic requests
+            coalescer: Optional single-flight coalescer for identical concurrent requests
         """
         self.config = config
+        self.cache = cache
+        self.coalescer = coalescer
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        self.latencies: Dict[tuple, LatencyHistogram] = {}
+        self.hedge_stats = HedgeStats()
+        self.context = create_context_manager(config.get("context", {}))
+        self.runtime = ProviderRuntime(config, self.context.counter if self.context is not None else None)
+        self.connection_stats = self.runtime.connection_stats
+        self.provider_specs = provider_specs(config.get("providers"))
+        self._available = [
+            name for name, spec in self.provider_specs.items() if is_configured(name, config.get(name, {}))
+        ]
+        self.providers: Dict[str, Provider] = {}
+
+    async def startup(self):
+        """Load the adapter of every configured provider, warm its clients and load its tokenizer"""
+        for name in self._available:
+            await self._provider(name).startup()
+            await self._load_tokenizer(name)
+
+    async def aclose(self):
+        """Close all provider adapters and pooled clients"""
+        providers = list(self.providers.values())
+        self.providers.clear()
+        for provider in providers:
+            await provider.aclose()
+        await self.runtime.aclose()
+
+    def _provider(self, name: str) -> Optional[Provider]:
+        """
+        Get the adapter of a configured provider, importing it on first use.
+
+        Returns:
+            The adapter, or None if the provider is unknown or not configured
+        """
+        provider = self.providers.get(name)
+        if provider is None and name in self._available:
+            provider_class = load_provider_class(self.provider_specs[name])
+            provider = provider_class(name, self.config.get(name, {}), self.runtime)
+            self.providers[name] = provider
+        return provider
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        """Get the circuit breaker of a provider"""
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(**self.config.get("routing", {}).get("breaker", {}))
+            self.breakers[provider] = breaker
+        return breaker
+
+    def _limiter(self, provider: str) -> Optional[AdaptiveLimiter]:
+        """Get the adaptive concurrency limiter of a provider, if limiting is enabled"""
+        limits = self.config.get("limits", {})
+        if not limits.get("enabled", False):
+            return None
+        limiter = self.limiters.get(provider)
+        if limiter is None:
+            limiter = AdaptiveLimiter(**{k: v for k, v in limits.items() if k != "enabled"})
+            self.limiters[provider] = limiter
+        return limiter
+
+    @staticmethod
+    def _overloaded(provider: str, error: Overloaded) -> Dict[str, Any]:
+        """Error response for a call refused by a provider's limiter"""
+        return {
+            "error": f"{provider} overloaded: {error}",
+            "status_code": 503,
+            "retry_after": round(error.retry_after, 3),
+        }
+
+    @staticmethod
+    def _combine_errors(failures: List[dict]) -> dict:
+        """
+        Merge the errors of every provider tried into one response.
+
+        If every provider refused the call for overload, the result keeps the
+        503 status and the earliest retry time.
+        """
+        if len(failures) == 1:
+            return failures[0]
+        combined = {"error": "; ".join(f["error"] for f in failures)}
+        retry_after = [f["retry_after"] for f in failures if "retry_after" in f]
+        if len(retry_after) == len(failures):
+            combined.update(status_code=503, retry_after=min(retry_after))
+        return combined
+
+    def get_limiter_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the current concurrency limit and queue counters of every provider"""
+        stats = {}
+        for provider in self.get_available_models():
+            limiter = self._limiter(provider)
+            if limiter is not None:
+                stats[provider] = limiter.to_dict()
+        return stats
+
+    def _route(self, model: str) -> List[str]:
+        """
+        Order the providers to try for a request.
+
+        The requested provider comes first, followed by the configured
+        fallback chain. Providers whose health score is below the threshold
+        are moved behind the healthy ones, and providers whose breaker is
+        open are left out. A half-open provider keeps its place so that its
+        probe call gets sent.
+
+        Args:
+            model: Requested model provider
+
+        Returns:
+            Provider names, best candidate first
+        """
+        routing = self.config.get("routing", {})
+        available = self.get_available_models()
+        fallbacks = [p for p in routing.get("fallback_chain", []) if p in available]
+        chain = list(dict.fromkeys([model] + fallbacks))
+
+        min_score = routing.get("min_health_score", 0.5)
+        healthy = [
+            p
+            for p in chain
+            if self._breaker(p).health_score() >= min_score or self._breaker(p).state == CircuitBreaker.HALF_OPEN
+        ]
+        degraded = [p for p in chain if p not in healthy and not self._breaker(p).is_open()]
+        return healthy + degraded
+
+    def get_health(self) -> Dict[str, Dict[str, Any]]:
+        """Get circuit breaker state and health score of every available provider"""
+        return {provider: self._breaker(provider).to_dict() for provider in self.get_available_models()}
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get connection reuse counters of every pooled client"""
+        return {provider: stats.to_dict() for provider, stats in self.connection_stats.items()}
 
     async def chat(
         self,
@@ -23,6 +179,7 @@ class ModelRouter:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        hedge: Optional[bool] = None,
     ) -> dict:
         """
         Send a chat request to the selected model.
@@ -32,143 +189,652 @@ class ModelRouter:
             model: Model provider name (openai, anthropic, google, ollama)
             temperature: Temperature for generation
             max_tokens: Maximum tokens to generate
+            hedge: Race a secondary provider if the primary is slow;
+                None uses the configured default
 
         Returns:
             Response dictionary with model output
         """
         if model is None:
             model = self.config.get("default_model", "openai")
+        if hedge is None:
+            hedge = self.config.get("hedging", {}).get("enabled", False)
 
-        if model == "openai":
-            return await self._chat_openai(messages, temperature, max_tokens)
-        elif model == "anthropic":
-            return await self._chat_anthropic(messages, temperature, max_tokens)
-        elif model == "google":
-            return await self._chat_google(messages, temperature, max_tokens)
-        elif model == "ollama":
-            return await self._chat_ollama(messages, temperature, max_tokens)
-        else:
-            return {"error": f"Unknown model: {model}"}
+        with tracing.span("router.chat", model=model, hedge=hedge) as span:
+            use_cache = self.cache is not None and self.cache.is_cacheable(temperature)
+            if not use_cache and self.coalescer is None:
+                return await self._chat_routed(model, messages, temperature, max_tokens, hedge)
 
-    async def _chat_openai(self, messages: list, temperature: float, max_tokens: int) -> dict:
-        """Chat with OpenAI API"""
-        try:
-            import openai
+            key = self._request_key(model, messages, temperature, max_tokens)
+            if use_cache:
+                cached = await self.cache.get(key)
+                span.set_attribute("cache_hit", cached is not None)
+                if cached is not None:
+                    return cached
+
+            async def fetch() -> dict:
+                response = await self._chat_routed(model, messages, temperature, max_tokens, hedge)
+                # Only cache answers from the provider that was actually asked for
+                if use_cache and response.get("model") == model:
+                    await self.cache.set(key, {k: v for k, v in response.items() if k != "hedge"})
+                return response
+
+            if self.coalescer is not None:
+                return await self.coalescer.call(self._coalescing_key(key, hedge), fetch)
+            return await fetch()
+
+    def _request_key(self, model: str, messages: list, temperature: float, max_tokens: int) -> str:
+        """Canonical key identifying identical requests to a provider"""
+        model_name = self.config.get(model, {}).get("model")
+        return make_request_key(model, model_name, messages, temperature, max_tokens)
+
+    @staticmethod
+    def _coalescing_key(key: str, hedge: bool) -> str:
+        """
+        Key under which identical requests share a call.
+
+        Hedged and unhedged requests never share one: a hedged caller joining
+        an unhedged call would lose the hedge it asked for.
+        """
+        return f"{key}:hedged" if hedge else key
+
+    def _latency(self, provider: str, kind: str) -> LatencyHistogram:
+        """Get the rolling latency histogram of a provider ("response" or "first_token")"""
+        histogram = self.latencies.get((provider, kind))
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self.latencies[(provider, kind)] = histogram
+        return histogram
+
+    def _hedge_delay(self, provider: str, kind: str) -> float:
+        """
+        Seconds to wait for a provider before hedging.
+
+        Uses the configured percentile of the provider's recent latencies,
+        clamped to the configured bounds, or the default delay until enough
+        samples have been seen.
+        """
+        hedging = self.config.get("hedging", {})
+        histogram = self._latency(provider, kind)
+        if len(histogram) < hedging.get("min_samples", 20):
+            return hedging.get("default_delay", 2.0)
+        delay = histogram.percentile(hedging.get("percentile", 95))
+        return min(max(delay, hedging.get("min_delay", 0.1)), hedging.get("max_delay", 10.0))
+
+    def _hedge_pair(self, model: str) -> Optional[tuple]:
+        """Pick the primary and secondary providers of a hedged request, if there are two"""
+        route = self._route(model)
+        if not route:
+            return None
+        primary = route[0]
+        secondary = self.config.get("hedging", {}).get("secondary")
+        if not (
+            secondary
+            and secondary != primary
+            and secondary in self.get_available_models()
+            and not self._breaker(secondary).is_open()
+        ):
+            secondary = next((p for p in route[1:]), None)
+        if secondary is None:
+            return None
+        return primary, secondary
+
+    async def _load_tokenizer(self, provider: str):
+        """Load a provider's tokenizer in a thread, since tiktoken may download it on first use"""
+        model_name = self.config.get(provider, {}).get("model")
+        if not self.runtime.counter.is_loaded(provider, model_name):
+            await asyncio.to_thread(self.runtime.counter.load, provider, model_name)
 
-            openai.api_key = self.config.get("openai", {}).get("api_key")
-            model_name = self.config.get("openai", {}).get("model", "gpt-4")
+    def _fit_context(self, provider: str, messages: list, max_tokens: int) -> list:
+        """Fit the messages into the provider's token budget, if context management is enabled"""
+        if self.context is None:
+            return messages
+        model_name = self.config.get(provider, {}).get("model")
+        fitted, _ = self.context.fit(messages, provider, model_name, max_tokens)
+        return fitted
 
-            response = await openai.ChatCompletion.acreate(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
+    def _calibrate(self, provider: str, messages: list, usage: Optional[dict]):
+        """Refine token estimates from the input token count a provider reported"""
+        if self.context is None or not usage:
+            return
+        # Anthropic reports cached prompt tokens apart from input_tokens
+        input_tokens = usage.get("prompt_tokens") or (
+            (usage.get("input_tokens") or 0) + usage.get("cached_tokens", 0) + usage.get("cache_write_tokens", 0)
+        )
+        if input_tokens:
+            model_name = self.config.get(provider, {}).get("model")
+            self.context.counter.calibrate(provider, model_name, messages, input_tokens)
+
+    def get_context_stats(self) -> Dict[str, Any]:
+        """Get context trimming and token counting statistics"""
+        if self.context is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.context.stats()}
+
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """Get prompt caching counters per provider"""
+        return {
+            "enabled": self.runtime.prefix_tracker is not None,
+            "providers": self.runtime.prompt_cache_stats.to_dict(),
+        }
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """Get hedging counters and the current hedge delay of every available provider"""
+        return {
+            **self.hedge_stats.to_dict(),
+            "delays_ms": {
+                provider: {
+                    kind: round(self._hedge_delay(provider, kind) * 1000, 3) for kind in ("response", "first_token")
+                }
+                for provider in self.get_available_models()
+            },
+        }
+
+    def _hedge_info(self, primary: str, secondary: str, delay: float, hedged: bool, winner: Optional[str],
+                    wasted: float, messages: list) -> Dict[str, Any]:
+        """Describe how a hedged request was served and what the hedge cost"""
+        extra_input_tokens = 0
+        if hedged:
+            # The duplicate call bills its prompt again, in the secondary's tokens
+            model_name = self.config.get(secondary, {}).get("model")
+            extra_input_tokens = sum(
+                self.runtime.counter.count_message(secondary, model_name, m) for m in messages
             )
+        return {
+            "primary": primary,
+            "secondary": secondary,
+            "winner": winner,
+            "hedged": hedged,
+            "delay_ms": round(delay * 1000, 3),
+            "wasted_ms": round(wasted * 1000, 3),
+            "extra_input_tokens": extra_input_tokens,
+        }
 
-            return {
-                "model": "openai",
-                "content": response.choices[0].message.content,
-                "usage": response.usage.dict(),
-            }
-        except Exception as e:
-            return {"error": f"OpenAI error: {str(e)}"}
+    async def _chat_routed(
+        self, model: str, messages: list, temperature: float, max_tokens: int, hedge: bool
+    ) -> dict:
+        """Send a chat request, hedged or along the fallback chain"""
+        if model not in self.provider_specs:
+            return {"error": f"Unknown model: {model}"}
+        if hedge:
+            pair = self._hedge_pair(model)
+            if pair is not None:
+                return await self._chat_hedged(model, *pair, messages, temperature, max_tokens)
+        return await self._chat_with_fallback(model, messages, temperature, max_tokens)
+
+    async def _chat_hedged(
+        self, model: str, primary: str, secondary: str, messages: list, temperature: float, max_tokens: int
+    ) -> dict:
+        """
+        Send a chat request to the primary provider, and to the secondary too
+        if the primary has not answered by its hedge delay.
+
+        The first successful response wins and the other call is cancelled.
+        If the primary fails before the delay the secondary is asked at once,
+        and if both fail the rest of the fallback chain is tried. A client
+        error is returned as is.
+        """
+        delay = self._hedge_delay(primary, "response")
+        start = time.monotonic()
+        tasks = {
+            asyncio.ensure_future(self._call_provider(primary, messages, temperature, max_tokens)): primary
+        }
+        hedged_at = None
+        winner = None
+        response = None
+        rejected = None
+        errors = []
+
+        def hedge_now():
+            nonlocal hedged_at
+            hedged_at = time.monotonic()
+            task = asyncio.ensure_future(self._call_provider(secondary, messages, temperature, max_tokens))
+            tasks[task] = secondary
 
-    async def _chat_anthropic(self, messages: list, temperature: float, max_tokens: int) -> dict:
-        """Chat with Anthropic API"""
         try:
-            from anthropic import AsyncAnthropic
+            pending = set(tasks)
+            timeout = delay
+            while pending and winner is None and rejected is None:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_now()
+                    pending = {t for t in tasks if not t.done()}
+                    timeout = None
+                    continue
+                for task in done:
+                    result = task.result()
+                    if result is None:
+                        errors.append(f"{tasks[task]} unavailable: circuit breaker open")
+                    elif is_client_error(result):
+                        rejected = rejected or result
+                    elif "error" in result:
+                        errors.append(result["error"])
+                    elif winner is None:
+                        winner, response = tasks[task], result
+                if winner is None and rejected is None and hedged_at is None:
+                    hedge_now()
+                    pending = {t for t in tasks if not t.done()}
+                    timeout = None
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Time the losing call ran alongside the winner
+        wasted = 0.0
+        if hedged_at is not None and winner is not None:
+            wasted = time.monotonic() - (hedged_at if winner == primary else start)
+        info = self._hedge_info(primary, secondary, delay, hedged_at is not None, winner, wasted, messages)
+        self.hedge_stats.record(info)
+
+        if response is None and rejected is not None:
+            response = rejected
+        elif response is None:
+            response = await self._chat_with_fallback(model, messages, temperature, max_tokens, (primary, secondary))
+            if "error" in response and errors:
+                response = {**response, "error": "; ".join(errors + [response["error"]])}
+        return {**response, "hedge": info}
+
+    async def _call_provider(self, provider: str, messages: list, temperature: float, max_tokens: int) -> Optional[dict]:
+        """
+        Send a chat request to one provider through its circuit breaker.
+
+        Returns:
+            The provider response, or None if the breaker refused the call
+        """
+        await self._load_tokenizer(provider)
+        with tracing.span("provider.chat", provider=provider, max_tokens=max_tokens) as span:
+            messages = self._fit_context(provider, messages, max_tokens)
+            breaker = self._breaker(provider)
+            if not breaker.allow():
+                span.set_error("circuit breaker open")
+                return None
+            limiter = self._limiter(provider)
+            if limiter is not None:
+                queued = time.monotonic()
+                try:
+                    await limiter.acquire()
+                except Overloaded as e:
+                    breaker.release()
+                    span.set_error(f"overloaded: {e}")
+                    return self._overloaded(provider, e)
+                except BaseException:
+                    breaker.release()
+                    raise
+                span.set_attribute("limiter_wait_ms", round((time.monotonic() - queued) * 1000, 3))
+
+            start = time.monotonic()
+            try:
+                response = await self._dispatch_chat(provider, messages, temperature, max_tokens)
+            except BaseException:
+                breaker.release()
+                if limiter is not None:
+                    limiter.release(time.monotonic() - start, success=False)
+                raise
+            latency = time.monotonic() - start
+            success = "error" not in response
+            record_provider_call(provider, latency, success, response.get("usage"), response.get("status_code"))
+            if is_client_error(response):
+                # The provider is fine; the request was at fault
+                breaker.release()
+            else:
+                breaker.record(success, latency)
+            if limiter is not None:
+                limiter.release(latency, response.get("status_code"), success)
+            if success:
+                self._latency(provider, "response").record(latency)
+                self._calibrate(provider, messages, response.get("usage"))
+                span.set_attributes(**_usage_attributes(response.get("usage")))
+            else:
+                span.set_attribute("status_code", response.get("status_code"))
+                span.set_error(response["error"])
+            return response
+
+    async def _chat_with_fallback(
+        self, model: str, messages: list, temperature: float, max_tokens: int, exclude: tuple = ()
+    ) -> dict:
+        """
+        Send a chat request along the fallback chain until a provider answers.
+
+        Args:
+            model: Requested model provider
+            messages: List of message dictionaries
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            exclude: Providers already tried
+
+        Returns:
+            The first successful response, a client error (which no other
+            provider would accept either), or an error naming every failure
+        """
+        failures = []
+        for provider in self._route(model):
+            if provider in exclude:
+                continue
+            response = await self._call_provider(provider, messages, temperature, max_tokens)
+            if response is None:
+                continue
+            if "error" not in response or is_client_error(response):
+                return response
+            failures.append(response)
+
+        if not failures:
+            return {"error": f"No provider available for {model}: circuit breakers open"}
+        return self._combine_errors(failures)
 
-            api_key = self.config.get("anthropic", {}).get("api_key")
-            model_name = self.config.get("anthropic", {}).get("model", "claude-3-sonnet-20240229")
+    async def _dispatch_chat(self, model: str, messages: list, temperature: float, max_tokens: int) -> dict:
+        """Send a chat request to one provider"""
+        provider = self._provider(model)
+        if provider is None:
+            return self._unavailable(model)
+        return await provider.chat(messages, temperature, max_tokens)
 
-            client = AsyncAnthropic(api_key=api_key)
+    def _unavailable(self, model: str) -> dict:
+        """Error for a provider that is unknown or has no settings"""
+        if model in self.provider_specs:
+            return {"error": f"Model provider not configured: {model}"}
+        return {"error": f"Unknown model: {model}"}
+
+    async def stream_chat(
+        self,
+        messages: list,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        hedge: Optional[bool] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion from the selected model as it is generated.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model provider name (openai, anthropic, google, ollama)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            hedge: Race a secondary provider if the primary is slow to start;
+                None uses the configured default
+
+        Yields:
+            Event dictionaries: ``{"type": "delta", "content": ...}`` for each
+            piece of text, then either ``{"type": "done", "model": ..., "usage": ...}``
+            or ``{"type": "error", "error": ...}``
+        """
+        if model is None:
+            model = self.config.get("default_model", "openai")
+        if hedge is None:
+            hedge = self.config.get("hedging", {}).get("enabled", False)
 
-            response = await client.messages.create(
-                model=model_name,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=messages,
+        if self.coalescer is not None:
+            key = self._coalescing_key(self._request_key(model, messages, temperature, max_tokens), hedge)
+            stream = self.coalescer.stream(
+                key, lambda: self._stream_routed(model, messages, temperature, max_tokens, hedge)
             )
+        else:
+            stream = self._stream_routed(model, messages, temperature, max_tokens, hedge)
 
-            return {
-                "model": "anthropic",
-                "content": response.content[0].text,
-                "usage": {
-                    "input_tokens": response.usage.input_tokens,
-                    "output_tokens": response.usage.output_tokens,
-                },
-            }
-        except Exception as e:
-            return {"error": f"Anthropic error: {str(e)}"}
-
-    async def _chat_google(self, messages: list, temperature: float, max_tokens: int) -> dict:
-        """Chat with Google Gemini API"""
-        try:
-            import google.generativeai as genai
+        async for event in stream:
+            yield event
 
-            api_key = self.config.get("google", {}).get("api_key")
-            model_name = self.config.get("google", {}).get("model", "gemini-1.5-pro")
+    async def _stream_routed(
+        self, model: str, messages: list, temperature: float, max_tokens: int, hedge: bool
+    ) -> AsyncIterator[dict]:
+        """Stream a chat request, hedged or along the fallback chain"""
+        if model not in self.provider_specs:
+            stream = self._error_stream(f"Unknown model: {model}")
+        else:
+            pair = self._hedge_pair(model) if hedge else None
+            if pair is not None:
+                stream = self._stream_hedged(model, *pair, messages, temperature, max_tokens)
+            else:
+                stream = self._stream_with_fallback(model, messages, temperature, max_tokens)
+        async for event in stream:
+            yield event
+
+    @staticmethod
+    async def _error_stream(error: str) -> AsyncIterator[dict]:
+        """A stream consisting of a single error event"""
+        yield {"type": "error", "error": error}
+
+    async def _provider_stream(
+        self, provider: str, messages: list, temperature: float, max_tokens: int
+    ) -> AsyncIterator[dict]:
+        """
+        Stream from one provider through its circuit breaker.
 
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
+        Yields nothing if the breaker refuses the call. Breakers and latency
+        histograms are fed the time to the first event, since total stream
+        time depends on the length of the response.
+        """
+        await self._load_tokenizer(provider)
+        # Ended explicitly: the caller may resume this generator from different tasks
+        span = tracing.start_span("provider.stream", provider=provider, max_tokens=max_tokens)
+        messages = self._fit_context(provider, messages, max_tokens)
+        breaker = self._breaker(provider)
+        if not breaker.allow():
+            span.set_error("circuit breaker open")
+            span.end()
+            return
+        limiter = self._limiter(provider)
+        if limiter is not None:
+            try:
+                await limiter.acquire()
+            except Overloaded as e:
+                breaker.release()
+                span.set_error(f"overloaded: {e}")
+                span.end()
+                yield {"type": "error", **self._overloaded(provider, e)}
+                return
+            except BaseException:
+                breaker.release()
+                span.end()
+                raise
 
-            response = model.generate_content(
-                contents=[msg.get("content", "") for msg in messages],
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                ),
+        start = time.monotonic()
+        first_event_latency = None
+        outcome = None
+        client_error = False
+        status_code = None
+        usage = None
+        try:
+            events = self._dispatch_stream(provider, messages, temperature, max_tokens)
+            async for event in tracing.traced_iter(span, events):
+                if first_event_latency is None:
+                    first_event_latency = time.monotonic() - start
+                    span.add_event("first_token")
+                if event["type"] == "error":
+                    outcome = False
+                    client_error = is_client_error(event)
+                    status_code = event.get("status_code")
+                    span.set_error(event["error"])
+                elif event["type"] == "done":
+                    outcome = True
+                    usage = event.get("usage")
+                    self._calibrate(provider, messages, usage)
+                yield event
+        finally:
+            if limiter is not None:
+                latency = first_event_latency if first_event_latency is not None else time.monotonic() - start
+                limiter.release(latency, status_code, outcome is True, kind="first_token")
+            if outcome is None or client_error:
+                breaker.release()
+            else:
+                breaker.record(outcome, first_event_latency or 0.0)
+            if outcome is not None:
+                record_provider_call(provider, time.monotonic() - start, outcome, usage, status_code)
+                if outcome:
+                    self._latency(provider, "first_token").record(first_event_latency)
+                    PROVIDER_FIRST_TOKEN.observe(first_event_latency, provider=provider)
+            span.set_attributes(
+                cancelled=True if outcome is None else None,
+                status_code=status_code,
+                first_token_ms=round(first_event_latency * 1000, 3) if first_event_latency is not None else None,
+                **_usage_attributes(usage),
             )
+            span.end()
+
+    async def _stream_with_fallback(
+        self, model: str, messages: list, temperature: float, max_tokens: int, exclude: tuple = ()
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat request along the fallback chain.
 
-            return {
-                "model": "google",
-                "content": response.text,
-                "usage": {"total_tokens": 0},  # Google doesn't always provide token count
-            }
-        except Exception as e:
-            return {"error": f"Google error: {str(e)}"}
+        A provider that fails before producing any output is skipped in
+        favour of the next one, unless it rejected the request as a client
+        error; once text has been sent to the client the stream is committed
+        to that provider.
+        """
+        failures = []
+        for provider in self._route(model):
+            if provider in exclude:
+                continue
+            started = False
+            stream = self._provider_stream(provider, messages, temperature, max_tokens)
+            try:
+                async for event in stream:
+                    if event["type"] == "error" and not started and not is_client_error(event):
+                        failures.append({k: v for k, v in event.items() if k != "type"})
+                        break
+                    started = True
+                    yield event
+            finally:
+                await stream.aclose()
+            if started:
+                return
+
+        if not failures:
+            failures.append({"error": f"No provider available for {model}: circuit breakers open"})
+        yield {"type": "error", **self._combine_errors(failures)}
+
+    async def _stream_hedged(
+        self, model: str, primary: str, secondary: str, messages: list, temperature: float, max_tokens: int
+    ) -> AsyncIterator[dict]:
+        """
+        Stream from the primary provider, and from the secondary too if the
+        primary has not produced its first event by its hedge delay.
+
+        Whichever stream produces text first is forwarded and the other is
+        closed; a client error ends the stream as is. The ``done`` event
+        carries the hedge details.
+        """
+        delay = self._hedge_delay(primary, "first_token")
+        start = time.monotonic()
+        streams = {primary: self._provider_stream(primary, messages, temperature, max_tokens)}
+        firsts = {asyncio.ensure_future(streams[primary].__anext__()): primary}
+        hedged_at = None
+        winner = None
+        first_event = None
+        rejected = None
+        errors = []
+
+        def hedge_now():
+            nonlocal hedged_at
+            hedged_at = time.monotonic()
+            streams[secondary] = self._provider_stream(secondary, messages, temperature, max_tokens)
+            firsts[asyncio.ensure_future(streams[secondary].__anext__())] = secondary
 
-    async def _chat_ollama(self, messages: list, temperature: float, max_tokens: int) -> dict:
-        """Chat with Ollama local model"""
         try:
-            base_url = self.config.get("ollama", {}).get("base_url", "http://localhost:11434")
-            model_name = self.config.get("ollama", {}).get("model", "llama2")
-
-            # Convert messages to prompt format
-            prompt = "\n".join([f"{msg['role'].upper()}: {msg['content']}" for msg in messages])
-            prompt += "\nASSISTANT:"
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{base_url}/api/generate",
-                    json={
-                        "model": model_name,
-                        "prompt": prompt,
-                        "temperature": temperature,
-                        "stream": False,
-                    },
-                )
-
-            result = response.json()
-
-            return {
-                "model": "ollama",
-                "content": result.get("response", ""),
-                "usage": {"tokens": result.get("eval_count", 0)},
-            }
-        except Exception as e:
-            return {"error": f"Ollama error: {str(e)}"}
+            try:
+                pending = set(firsts)
+                timeout = delay
+                while pending and winner is None and rejected is None:
+                    done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        hedge_now()
+                        pending = {f for f in firsts if not f.done()}
+                        timeout = None
+                        continue
+                    for future in done:
+                        try:
+                            event = future.result()
+                        except StopAsyncIteration:
+                            errors.append(f"{firsts[future]} unavailable: circuit breaker open")
+                            continue
+                        if event["type"] == "error" and is_client_error(event):
+                            rejected = rejected or event
+                        elif event["type"] == "error":
+                            errors.append(event["error"])
+                        elif winner is None:
+                            winner, first_event = firsts[future], event
+                    if winner is None and rejected is None and hedged_at is None:
+                        hedge_now()
+                        pending = {f for f in firsts if not f.done()}
+                        timeout = None
+            finally:
+                for future in firsts:
+                    future.cancel()
+                # Let cancelled reads unwind before closing their streams
+                await asyncio.gather(*firsts, return_exceptions=True)
+                for provider, stream in streams.items():
+                    if provider != winner:
+                        await stream.aclose()
+
+            wasted = 0.0
+            if hedged_at is not None and winner is not None:
+                wasted = time.monotonic() - (hedged_at if winner == primary else start)
+            info = self._hedge_info(primary, secondary, delay, hedged_at is not None, winner, wasted, messages)
+            self.hedge_stats.record(info)
+
+            if winner is None and rejected is not None:
+                yield rejected
+                return
+            if winner is None:
+                stream = self._stream_with_fallback(model, messages, temperature, max_tokens, (primary, secondary))
+                async for event in stream:
+                    if event["type"] == "error" and errors:
+                        event = {**event, "error": "; ".join(errors + [event["error"]])}
+                    elif event["type"] == "done":
+                        event = {**event, "hedge": info}
+                    yield event
+                return
+
+            event = first_event
+            while True:
+                if event["type"] == "done":
+                    event = {**event, "hedge": info}
+                yield event
+                if event["type"] in ("done", "error"):
+                    break
+                try:
+                    event = await streams[winner].__anext__()
+                except StopAsyncIteration:
+                    break
+        finally:
+            if winner is not None:
+                await streams[winner].aclose()
+
+    async def _dispatch_stream(
+        self, model: str, messages: list, temperature: float, max_tokens: int
+    ) -> AsyncIterator[dict]:
+        """Stream a chat request from one provider"""
+        provider = self._provider(model)
+        if provider is None:
+            yield {"type": "error", **self._unavailable(model)}
+            return
+
+        async for event in provider.stream(messages, temperature, max_tokens):
+            yield event
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> dict:
+        """
+        Embed texts with a provider's embedding model.
+
+        Args:
+            texts: Texts to embed
+            model: Model provider name; defaults to the configured default
+
+        Returns:
+            Response with 'model', 'embeddings' and 'usage', or an 'error'
+        """
+        model = model or self.config.get("default_model", "openai")
+        provider = self._provider(model)
+        if provider is None:
+            return self._unavailable(model)
+        with tracing.span("provider.embed", provider=model, texts=len(texts)) as span:
+            response = await provider.embed(texts)
+            if "error" in response:
+                span.set_error(response["error"])
+            return response
 
     def get_available_models(self) -> list:
         """Get list of available model providers"""
-        models = []
-        if self.config.get("openai", {}).get("api_key"):
-            models.append("openai")
-        if self.config.get("anthropic", {}).get("api_key"):
-            models.append("anthropic")
-        if self.config.get("google", {}).get("api_key"):
-            models.append("google")
-        # Ollama is always available if base_url is set
-        if self.config.get("ollama", {}).get("base_url"):
-            models.append("ollama")
-        return models
+        return list(self._available)
@@ -0,0 +1,28 @@
+"""Metrics and tracing for monitoring the server"""
+
+from .metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    LoopLagMonitor,
+    MetricsMiddleware,
+    MetricsRegistry,
+    record_provider_call,
+)
+from .tracing import TracingMiddleware, Tracer
+
+__all__ = [
+    "CONTENT_TYPE",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "LoopLagMonitor",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "TracingMiddleware",
+    "Tracer",
+    "record_provider_call",
+]
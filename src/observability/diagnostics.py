@@ -0,0 +1,269 @@
+"""Event loop blocking detection and sampling profiles for debugging"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional, Set
+
+from .metrics import EVENT_LOOP_BLOCKED
+
+logger = logging.getLogger(__name__)
+
+# (file, function) of the innermost Python frame of a thread that is only
+# waiting: the event loop in its selector, or a worker on a lock or queue
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class LoopWatchdog:
+    """
+    Detects callbacks that block the event loop and captures their stacks.
+
+    A heartbeat task on the loop records the time every few milliseconds. A
+    watchdog thread checks the heartbeat; once it is older than
+    ``threshold`` the loop is stuck in one callback, and the thread takes
+    the loop thread's stack right then, so the report shows the blocking
+    code rather than wherever the loop happens to be afterwards. When the
+    loop resumes the report is completed with the stall's duration, logged
+    and kept with the most recent ``max_reports`` others.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_reports: int = 50):
+        """
+        Initialize the watchdog.
+
+        Args:
+            threshold: Seconds a callback may hold the loop before it is reported
+            max_reports: Number of recent stall reports kept
+        """
+        self.threshold = threshold
+        self.interval = min(0.025, threshold / 4)
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+        self.stalls = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        self.loop_thread_id: Optional[int] = None
+        self._beat = 0.0
+        self._stall: Optional[Dict[str, Any]] = None
+        self._stall_lock = threading.Lock()
+        self._requests: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self):
+        """Start watching the running event loop"""
+        if self._task is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog-heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Stop watching"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def request_started(self, key: int, label: str):
+        """Note a request in flight, so stall reports can name it"""
+        self._requests[key] = label
+
+    def request_finished(self, key: int):
+        self._requests.pop(key, None)
+
+    async def _heartbeat(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._beat = now
+            lag = max(0.0, now - start - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold or self._stall is not None:
+                self._finish_stall(lag)
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is stuck"""
+        while not self._stopped.wait(self.interval):
+            stalled = time.perf_counter() - self._beat - self.interval
+            if stalled < self.threshold:
+                continue
+            with self._stall_lock:
+                if self._stall is not None:
+                    continue
+                frame = sys._current_frames().get(self.loop_thread_id)
+                self._stall = {
+                    "stack": "".join(traceback.format_stack(frame)) if frame is not None else None,
+                    "requests": list(self._requests.values()),
+                }
+
+    def _finish_stall(self, lag: float):
+        """Complete, log and keep the report of a stall that just ended"""
+        with self._stall_lock:
+            stall, self._stall = self._stall, None
+        if lag < self.threshold:
+            # Caught by the thread but over before the threshold, as the loop measures it
+            return
+        report = {
+            "time": datetime.now().isoformat(),
+            "duration_ms": round(lag * 1000, 1),
+            # None when the stall ended between two watchdog checks
+            "stack": stall["stack"] if stall else None,
+            "requests": stall["requests"] if stall else [],
+        }
+        self.stalls += 1
+        self.reports.append(report)
+        EVENT_LOOP_BLOCKED.observe(lag)
+        logger.warning(
+            "Event loop blocked for %.0f ms (requests in flight: %s)\n%s",
+            report["duration_ms"],
+            ", ".join(report["requests"]) or "none",
+            report["stack"] or "stack not captured",
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Loop lag, stall count and recent stall reports, newest first"""
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stalls": self.stalls,
+            "reports": list(reversed(self.reports)),
+        }
+
+
+class DiagnosticsMiddleware:
+    """ASGI middleware telling the watchdog which requests are in flight"""
+
+    def __init__(self, app, watchdog: LoopWatchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        key = id(scope)
+        self.watchdog.request_started(key, f"{scope.get('method', 'WS')} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.request_finished(key)
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """A file's path relative to the import path entry that contains it"""
+    for entry in sorted((p for p in sys.path if p), key=len, reverse=True):
+        prefix = os.path.join(os.path.abspath(entry), "")
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def collapse_stack(frame) -> str:
+    """A stack in the collapsed format of flamegraph.pl, outermost frame first"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """
+    Samples thread stacks at a fixed interval and counts identical stacks.
+
+    The output is the collapsed ("folded") stack format: one line per
+    distinct stack, frames separated by semicolons and followed by its
+    sample count, which flamegraph.pl, speedscope and most flame graph
+    viewers read directly. Only one profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(
+        self,
+        seconds: float,
+        interval: float = 0.005,
+        thread_ids: Optional[Set[int]] = None,
+        include_idle: bool = False,
+    ) -> str:
+        """
+        Sample stacks for a while; blocks the calling thread.
+
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            thread_ids: Threads to sample (every other thread if None)
+            include_idle: Keep samples of threads only waiting on I/O, a lock or a queue
+
+        Returns:
+            Collapsed stacks prefixed with the thread name, most frequent first
+
+        Raises:
+            RuntimeError: If another profile is running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own_id = threading.get_ident()
+            names: Dict[int, str] = {}
+            counts: Counter = Counter()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_id or (thread_ids is not None and ident not in thread_ids):
+                        continue
+                    if not include_idle and _is_idle(frame):
+                        continue
+                    if ident not in names:
+                        names.update((t.ident, t.name) for t in threading.enumerate())
+                    name = names.get(ident, str(ident)).replace(";", ":").replace(" ", "_")
+                    counts[f"{name};{collapse_stack(frame)}"] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
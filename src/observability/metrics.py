@@ -0,0 +1,371 @@
+"""In-process metrics in the Prometheus text exposition format"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Provider calls take from milliseconds to minutes; memory operations are much faster
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base of the metric types: a name, help text and label names"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        """Sample lines of this metric"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """HELP and TYPE lines followed by the samples"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value per label set.
+
+    Updates are plain dict and integer operations without locking. They run
+    on the event loop thread, so the only cost on the request path is a
+    dictionary lookup and an addition.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """Add to the counter of a label set"""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        """Set the value of a label set, for collectors mirroring totals kept elsewhere"""
+        self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        """Current value of a label set"""
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down, usually set when scraped"""
+
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, per label set.
+
+    Each label set keeps one count per bucket plus the sum and count of all
+    observations. Recording is a binary search over the bucket bounds and
+    three additions; cumulative bucket counts are only computed when the
+    metrics are rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        """Record one observation"""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # Bucket counts (the last one is +Inf), then sum and count
+            series = self._series[key] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, **labels) -> int:
+        """Number of observations of a label set"""
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics of this process plus collectors run at scrape time.
+
+    Collectors set gauges from state that is cheaper to read when scraped
+    than to track on every request, such as queue depths.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered as a {existing.kind}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        """Get or create a gauge"""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Tuple = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram"""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Run a function before every render, typically to set gauges"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Run the collectors and render every metric in the text format"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+PROVIDER_REQUEST_DURATION = REGISTRY.histogram(
+    "provider_request_duration_seconds",
+    "Model provider call latency; for streams the time to the end of the stream",
+    ("provider", "outcome"),
+)
+PROVIDER_FIRST_TOKEN = REGISTRY.histogram(
+    "provider_time_to_first_token_seconds", "Time until a streaming provider produced its first event", ("provider",)
+)
+PROVIDER_TOKENS = REGISTRY.counter(
+    "provider_tokens_total", "Tokens sent to and received from model providers", ("provider", "direction")
+)
+PROVIDER_ERRORS = REGISTRY.counter(
+    "provider_errors_total", "Failed model provider calls by HTTP status", ("provider", "status")
+)
+MEMORY_OPERATION_DURATION = REGISTRY.histogram(
+    "memory_operation_duration_seconds",
+    "Conversation memory latency: reads, writes from request handlers and background flushes",
+    ("operation",),
+    FAST_BUCKETS,
+)
+
+# Set at scrape time from the router, memory store and job queue
+MEMORY_QUEUE_DEPTH = REGISTRY.gauge("memory_write_queue_depth", "Memory entries waiting to be flushed")
+JOBS = REGISTRY.gauge("jobs", "Jobs in the persistent queue by status", ("status",))
+PROVIDER_IN_FLIGHT = REGISTRY.gauge("provider_in_flight", "Provider calls holding a concurrency slot", ("provider",))
+PROVIDER_QUEUE_DEPTH = REGISTRY.gauge(
+    "provider_queue_depth", "Provider calls waiting for a concurrency slot", ("provider",)
+)
+PROVIDER_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "provider_concurrency_limit", "Current adaptive concurrency limit", ("provider",)
+)
+PROVIDER_REJECTED = REGISTRY.counter(
+    "provider_admission_rejected_total", "Calls refused by a provider's limiter", ("provider", "reason")
+)
+PROVIDER_HEALTH = REGISTRY.gauge(
+    "provider_health_score", "Circuit breaker health score; 0 while the breaker is open", ("provider",)
+)
+HEDGE_REQUESTS = REGISTRY.counter("hedge_requests_total", "Hedged requests by outcome", ("outcome",))
+HEDGE_WASTED = REGISTRY.counter(
+    "hedge_wasted_seconds_total", "Time losing hedged calls ran alongside the winner"
+)
+PROMPT_CACHE_TOKENS = REGISTRY.counter(
+    "prompt_cache_tokens_total", "Prompt tokens by provider cache outcome", ("provider", "kind")
+)
+RESPONSE_CACHE_LOOKUPS = REGISTRY.counter(
+    "response_cache_lookups_total", "Response cache lookups", ("result",)
+)
+COALESCED_REQUESTS = REGISTRY.counter(
+    "coalesced_requests_total", "Requests that shared another request's provider call"
+)
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled on time", buckets=FAST_BUCKETS
+)
+EVENT_LOOP_BLOCKED = REGISTRY.histogram(
+    "event_loop_blocked_seconds", "Stalls of the event loop longer than the diagnostics threshold"
+)
+JOB_ATTEMPTS = REGISTRY.counter("job_attempts_total", "Job attempts by outcome", ("outcome",))
+JOB_RUN_DURATION = REGISTRY.histogram("job_run_duration_seconds", "Time one attempt of a queued job ran")
+
+
+def usage_tokens(usage: Optional[dict]) -> Tuple[int, int]:
+    """
+    Input and output token counts from a provider's usage report.
+
+    OpenAI reports prompt/completion tokens, Anthropic input/output tokens
+    with cached prompt tokens apart, and Ollama only generated tokens.
+    """
+    if not usage:
+        return 0, 0
+    input_tokens = usage.get("prompt_tokens") or (
+        (usage.get("input_tokens") or 0) + usage.get("cached_tokens", 0) + usage.get("cache_write_tokens", 0)
+    )
+    output_tokens = usage.get("completion_tokens") or usage.get("output_tokens") or usage.get("tokens") or 0
+    return input_tokens, output_tokens
+
+
+def record_provider_call(
+    provider: str, seconds: float, success: bool, usage: Optional[dict] = None, status_code: Optional[int] = None
+):
+    """
+    Record the latency, tokens and outcome of one provider call.
+
+    Args:
+        provider: Provider name
+        seconds: Call latency
+        success: Whether the call succeeded
+        usage: Usage report of a successful call
+        status_code: HTTP status of a failed call, if known
+    """
+    PROVIDER_REQUEST_DURATION.observe(seconds, provider=provider, outcome="success" if success else "error")
+    if not success:
+        PROVIDER_ERRORS.inc(provider=provider, status=str(status_code) if status_code else "none")
+        return
+    input_tokens, output_tokens = usage_tokens(usage)
+    if input_tokens:
+        PROVIDER_TOKENS.inc(input_tokens, provider=provider, direction="input")
+    if output_tokens:
+        PROVIDER_TOKENS.inc(output_tokens, provider=provider, direction="output")
+
+
+class LoopLagMonitor:
+    """
+    Measure event loop lag by sleeping for a fixed interval and recording
+    how much later than requested the loop woke the task up.
+
+    Anything that blocks the loop (synchronous I/O, CPU-heavy work in a
+    handler) shows up as lag for every request being served at the time.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - start - self.interval))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request.
+
+    Requests are labelled with the path template of the route that handled
+    them (``/api/memory``, not the query string or path parameters) so the
+    number of series stays bounded; unmatched paths share one label.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", None) or "unmatched",
+                status=str(status),
+            )
@@ -0,0 +1,601 @@
+"""Request tracing with W3C trace context and OTLP/JSON export"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_tracer: Optional["Tracer"] = None
+
+
+class Span:
+    """
+    One timed operation of a trace.
+
+    Spans that were not sampled keep their IDs, so that their children and
+    outgoing requests carry the same trace and sampling decision, but record
+    no attributes and are never exported.
+
+    Used as a context manager the span becomes the current span, and ends
+    (recording any exception) on exit.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "sampled", "kind", "start_ns", "end_ns",
+        "attributes", "events", "status", "message", "first_child_start_ns", "last_child_end_ns",
+        "_parent", "_tracer", "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: int, parent_id: Optional[int], sampled: bool,
+                 kind: int = INTERNAL, parent: Optional["Span"] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[tuple] = []
+        self.status = STATUS_UNSET
+        self.message = ""
+        self.first_child_start_ns: Optional[int] = None
+        self.last_child_end_ns: Optional[int] = None
+        self._parent = parent
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value naming this span as the parent"""
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute; ignored when the span is not sampled"""
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        """Attach several attributes"""
+        if self.sampled:
+            for key, value in attributes.items():
+                if value is not None:
+                    self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        """Record a point in time within the span"""
+        if self.sampled:
+            self.events.append((time.time_ns(), name, attributes))
+
+    def set_error(self, message: str):
+        """Mark the span as failed"""
+        self.status = STATUS_ERROR
+        self.message = str(message)[:500]
+
+    def end(self, end_ns: Optional[int] = None):
+        """Finish the span and hand it to the exporter if sampled"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if not self.sampled:
+            return
+        parent = self._parent
+        if parent is not None:
+            if parent.first_child_start_ns is None:
+                parent.first_child_start_ns = self.start_ns
+            if parent.last_child_end_ns is None or self.end_ns > parent.last_child_end_ns:
+                parent.last_child_end_ns = self.end_ns
+        self._tracer._finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+            self.set_attribute("cancelled", True)
+        elif exc is not None:
+            self.set_error(f"{exc_type.__name__}: {exc}")
+        self.end()
+        _current.reset(self._token)
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form"""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.message} if self.status else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(at), "name": name, "attributes": _otlp_attributes(attributes)}
+                for at, name, attributes in self.events
+            ]
+        return span
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled"""
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def add_event(self, name: str, **attributes):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+    def end(self, end_ns: Optional[int] = None):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class FileSpanExporter:
+    """
+    Appends each batch of spans to a file as one line of OTLP/JSON.
+
+    This is the format of the OpenTelemetry Collector's file exporter, so
+    the file can be replayed into a collector with its ``otlpjsonfile``
+    receiver. Each batch is written with a single append, so several
+    worker processes can share one file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]):
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def close(self):
+        pass
+
+
+class OTLPHttpExporter:
+    """Sends batches of spans to an OTLP/HTTP collector as JSON"""
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0):
+        """
+        Initialize the exporter.
+
+        Args:
+            endpoint: Collector base URL, e.g. http://localhost:4318
+            headers: Extra request headers, such as an API key
+            timeout: Seconds to wait for the collector
+        """
+        import httpx
+
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        # A plain client: export requests must not be traced themselves
+        self._client = httpx.Client(timeout=timeout, headers=headers or {})
+
+    def export(self, payload: Dict[str, Any]):
+        response = self._client.post(self.url, json=payload)
+        response.raise_for_status()
+
+    def close(self):
+        self._client.close()
+
+
+class Tracer:
+    """
+    Creates spans, decides which traces are sampled and exports them in batches.
+
+    New traces are sampled with probability ``sample_ratio``, decided from
+    the trace ID so every process reaches the same decision; spans in a
+    trace, including ones continued from an incoming ``traceparent``, follow
+    the decision of their parent. Finished spans wait in a bounded queue
+    that a background task exports every ``export_interval`` seconds from
+    a worker thread; when the queue is full further spans are dropped, so
+    a slow exporter costs spans rather than memory or request latency.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        sample_ratio: float = 1.0,
+        service_name: str = "pro-ai",
+        max_queue_size: int = 2048,
+        batch_size: int = 512,
+        export_interval: float = 1.0,
+    ):
+        """
+        Initialize the tracer.
+
+        Args:
+            exporter: FileSpanExporter, OTLPHttpExporter or any object with
+                ``export(payload)`` and ``close()``
+            sample_ratio: Share of new traces to record, from 0 to 1
+            service_name: ``service.name`` resource attribute
+            max_queue_size: Finished spans kept while waiting for export
+            batch_size: Spans per export call
+            export_interval: Seconds between exports
+        """
+        self.exporter = exporter
+        self.sample_ratio = min(max(sample_ratio, 0.0), 1.0)
+        self._threshold = int(self.sample_ratio * (1 << 64))
+        self.service_name = service_name
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.export_interval = export_interval
+
+        self._queue: "deque[Span]" = deque()
+        self._task: Optional[asyncio.Task] = None
+
+        self.started_traces = 0
+        self.sampled_traces = 0
+        self.exported = 0
+        self.dropped = 0
+        self.failed_exports = 0
+
+    def _sample(self, trace_id: int) -> bool:
+        """Ratio sampling on the low 64 bits of the trace ID"""
+        return (trace_id & 0xFFFFFFFFFFFFFFFF) < self._threshold
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        remote_parent: Optional[tuple] = None,
+        kind: int = INTERNAL,
+        start_ns: Optional[int] = None,
+    ) -> Span:
+        """
+        Start a span without making it current.
+
+        Args:
+            name: Operation name
+            parent: Local parent span; a new trace is started without one
+            remote_parent: (trace_id, span_id, sampled) from an incoming request
+            kind: INTERNAL, SERVER or CLIENT
+            start_ns: Start time in epoch nanoseconds, defaulting to now
+
+        Returns:
+            The new span; call ``end`` when the operation finishes
+        """
+        if parent is not None:
+            return Span(self, name, parent.trace_id, parent.span_id, parent.sampled, kind, parent, start_ns)
+        if remote_parent is not None:
+            trace_id, parent_id, sampled = remote_parent
+        else:
+            trace_id = random.getrandbits(128) or 1
+            parent_id = None
+            sampled = self._sample(trace_id)
+        self.started_traces += 1
+        if sampled:
+            self.sampled_traces += 1
+        return Span(self, name, trace_id, parent_id, sampled, kind, None, start_ns)
+
+    def _finish(self, span: Span):
+        """Queue a finished sampled span for export"""
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        """OTLP/JSON export request for a batch of spans"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": self.service_name,
+                    "process.pid": os.getpid(),
+                })},
+                "scopeSpans": [{"scope": {"name": "pro-ai"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }
+
+    def flush(self):
+        """Export every queued span, blocking; runs in a worker thread from the export loop"""
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            try:
+                self.exporter.export(self._payload(batch))
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed_exports += 1
+                self.dropped += len(batch)
+                logger.warning("Failed to export %d spans: %s", len(batch), e)
+
+    async def start(self):
+        """Start the background export task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="trace-export")
+
+    async def stop(self):
+        """Stop the export task, export what is left and close the exporter"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+        self.exporter.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.export_interval)
+            if self._queue:
+                await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get sampling and export counters"""
+        return {
+            "sample_ratio": self.sample_ratio,
+            "started_traces": self.started_traces,
+            "sampled_traces": self.sampled_traces,
+            "queued_spans": len(self._queue),
+            "exported_spans": self.exported,
+            "dropped_spans": self.dropped,
+            "failed_exports": self.failed_exports,
+        }
+
+
+def configure(config: dict) -> Optional[Tracer]:
+    """
+    Set up the process-wide tracer from the tracing settings.
+
+    Args:
+        config: Tracing configuration (enabled, exporter, file, otlp_endpoint,
+            sample_ratio, service_name, max_queue_size)
+
+    Returns:
+        The tracer, or None when tracing is disabled
+    """
+    global _tracer
+    if not config.get("enabled", False):
+        _tracer = None
+        return None
+
+    exporter_name = config.get("exporter", "file")
+    if exporter_name == "file":
+        exporter = FileSpanExporter(config.get("file", "data/traces.jsonl"))
+    elif exporter_name == "otlp":
+        exporter = OTLPHttpExporter(config.get("otlp_endpoint", "http://localhost:4318"))
+    else:
+        raise ValueError(f"Unknown trace exporter: {exporter_name}")
+
+    _tracer = Tracer(
+        exporter,
+        sample_ratio=config.get("sample_ratio", 1.0),
+        service_name=config.get("service_name", "pro-ai"),
+        max_queue_size=config.get("max_queue_size", 2048),
+    )
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the process-wide tracer, if tracing is enabled"""
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    """Get the span of the operation in progress, if any"""
+    return _current.get()
+
+
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """
+    Trace an operation as a child of the current span.
+
+    Use as ``with span("memory.add_entry", conversation_id=cid) as s:``.
+    While tracing is disabled this returns a shared no-op span.
+
+    Args:
+        name: Operation name
+        kind: INTERNAL, SERVER or CLIENT
+        **attributes: Attributes recorded if the trace is sampled
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    new_span = tracer.start_span(name, parent=_current.get(), kind=kind)
+    if new_span.sampled and attributes:
+        new_span.set_attributes(**attributes)
+    return new_span
+
+
+def start_span(name: str, **attributes):
+    """
+    Start a child of the current span without making it current.
+
+    For operations that outlive one resumption of a generator, whose
+    context may change between steps; end the span explicitly and use
+    ``traced_iter`` to make it current while the generator runs.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    new_span = tracer.start_span(name, parent=_current.get())
+    if new_span.sampled and attributes:
+        new_span.set_attributes(**attributes)
+    return new_span
+
+
+async def traced_iter(active, iterator: AsyncIterator) -> AsyncIterator:
+    """
+    Iterate an async generator with a span current while it runs.
+
+    The span is made current for each step and reset before the item is
+    handed on, so outbound requests made by the generator carry the span
+    while the caller's own context is left untouched.
+    """
+    if active is NOOP_SPAN:
+        async for item in iterator:
+            yield item
+        return
+    try:
+        while True:
+            token = _current.set(active)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        await iterator.aclose()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+        (trace_id, parent_span_id, sampled), or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    match = TRACEPARENT_PATTERN.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = int(match.group(1), 16), int(match.group(2), 16), int(match.group(3), 16)
+    if not trace_id or not span_id:
+        return None
+    return trace_id, span_id, bool(flags & 1)
+
+
+async def inject_traceparent(request):
+    """httpx request hook: propagate the current trace to a provider"""
+    active = _current.get()
+    if active is not None and "traceparent" not in request.headers:
+        request.headers["traceparent"] = active.traceparent
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span for every HTTP request.
+
+    Continues the trace of an incoming ``traceparent`` header. Once the
+    request is done, the time between the request body arriving and the
+    first traced operation of the handler is recorded as a
+    ``request.validate`` span (body parsing and validation), and the time
+    between the last traced operation and the start of the response as a
+    ``response.serialize`` span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tracer = _tracer
+        if tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        method = scope["method"]
+        root = tracer.start_span(method, remote_parent=parse_traceparent(traceparent), kind=SERVER)
+        body_received_ns = None
+        response_start_ns = None
+        status = 500
+
+        async def receive_wrapper():
+            nonlocal body_received_ns
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body"):
+                body_received_ns = time.time_ns()
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_start_ns, status
+            if message["type"] == "http.response.start":
+                response_start_ns = time.time_ns()
+                status = message["status"]
+            await send(message)
+
+        with root:
+            try:
+                await self.app(scope, receive_wrapper, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{method} {route}"
+                root.set_attributes(
+                    **{"http.method": method, "http.route": route, "http.target": scope["path"],
+                       "http.status_code": status}
+                )
+                if status >= 500:
+                    root.set_error(f"HTTP {status}")
+                if root.sampled and root.first_child_start_ns is not None:
+                    self._phase_spans(tracer, root, body_received_ns, response_start_ns)
+
+    @staticmethod
+    def _phase_spans(tracer: Tracer, root: Span, body_received_ns: Optional[int], response_start_ns: Optional[int]):
+        """Record request validation and response serialization around the handler's spans"""
+        validate_start = body_received_ns or root.start_ns
+        if validate_start <= root.first_child_start_ns:
+            tracer.start_span("request.validate", parent=root, start_ns=validate_start).end(root.first_child_start_ns)
+        if response_start_ns is not None and root.last_child_end_ns <= response_start_ns:
+            tracer.start_span("response.serialize", parent=root, start_ns=root.last_child_end_ns).end(response_start_ns)
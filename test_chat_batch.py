@@ -0,0 +1,86 @@
+"""Regression tests for the batch chat endpoint (run with pytest; no server or API keys needed)"""
+
+import asyncio
+import json
+
+from src.backend.routes import chat_routes
+from src.backend.routes.chat_routes import BatchChatRequest
+
+
+class FakeRouter:
+    """Router whose response for each prompt is chosen by the test"""
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+
+    async def chat(self, messages, model=None, temperature=0.7, max_tokens=2000, hedge=None):
+        await asyncio.sleep(0)
+        return self.responses[messages[-1]["content"]]
+
+
+class FakeMemory:
+    def __init__(self):
+        self.entries = []
+
+    def add_entries(self, entries):
+        self.entries.extend(entries)
+
+
+def batch(*prompts) -> BatchChatRequest:
+    return BatchChatRequest(requests=[{"messages": [{"role": "user", "content": p}]} for p in prompts])
+
+
+def collect(request: BatchChatRequest, timeout: float = 5.0) -> list:
+    """Run the endpoint and parse its NDJSON lines, failing instead of hanging"""
+
+    async def run():
+        response = await chat_routes.chat_batch(request)
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+
+    return asyncio.run(asyncio.wait_for(run(), timeout))
+
+
+def setup(monkeypatch, responses: dict) -> FakeMemory:
+    memory = FakeMemory()
+    monkeypatch.setattr(chat_routes, "_router", FakeRouter(responses))
+    monkeypatch.setattr(chat_routes, "_memory", memory)
+    return memory
+
+
+def test_batch_reports_every_item(monkeypatch):
+    memory = setup(monkeypatch, {
+        "a": {"model": "openai", "content": "A"},
+        "b": {"error": "Rate limited", "status_code": 429},
+    })
+    lines = sorted(collect(batch("a", "b")), key=lambda line: line["index"])
+    assert lines[0]["content"] == "A"
+    assert lines[1]["error"] == "Rate limited" and lines[1]["status_code"] == 429
+    assert [e.role for e in memory.entries].count("assistant") == 1
+
+
+def test_malformed_response_fails_only_its_item(monkeypatch):
+    # content=None fails ChatResponse validation; before the fix the stream waited forever
+    memory = setup(monkeypatch, {
+        "ok": {"model": "openai", "content": "fine"},
+        "bad": {"model": "openai", "content": None},
+        "missing": {"model": "openai"},
+    })
+    lines = {line["index"]: line for line in collect(batch("ok", "bad", "missing"))}
+    assert sorted(lines) == [0, 1, 2]
+    assert lines[0]["content"] == "fine"
+    assert lines[1]["status_code"] == 500 and lines[2]["status_code"] == 500
+    assert [e.content for e in memory.entries if e.role == "assistant"] == ["fine"]
+
+
+def test_stream_ends_when_runner_fails(monkeypatch):
+    setup(monkeypatch, {})
+
+    async def broken_run_batch(requests, concurrency, results):
+        await results.put({"index": 0, "model": "openai", "content": "first"})
+        raise RuntimeError("runner crashed")
+
+    monkeypatch.setattr(chat_routes, "run_batch", broken_run_batch)
+    lines = {line["index"]: line for line in collect(batch("a", "b", "c"))}
+    assert sorted(lines) == [0, 1, 2]
+    assert lines[0]["content"] == "first"
+    assert lines[1]["status_code"] == 500 and lines[2]["status_code"] == 500
@@ -0,0 +1,122 @@
+"""Behaviour tests for request coalescing (run with pytest; no server or API keys needed)"""
+
+import asyncio
+
+from src.models.coalescing import RequestCoalescer
+
+
+def run(coro, timeout: float = 5.0):
+    """Run a coroutine, failing instead of hanging"""
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+async def collect(stream) -> list:
+    return [event async for event in stream]
+
+
+def test_identical_calls_share_one_provider_call():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"content": "shared"}
+
+        results = await asyncio.gather(*(coalescer.call("k", fetch) for _ in range(3)))
+        return calls, results, coalescer.stats()
+
+    calls, results, stats = run(scenario())
+    assert calls == 1
+    assert results == [{"content": "shared"}] * 3
+    assert stats["leaders"] == 1 and stats["coalesced"] == 2 and stats["in_flight_calls"] == 0
+
+
+def test_call_after_last_waiter_leaves_starts_fresh():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        started = []
+
+        async def fetch():
+            started.append(len(started))
+            await asyncio.sleep(0.05)
+            return {"content": f"call {len(started)}"}
+
+        first = asyncio.create_task(coalescer.call("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)  # The caller leaves; the shared call is cancelled but not yet done
+        second = await coalescer.call("k", fetch)
+        return started, second, first.cancelled()
+
+    started, second, first_cancelled = run(scenario())
+    assert first_cancelled
+    assert started == [0, 1]
+    assert second == {"content": "call 2"}
+
+
+def test_stream_is_replayed_to_late_joiners():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        calls = 0
+
+        async def provider():
+            nonlocal calls
+            calls += 1
+            for text in ("a", "b"):
+                await asyncio.sleep(0.01)
+                yield {"type": "delta", "content": text}
+            yield {"type": "done", "model": "openai"}
+
+        first = asyncio.create_task(collect(coalescer.stream("k", provider)))
+        await asyncio.sleep(0.015)
+        second = await collect(coalescer.stream("k", provider))
+        return calls, await first, second
+
+    calls, first, second = run(scenario())
+    assert calls == 1
+    assert first == second
+    assert [e["type"] for e in first] == ["delta", "delta", "done"]
+
+
+def test_stream_after_all_subscribers_leave_starts_fresh():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        started = 0
+
+        async def provider():
+            nonlocal started
+            started += 1
+            yield {"type": "delta", "content": "x"}
+            await asyncio.sleep(0.05)
+            yield {"type": "done", "model": "openai"}
+
+        subscribers = [coalescer.stream("k", provider) for _ in range(2)]
+        for stream in subscribers:
+            await stream.__anext__()
+        for stream in subscribers:
+            await stream.aclose()
+        events = await collect(coalescer.stream("k", provider))
+        return started, events, coalescer.stats()
+
+    started, events, stats = run(scenario())
+    assert started == 2
+    assert [e["type"] for e in events] == ["delta", "done"]
+    assert stats["in_flight_streams"] == 0
+
+
+def test_stream_exception_is_published_as_error():
+    async def scenario():
+        coalescer = RequestCoalescer()
+
+        async def provider():
+            yield {"type": "delta", "content": "x"}
+            raise ImportError("No module named 'anthropic'")
+
+        return await asyncio.gather(*(collect(coalescer.stream("k", provider)) for _ in range(2)))
+
+    for events in run(scenario()):
+        assert [e["type"] for e in events] == ["delta", "error"]
+        assert "anthropic" in events[-1]["error"]
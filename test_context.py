@@ -0,0 +1,48 @@
+"""Behaviour tests for token counting and context fitting (run with pytest; no server or API keys needed)"""
+
+from src.models.context import ContextManager, TokenCounter
+
+
+class FakeEncoding:
+    """Tokenizer counting whitespace-separated words"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, text, disallowed_special=()):
+        self.encoded += 1
+        return text.split()
+
+
+def test_summarize_accepts_multimodal_content():
+    manager = ContextManager(max_input_tokens=120, overflow="summarize", summary_max_tokens=100)
+    messages = [
+        {"role": "user", "content": [{"type": "text", "text": "describe this picture"}, {"type": "image_url"}]},
+        {"role": "assistant", "content": "z" * 1000},
+        {"role": "user", "content": "ok"},
+    ]
+    fitted, info = manager.fit(messages, "anthropic", None, max_tokens=0)
+    assert info["summarized"]
+    assert "describe this picture" in fitted[0]["content"]
+    assert fitted[-1] == messages[-1]
+
+
+def test_count_cache_is_keyed_on_the_text():
+    counter = TokenCounter()
+    encoding = FakeEncoding()
+    counter._encodings["gpt-4"] = encoding
+    assert counter.count("openai", "gpt-4", "one two") == 2
+    assert counter.count("openai", "gpt-4", "one two three") == 3
+    assert counter.count("openai", "gpt-4", "one two") == 2
+    assert encoding.encoded == 2
+    assert counter.cache_hits == 1
+
+
+def test_only_openai_tokenizers_need_loading():
+    counter = TokenCounter()
+    assert counter.is_loaded("anthropic", "claude-3-opus")
+    assert not counter.is_loaded("openai", "gpt-4")
+    counter._encodings["gpt-4"] = None
+    assert counter.is_loaded("openai", "gpt-4")
@@ -0,0 +1,140 @@
+"""Behaviour tests for the persistent job queue (run with pytest; no server or API keys needed)"""
+
+import asyncio
+import threading
+import time
+
+from src.jobs import JobQueue, JobStore
+
+
+def run(coro, timeout: float = 5.0):
+    """Run a coroutine, failing instead of hanging"""
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+async def wait_for_status(store: JobStore, job_id: str, status: str):
+    while store.get(job_id)["status"] != status:
+        await asyncio.sleep(0.01)
+
+
+async def hang(request):
+    await asyncio.Event().wait()
+
+
+def test_stop_requeues_running_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    async def scenario():
+        queue = JobQueue(store, hang, workers=1, poll_interval=0.01)
+        job = await queue.submit({"prompt": "long"})
+        await queue.start()
+        await wait_for_status(store, job["id"], "running")
+        await queue.stop()
+        return store.get(job["id"])
+
+    job = run(scenario())
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
+    assert job["lease_expires_at"] is None
+    assert job["available_at"] <= time.time()
+
+
+def test_stop_requeues_job_claimed_while_stopping(tmp_path):
+    class SlowClaimStore(JobStore):
+        claiming = threading.Event()
+
+        def claim(self, lease_seconds):
+            self.claiming.set()
+            time.sleep(0.2)
+            return super().claim(lease_seconds)
+
+    store = SlowClaimStore(str(tmp_path / "jobs.db"))
+
+    async def scenario():
+        queue = JobQueue(store, hang, workers=1, poll_interval=0.01)
+        job = await queue.submit({"prompt": "long"})
+        await queue.start()
+        await asyncio.to_thread(store.claiming.wait)
+        # The worker is cancelled while its claim is still running in a thread
+        await queue.stop()
+        return job["id"]
+
+    # Read once the event loop has closed and every claim thread has finished
+    job = store.get(run(scenario()))
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
+
+
+def test_requeue_leaves_jobs_claimed_again_elsewhere(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.submit({"prompt": "x"})
+    first = store.claim(lease_seconds=-1)  # Lease already expired
+    second = store.claim(lease_seconds=60)
+    assert first["id"] == second["id"] == job["id"]
+    assert store.requeue({job["id"]: first["lease_expires_at"]}) == 0
+    assert store.get(job["id"])["status"] == "running"
+
+
+def test_claim_takes_the_highest_priority_job_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    low = store.submit({"prompt": "low"})
+    high = store.submit({"prompt": "high"}, priority=5)
+    assert store.claim(lease_seconds=60)["id"] == high["id"]
+    assert store.claim(lease_seconds=60)["id"] == low["id"]
+    assert store.claim(lease_seconds=60) is None
+    assert store.get(high["id"])["attempts"] == 1
+
+
+def test_expired_lease_is_claimed_again_until_attempts_run_out(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.submit({"prompt": "x"}, max_attempts=2)
+    # Each worker dies holding the job, so its lease expires
+    assert store.claim(lease_seconds=-1)["attempts"] == 1
+    assert store.claim(lease_seconds=-1)["attempts"] == 2
+    assert store.claim(lease_seconds=-1) is None
+    failed = store.get(job["id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == "Worker stopped while running the job"
+
+
+def run_queue(store: JobStore, responses: list, job_id: str) -> list:
+    """Run a job on a queue whose attempts return ``responses`` in turn, until it finishes"""
+    requests = []
+
+    async def attempt(request):
+        requests.append(request)
+        return responses[len(requests) - 1]
+
+    async def scenario():
+        queue = JobQueue(store, attempt, workers=1, retry_base=0.01, poll_interval=0.01)
+        await queue.start()
+        while store.get(job_id)["status"] not in ("succeeded", "failed"):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    run(scenario())
+    return requests
+
+
+def test_transient_errors_are_retried(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.submit({"prompt": "x"}, max_attempts=3)
+    responses = [{"error": "unavailable", "status_code": 503}, {"error": "slow down", "retry_after": 0.01},
+                 {"content": "done"}]
+    assert len(run_queue(store, responses, job["id"])) == 3
+    finished = store.get(job["id"])
+    assert finished["status"] == "succeeded"
+    assert finished["result"] == {"content": "done"}
+    assert finished["attempts"] == 3
+
+
+def test_client_errors_and_last_attempts_are_not_retried(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    rejected = store.submit({"prompt": "x"})
+    assert len(run_queue(store, [{"error": "invalid role", "status_code": 400}], rejected["id"])) == 1
+    assert store.get(rejected["id"])["status"] == "failed"
+
+    exhausted = store.submit({"prompt": "y"}, max_attempts=2)
+    responses = [{"error": "unavailable", "status_code": 503}] * 2
+    assert len(run_queue(store, responses, exhausted["id"])) == 2
+    assert store.get(exhausted["id"])["error"] == "unavailable"
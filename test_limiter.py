@@ -0,0 +1,77 @@
+"""Behaviour tests for adaptive concurrency limiting (run with pytest; no server or API keys needed)"""
+
+import asyncio
+
+from src.models.limiter import AdaptiveLimiter, background_traffic
+
+
+def settle(limiter: AdaptiveLimiter, latency: float, kind: str = "response", calls: int = 20):
+    """Complete successful calls to establish a latency baseline"""
+    for _ in range(calls):
+        asyncio.run(limiter.acquire())
+        limiter.release(latency, kind=kind)
+
+
+def test_streams_and_chat_calls_keep_separate_baselines():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_tolerance=3.0)
+    settle(limiter, 0.1, kind="first_token")
+    limit = limiter.limit
+    # A whole response takes far longer than a first token without being congestion
+    settle(limiter, 5.0, kind="response", calls=1)
+    assert limiter.decreases == 0
+    assert limiter.limit > limit
+    assert limiter.to_dict()["avg_latency_ms"] == {"first_token": 100.0, "response": 5000.0}
+
+
+def test_background_calls_are_not_timed():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_tolerance=3.0)
+    settle(limiter, 0.5)
+    with background_traffic():
+        settle(limiter, 60.0, calls=5)
+    assert limiter.decreases == 0
+    assert limiter.avg_latency["response"] == 0.5
+
+
+def test_background_overload_still_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial_limit=10)
+    with background_traffic():
+        asyncio.run(limiter.acquire())
+        limiter.release(0.1, status_code=429, success=False)
+    assert limiter.limit == 7
+
+
+def test_successful_calls_raise_the_limit():
+    limiter = AdaptiveLimiter(initial_limit=10, max_limit=12)
+    settle(limiter, 0.1, calls=10)
+    assert 10.9 < limiter.limit < 11.1
+    settle(limiter, 0.1, calls=100)
+    assert limiter.limit == 12
+
+
+def test_overload_cuts_the_limit_once_per_round():
+    limiter = AdaptiveLimiter(initial_limit=10)
+    settle(limiter, 60.0, calls=1)
+    limit = limiter.limit
+    for _ in range(3):
+        asyncio.run(limiter.acquire())
+    for status_code in (503, 429, 500):
+        limiter.release(0.1, status_code=status_code, success=False)
+    assert limiter.decreases == 1
+    assert limiter.limit == limit * 0.7
+
+
+def test_slow_call_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_tolerance=3.0)
+    settle(limiter, 0.01)
+    limit = limiter.limit
+    settle(limiter, 1.0, calls=1)
+    assert limiter.decreases == 1
+    assert limiter.limit == limit * 0.7
+
+
+def test_limit_is_not_cut_below_the_minimum():
+    limiter = AdaptiveLimiter(initial_limit=4, min_limit=2)
+    for _ in range(5):
+        asyncio.run(limiter.acquire())
+        limiter.release(0.1, status_code=503, success=False)
+    assert limiter.limit == 2
@@ -0,0 +1,114 @@
+"""Behaviour tests for the memory stores (run with pytest; no server or API keys needed)"""
+
+import asyncio
+import threading
+
+from src.memory import ConversationEntry, JSONMemory, WriteBehindMemory, json_memory
+
+
+def run(coro, timeout: float = 5.0):
+    """Run a coroutine, failing instead of hanging"""
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+def entry(content: str, conversation_id: str = "c1") -> ConversationEntry:
+    return ConversationEntry.create("user", content, conversation_id=conversation_id)
+
+
+class GatedStore(JSONMemory):
+    """Store whose writes wait until the test lets them through"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writing = threading.Event()
+        self.proceed = threading.Event()
+
+    def add_entries(self, entries):
+        self.writing.set()
+        self.proceed.wait()
+        super().add_entries(entries)
+
+
+def test_clear_during_flush_does_not_resurrect_entries(tmp_path):
+    store = GatedStore(str(tmp_path / "memory.json"))
+
+    async def scenario():
+        memory = WriteBehindMemory(store, flush_interval_ms=1)
+        await memory.start()
+        memory.add_entries([entry("old"), entry("other", "c2")])
+        await asyncio.to_thread(store.writing.wait)
+        # The batch is being written while the conversation is cleared
+        memory.clear("c1")
+        cleared = memory.get_all("c1")
+        store.proceed.set()
+        memory.add_entry("user", "new", conversation_id="c1")
+        await memory.stop()
+        return memory, cleared
+
+    try:
+        memory, cleared = run(scenario())
+    finally:
+        store.proceed.set()
+    assert cleared == []
+    assert [e.content for e in store.get_all("c1")] == ["new"]
+    assert [e.content for e in store.get_all("c2")] == ["other"]
+    assert [e.content for e in memory.get_all("c1")] == ["new"]
+
+
+class FlakyStore(JSONMemory):
+    """Store whose first write to some conversations fails"""
+
+    def __init__(self, *args, fail_for=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_for = set(fail_for)
+
+    def _shard(self, conversation_id):
+        if conversation_id in self.fail_for:
+            self.fail_for.discard(conversation_id)
+            raise OSError("disk full")
+        return super()._shard(conversation_id)
+
+
+def test_compaction_keeps_the_most_recent_entries(tmp_path):
+    memory = JSONMemory(str(tmp_path / "memory.json"), max_entries=10, compaction_ratio=1.5)
+    for i in range(16):
+        memory.add_entry("user", f"message {i}")
+    shard = memory._shard(None)
+    shard._compaction_thread.join(5)
+
+    expected = [f"message {i}" for i in range(6, 16)]
+    with open(shard.log_file, "rb") as f:
+        assert len(f.read().splitlines()) == 10
+    assert [e.content for e in memory.get_all()] == expected
+    # A new process reads the compacted log back from disk
+    reopened = JSONMemory(str(tmp_path / "memory.json"), max_entries=10)
+    assert [e.content for e in reopened.get_all()] == expected
+
+
+def test_tail_reads_across_chunk_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_memory, "_TAIL_CHUNK_SIZE", 64)
+    memory = JSONMemory(str(tmp_path / "memory.json"), max_entries=20)
+    memory.add_entries([entry("x" * (i * 7 % 90), f"c{i % 2}") for i in range(40)])
+
+    reopened = JSONMemory(str(tmp_path / "memory.json"), max_entries=20)
+    assert [len(e.content) for e in reopened.get_recent(5, "c1")] == [i * 7 % 90 for i in range(31, 40, 2)]
+    assert len(reopened.get_all("c0")) == 20
+
+
+def test_partial_write_requeues_only_unwritten_entries(tmp_path):
+    store = FlakyStore(str(tmp_path / "memory.json"), fail_for={"c2"})
+
+    async def scenario():
+        memory = WriteBehindMemory(store, flush_interval_ms=1)
+        await memory.start()
+        memory.add_entries([entry("a"), entry("b", "c2"), entry("c")])
+        while not memory.flush_count:
+            await asyncio.sleep(0.01)
+        await memory.stop()
+        return memory
+
+    memory = run(scenario())
+    assert [e.content for e in store.get_all("c1")] == ["a", "c"]
+    assert [e.content for e in store.get_all("c2")] == ["b"]
+    assert memory.failed_flushes == 1
+    assert memory.entries_dropped == 0
@@ -0,0 +1,150 @@
+"""Behaviour tests for fallback routing and circuit breakers (run with pytest; no server or API keys needed)"""
+
+import asyncio
+
+from src.models import ModelRouter, health
+from src.models.health import CircuitBreaker
+from src.models.providers import Provider
+
+
+class FakeProvider(Provider):
+    """Provider answering every call with a fixed response"""
+
+    def __init__(self, name: str, response: dict):
+        super().__init__(name, {}, None)
+        self.response = response
+        self.calls = 0
+
+    async def chat(self, messages, temperature, max_tokens):
+        self.calls += 1
+        return dict(self.response)
+
+
+class Clock:
+    """Monotonic clock the tests move by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def open_breaker(monkeypatch) -> tuple:
+    """Breaker opened by failures, with the clock it reads"""
+    clock = Clock()
+    monkeypatch.setattr(health.time, "monotonic", clock)
+    breaker = CircuitBreaker(min_requests=4, failure_rate=0.5, open_seconds=30.0)
+    for success in (True, True, False, False):
+        assert breaker.allow()
+        breaker.record(success, 0.1)
+    return breaker, clock
+
+
+def make_router(primary: dict, fallback: dict = None) -> ModelRouter:
+    """Router for "primary" falling back to "fallback", with fake adapters"""
+    router = ModelRouter({
+        "default_model": "primary",
+        "primary": {"enabled": True},
+        "fallback": {"enabled": True},
+        "providers": {"primary": "fake:Provider", "fallback": "fake:Provider"},
+        "routing": {"fallback_chain": ["fallback"]},
+    })
+    router.providers["primary"] = FakeProvider("primary", primary)
+    router.providers["fallback"] = FakeProvider("fallback", fallback or {"model": "fallback", "content": "ok"})
+    return router
+
+
+def chat_many(router: ModelRouter, count: int) -> list:
+    async def run():
+        return [await router.chat([{"role": "user", "content": "hi"}]) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def stream(router: ModelRouter) -> list:
+    async def run():
+        return [event async for event in router.stream_chat([{"role": "user", "content": "hi"}])]
+
+    return asyncio.run(run())
+
+
+def test_client_errors_do_not_open_the_breaker_or_fall_back():
+    router = make_router({"error": "invalid role", "status_code": 400})
+    responses = chat_many(router, 10)
+    assert all(r["status_code"] == 400 for r in responses)
+    assert router.providers["fallback"].calls == 0
+    assert router.breakers["primary"].state == "closed"
+    assert router.breakers["primary"].to_dict()["window_calls"] == 0
+
+
+def test_provider_faults_fall_back_and_open_the_breaker():
+    router = make_router({"error": "unavailable", "status_code": 503})
+    responses = chat_many(router, 10)
+    assert all(r["content"] == "ok" for r in responses)
+    assert router.breakers["primary"].state == "open"
+    # Once open, the primary is no longer tried at all
+    assert router.providers["primary"].calls == router.breakers["primary"].min_requests
+
+
+def test_rate_limits_count_as_provider_faults():
+    router = make_router({"error": "slow down", "status_code": 429})
+    chat_many(router, 5)
+    assert router.breakers["primary"].state == "open"
+
+
+def test_stream_client_error_is_returned_without_fallback():
+    router = make_router({"error": "max_tokens too large", "status_code": 400})
+    events = stream(router)
+    assert events == [{"type": "error", "error": "max_tokens too large", "status_code": 400}]
+    assert router.providers["fallback"].calls == 0
+    assert router.breakers["primary"].to_dict()["window_calls"] == 0
+
+
+def test_breaker_opens_at_the_failure_rate(monkeypatch):
+    breaker, clock = open_breaker(monkeypatch)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert breaker.health_score() == 0.0
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_breaker_waits_for_min_requests(monkeypatch):
+    monkeypatch.setattr(health.time, "monotonic", Clock())
+    breaker = CircuitBreaker(min_requests=4, failure_rate=0.5)
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_success_closes_the_breaker(monkeypatch):
+    breaker, clock = open_breaker(monkeypatch)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.to_dict()["window_calls"] == 0
+
+
+def test_half_open_probe_failure_reopens_the_breaker(monkeypatch):
+    breaker, clock = open_breaker(monkeypatch)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_another_through(monkeypatch):
+    breaker, clock = open_breaker(monkeypatch)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
@@ -0,0 +1,69 @@
+"""Behaviour tests for the WebSocket chat channel (run with pytest; no server or API keys needed)"""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.backend.routes import chat_routes, ws_routes
+
+
+class FakeRouter:
+    """Router streaming a fixed reply, or raising when the prompt is boom"""
+
+    async def stream_chat(self, messages, model=None, temperature=0.7, max_tokens=2000, hedge=None):
+        if messages[-1]["content"] == "boom":
+            raise RuntimeError("router exploded")
+        yield {"type": "delta", "content": "hi"}
+        yield {"type": "done", "model": "openai", "usage": {}}
+
+
+class FakeMemory:
+    def __init__(self):
+        self.entries = []
+
+    def add_entry(self, entry):
+        self.entries.append(entry)
+
+    def add_entries(self, entries):
+        self.entries.extend(entries)
+
+
+def client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(chat_routes, "_router", FakeRouter())
+    monkeypatch.setattr(chat_routes, "_memory", FakeMemory())
+    app = FastAPI()
+    app.include_router(ws_routes.router)
+    return TestClient(app)
+
+
+def chat(request_id: str, prompt: str) -> dict:
+    return {"type": "chat", "id": request_id, "messages": [{"role": "user", "content": prompt}]}
+
+
+def until_final(ws, request_id: str) -> dict:
+    """Read events until the request's terminal one"""
+    while True:
+        event = ws.receive_json()
+        if event.get("id") == request_id and event["type"] in ("done", "error", "cancelled"):
+            return event
+
+
+def test_failing_request_gets_an_error_event(monkeypatch):
+    with client(monkeypatch).websocket_connect("/api/ws") as ws:
+        ws.send_json(chat("bad", "boom"))
+        event = until_final(ws, "bad")
+        assert event["type"] == "error" and "router exploded" in event["error"]
+        # The connection stays usable
+        ws.send_json(chat("good", "hello"))
+        assert until_final(ws, "good")["type"] == "done"
+
+
+def test_binary_frames_are_accepted(monkeypatch):
+    with client(monkeypatch).websocket_connect("/api/ws") as ws:
+        ws.send_bytes(json.dumps(chat("1", "hello")).encode())
+        assert until_final(ws, "1")["type"] == "done"
+        ws.send_bytes(b"\xff\xfe not json")
+        assert ws.receive_json() == {"type": "error", "id": None, "error": "Invalid JSON"}
+        ws.send_json(chat("2", "hello"))
+        assert until_final(ws, "2")["type"] == "done"